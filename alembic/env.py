@@ -23,6 +23,11 @@ if config.config_file_name is not None:
 # target_metadata = mymodel.Base.metadata
 target_metadata = Base.metadata
 
+# The samples_fts and archived_samples_fts full-text indexes (and the shadow tables of FTS5) are not models, they are
+# created by hand in revisions 7d3f2a9c4b18 and e7a3c9d41b06, so autogenerate must not drop them
+def include_name(name, type_, parent_names) -> bool:
+    return not (type_ == "table" and name.startswith(("samples_fts", "archived_samples_fts")))
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -47,6 +52,7 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        include_name=include_name,
     )
 
     with context.begin_transaction():
@@ -68,7 +74,7 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata, include_name=include_name
         )
 
         with context.begin_transaction():
@@ -0,0 +1,52 @@
+"""Add samples_fts full-text search index
+
+Revision ID: 7d3f2a9c4b18
+Revises: 5c2e7b1d9f40
+Create Date: 2026-10-17 03:31:12.408153
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d3f2a9c4b18'
+down_revision: Union[str, Sequence[str], None] = '5c2e7b1d9f40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = "subject_id, storage_location"
+INDEX_NEW = f"INSERT INTO samples_fts (rowid, {COLUMNS}) VALUES (NEW.rowid, NEW.subject_id, NEW.storage_location);"
+REMOVE_OLD = (f"INSERT INTO samples_fts (samples_fts, rowid, {COLUMNS}) "
+              f"VALUES ('delete', OLD.rowid, OLD.subject_id, OLD.storage_location);")
+
+TRIGGERS = {
+    "samples_fts_insert": f"CREATE TRIGGER samples_fts_insert AFTER INSERT ON samples BEGIN {INDEX_NEW} END",
+    "samples_fts_delete": f"CREATE TRIGGER samples_fts_delete AFTER DELETE ON samples BEGIN {REMOVE_OLD} END",
+    "samples_fts_update": f"CREATE TRIGGER samples_fts_update AFTER UPDATE OF {COLUMNS} ON samples "
+                          f"BEGIN {REMOVE_OLD} {INDEX_NEW} END",
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # FTS5 is specific to SQLite, elsewhere the search endpoint falls back to LIKE conditions
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    op.execute(sa.text(f"CREATE VIRTUAL TABLE samples_fts USING fts5({COLUMNS}, content='samples', "
+                       f"content_rowid='rowid', prefix='2 3')"))
+    # Index the existing samples, read from the content table
+    op.execute(sa.text("INSERT INTO samples_fts (samples_fts) VALUES ('rebuild')"))
+    for trigger in TRIGGERS.values():
+        op.execute(sa.text(trigger))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for name in TRIGGERS:
+        op.execute(sa.text(f"DROP TRIGGER IF EXISTS {name}"))
+    op.execute(sa.text("DROP TABLE IF EXISTS samples_fts"))
@@ -0,0 +1,32 @@
+"""Add subject summary index
+
+Revision ID: c4d81f6e2a57
+Revises: 3f8a6d2e5c91
+Create Date: 2026-10-17 06:12:40.518306
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d81f6e2a57'
+down_revision: Union[str, Sequence[str], None] = '3f8a6d2e5c91'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The new index starts with subject_id, so it also serves the lookups of ix_samples_subject_id
+    op.create_index('ix_samples_subject_summary', 'samples',
+                    ['subject_id', 'sample_type', 'status', 'collection_date'], unique=False)
+    op.drop_index(op.f('ix_samples_subject_id'), table_name='samples')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(op.f('ix_samples_subject_id'), 'samples', ['subject_id'], unique=False)
+    op.drop_index('ix_samples_subject_summary', table_name='samples')
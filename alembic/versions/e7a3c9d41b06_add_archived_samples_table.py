@@ -0,0 +1,124 @@
+"""Add archived_samples table
+
+Revision ID: e7a3c9d41b06
+Revises: c4d81f6e2a57
+Create Date: 2026-10-17 07:21:53.804129
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a3c9d41b06'
+down_revision: Union[str, Sequence[str], None] = 'c4d81f6e2a57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = "sample_id, operation, sample_type, subject_id, collection_date, status, storage_location, changed_at"
+NOW = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+NEW_VALUES = ("NEW.sample_id, 'created', NEW.sample_type, NEW.subject_id, NEW.collection_date, NEW.status, "
+              "NEW.storage_location")
+INCREMENT = """
+    INSERT INTO storage_locations (storage_location, sample_count) VALUES (NEW.storage_location, 1)
+    ON CONFLICT (storage_location) DO UPDATE SET sample_count = sample_count + 1;"""
+DECREMENT = """
+    UPDATE storage_locations SET sample_count = sample_count - 1 WHERE storage_location = OLD.storage_location;
+    DELETE FROM storage_locations WHERE storage_location = OLD.storage_location AND sample_count <= 0;"""
+COUNT_KEY = "status, sample_type, storage_location, collection_date"
+COUNT_MATCH = ("status = OLD.status AND sample_type = OLD.sample_type "
+               "AND storage_location = OLD.storage_location AND collection_date = OLD.collection_date")
+COUNT_INCREMENT = f"""
+    INSERT INTO sample_counts ({COUNT_KEY}, sample_count)
+    VALUES (NEW.status, NEW.sample_type, NEW.storage_location, NEW.collection_date, 1)
+    ON CONFLICT ({COUNT_KEY}) DO UPDATE SET sample_count = sample_count + 1;"""
+COUNT_DECREMENT = f"""
+    UPDATE sample_counts SET sample_count = sample_count - 1 WHERE {COUNT_MATCH};
+    DELETE FROM sample_counts WHERE {COUNT_MATCH} AND sample_count <= 0;"""
+LOG_CREATED = f"INSERT INTO sample_changes ({COLUMNS}) VALUES ({NEW_VALUES}, {NOW});"
+LOG_DELETED = (f"INSERT INTO sample_changes ({COLUMNS}) "
+               f"VALUES (OLD.sample_id, 'deleted', NULL, NULL, NULL, NULL, NULL, {NOW});")
+
+# Triggers of revisions 5c2e7b1d9f40, 9b4e1c7a2d63 and 3f8a6d2e5c91, the upgrade skips the moves between samples and
+# archived_samples: a sample is inserted into the table it moves to before being deleted from the other
+REPLACED_TRIGGERS = {
+    "sample_counts_insert": ("CREATE TRIGGER sample_counts_insert AFTER INSERT ON samples {when}"
+                             f"BEGIN {COUNT_INCREMENT} END", "NEW"),
+    "sample_counts_delete": ("CREATE TRIGGER sample_counts_delete AFTER DELETE ON samples {when}"
+                             f"BEGIN {COUNT_DECREMENT} END", "OLD"),
+    "storage_locations_insert": ("CREATE TRIGGER storage_locations_insert AFTER INSERT ON samples {when}"
+                                 f"BEGIN {INCREMENT} END", "NEW"),
+    "storage_locations_delete": ("CREATE TRIGGER storage_locations_delete AFTER DELETE ON samples {when}"
+                                 f"BEGIN {DECREMENT} END", "OLD"),
+    "sample_changes_insert": ("CREATE TRIGGER sample_changes_insert AFTER INSERT ON samples {when}"
+                              f"BEGIN {LOG_CREATED} END", "NEW"),
+    "sample_changes_delete": ("CREATE TRIGGER sample_changes_delete AFTER DELETE ON samples {when}"
+                              f"BEGIN {LOG_DELETED} END", "OLD"),
+}
+NOT_ARCHIVED = "WHEN NOT EXISTS (SELECT 1 FROM archived_samples WHERE sample_id = {row}.sample_id) "
+# Archived samples stay counted in the statistics and their storage location until they are deleted, which is logged.
+# archived_samples_fts indexes them for the searches with include_archived, they are not updated in place.
+NOT_HOT = "WHEN NOT EXISTS (SELECT 1 FROM samples WHERE sample_id = OLD.sample_id) "
+ARCHIVED_TRIGGERS = {
+    "sample_counts_archived_delete": f"CREATE TRIGGER sample_counts_archived_delete AFTER DELETE ON "
+                                     f"archived_samples {NOT_HOT}BEGIN {COUNT_DECREMENT} END",
+    "storage_locations_archived_delete": f"CREATE TRIGGER storage_locations_archived_delete AFTER DELETE ON "
+                                         f"archived_samples {NOT_HOT}BEGIN {DECREMENT} END",
+    "sample_changes_archived_delete": f"CREATE TRIGGER sample_changes_archived_delete AFTER DELETE ON "
+                                      f"archived_samples {NOT_HOT}BEGIN {LOG_DELETED} END",
+    "archived_samples_fts_insert": "CREATE TRIGGER archived_samples_fts_insert AFTER INSERT ON archived_samples BEGIN "
+                                   "INSERT INTO archived_samples_fts (rowid, subject_id, storage_location) "
+                                   "VALUES (NEW.rowid, NEW.subject_id, NEW.storage_location); END",
+    "archived_samples_fts_delete": "CREATE TRIGGER archived_samples_fts_delete AFTER DELETE ON archived_samples BEGIN "
+                                   "INSERT INTO archived_samples_fts (archived_samples_fts, rowid, subject_id, "
+                                   "storage_location) VALUES ('delete', OLD.rowid, OLD.subject_id, "
+                                   "OLD.storage_location); END",
+}
+ARCHIVED_SEARCH_INDEX = ("CREATE VIRTUAL TABLE archived_samples_fts USING fts5(subject_id, storage_location, "
+                         "content='archived_samples', content_rowid='rowid', prefix='2 3')")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # sampletype and statustype already exist as PostgreSQL types of samples
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.create_table('archived_samples',
+    sa.Column('sample_id', sa.String(), nullable=False),
+    sa.Column('sample_type', postgresql.ENUM('blood', 'saliva', 'tissue', name='sampletype', create_type=False),
+              nullable=False),
+    sa.Column('subject_id', sa.String(), nullable=False),
+    sa.Column('collection_date', sa.Date(), nullable=False),
+    sa.Column('status', postgresql.ENUM('collected', 'processing', 'archived', name='statustype', create_type=False),
+              nullable=False),
+    sa.Column('storage_location', sa.String(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('sample_id')
+    )
+    op.create_index(op.f('ix_archived_samples_subject_id'), 'archived_samples', ['subject_id'], unique=False)
+    # ### end Alembic commands ###
+    if op.get_bind().dialect.name == "sqlite":
+        for name, (trigger, row) in REPLACED_TRIGGERS.items():
+            op.execute(sa.text(f"DROP TRIGGER IF EXISTS {name}"))
+            op.execute(sa.text(trigger.format(when=NOT_ARCHIVED.format(row=row))))
+        op.execute(sa.text(ARCHIVED_SEARCH_INDEX))
+        for trigger in ARCHIVED_TRIGGERS.values():
+            op.execute(sa.text(trigger))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == "sqlite":
+        for name in ARCHIVED_TRIGGERS:
+            op.execute(sa.text(f"DROP TRIGGER IF EXISTS {name}"))
+        op.execute(sa.text("DROP TABLE IF EXISTS archived_samples_fts"))
+        for name, (trigger, _) in REPLACED_TRIGGERS.items():
+            op.execute(sa.text(f"DROP TRIGGER IF EXISTS {name}"))
+            op.execute(sa.text(trigger.format(when="")))
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.drop_index(op.f('ix_archived_samples_subject_id'), table_name='archived_samples')
+    op.drop_table('archived_samples')
+    # ### end Alembic commands ###
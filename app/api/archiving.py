@@ -0,0 +1,50 @@
+import asyncio
+import logging
+from datetime import timedelta
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.api.caching import response_cache
+from app.api.configuration import settings
+from app.db.archive import archive_samples
+from app.db.models import utcnow
+from app.db.session import database
+
+logger = logging.getLogger(__name__)
+
+# Pause between two batches of a run, leaving the write lock of SQLite to the requests
+ARCHIVE_BATCH_PAUSE_SECONDS = 0.1
+
+async def archive_due_samples() -> int:
+    """
+    Move every sample archived for longer than ARCHIVE_AFTER_DAYS to archived_samples, in batches of
+    ARCHIVE_BATCH_SIZE, each in its own transaction. The cached listings are dropped after each batch, as they may
+    hold the moved samples.
+    :return: Number of samples moved.
+    """
+    archived_before = utcnow() - timedelta(days=settings.archive_after_days)
+    moved = 0
+    while True:
+        async with database.read_router.primary() as db:
+            count = await archive_samples(db, archived_before, settings.archive_batch_size)
+        if count:
+            response_cache.clear()
+        moved += count
+        if count < settings.archive_batch_size:
+            return moved
+        await asyncio.sleep(ARCHIVE_BATCH_PAUSE_SECONDS)
+
+async def run_archiver() -> None:
+    """
+    Background task of the application moving the due samples every ARCHIVE_INTERVAL_SECONDS, started by the lifespan
+    when ARCHIVE_AFTER_DAYS is set. With several workers each one runs it: a batch racing with the batch of another
+    worker fails on the primary key of archived_samples, is rolled back and is retried on the next run.
+    """
+    while True:
+        try:
+            moved = await archive_due_samples()
+            if moved:
+                logger.info("Moved %d archived samples to archived_samples", moved)
+        except SQLAlchemyError as e:
+            logger.warning("Archiving samples failed: %s", e)
+        await asyncio.sleep(settings.archive_interval_seconds)
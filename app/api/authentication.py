@@ -1,25 +1,112 @@
+import hashlib
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 
+from anyio import CapacityLimiter, to_thread
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 
 from app.api.configuration import settings
+from app.api.metrics import CallbackMetric, auth_duration, registry
 
 SECRET_KEY = settings.secret_key
 ALGORITHM = settings.hash_algorithm
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expire_minutes
 
+class TokenCache:
+    """
+    Bounded LRU cache of access tokens that already passed signature verification, mapping a hash of the token to its
+    username. Entries expire after ttl seconds and never outlive the token's own `exp` claim, so a cached token is
+    rejected at the same moment jwt.decode would reject it.
+    """
+    def __init__(self, max_size: int, ttl: int):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[bytes, Tuple[str, float]] = OrderedDict()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[str]:
+        """
+        Look up a token in the cache.
+        :param token: Encoded JWT.
+        :return: Username of the token, or None if it is not cached or has expired.
+        """
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] > time.time():
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+        if entry is not None:
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def peek(self, token: str) -> Optional[str]:
+        """
+        Look up a token without counting a hit or a miss nor refreshing its recency, for the checks made before
+        get_current_user.
+        :param token: Encoded JWT.
+        :return: Username of the token, or None if it is not cached or has expired.
+        """
+        entry = self._entries.get(self._key(token))
+        return entry[0] if entry is not None and entry[1] > time.time() else None
+
+    def set(self, token: str, username: str, exp: Optional[float] = None) -> None:
+        """
+        Store a validated token, evicting the least recently used entries beyond max_size.
+        :param token: Encoded JWT.
+        :param username: Subject of the token.
+        :param exp: Expiration timestamp of the token, if it has one.
+        """
+        if self.max_size <= 0:
+            return
+        expires_at = time.time() + self.ttl
+        if exp is not None:
+            expires_at = min(expires_at, exp)
+        self._entries[self._key(token)] = (username, expires_at)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0}
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
+token_cache = TokenCache(max_size=settings.token_cache_size, ttl=settings.token_cache_ttl_seconds)
+registry.register(CallbackMetric(
+    "token_cache_entries", "Validated access tokens in the token cache.", lambda: token_cache.stats()["size"]))
+registry.register(CallbackMetric(
+    "token_cache_hits_total", "Token cache lookups that found the token.", lambda: token_cache.hits, "counter"))
+registry.register(CallbackMetric(
+    "token_cache_misses_total", "Token cache lookups that did not find the token.", lambda: token_cache.misses,
+    "counter"))
+registry.register(CallbackMetric(
+    "token_cache_hit_ratio", "Share of the token cache lookups that found the token since the process started.",
+    lambda: token_cache.stats()["hit_ratio"]))
+password_hash_limiter = CapacityLimiter(settings.password_hash_concurrency)
 
 fake_users_db = {
     "johndoe": {
         "username": "johndoe",
         "full_name": "John Doe",
-        "hashed_password": pwd_context.hash("secret123"),
+        # bcrypt hash of "secret123", stored precomputed so that importing the module does not pay for hashing it
+        "hashed_password": "$2b$12$Gx/GqXYO7XOB9xCqHNkks./LICNllFoLgi4Wswn4LO4YABmqd43Si",
         "disabled": False,
     }
 }
@@ -27,13 +114,23 @@ fake_users_db = {
 def verify_password(plain_password, hashed_password) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+async def verify_password_async(plain_password, hashed_password) -> bool:
+    """
+    Run the bcrypt verification in a worker thread, so that the event loop keeps serving other requests while the
+    hash is computed. At most PASSWORD_HASH_CONCURRENCY verifications run at once, further logins wait for a slot.
+    :param plain_password: Password sent by the client.
+    :param hashed_password: Stored bcrypt hash.
+    :return: True if the password matches the hash.
+    """
+    return await to_thread.run_sync(verify_password, plain_password, hashed_password, limiter=password_hash_limiter)
+
 def get_user(username: str):
     user = fake_users_db.get(username)
     return user
 
-def authenticate_user(username: str, password: str):
+async def authenticate_user(username: str, password: str):
     user = get_user(username)
-    if not user or not verify_password(password, user["hashed_password"]):
+    if not user or not await verify_password_async(password, user["hashed_password"]):
         return False
     return user
 
@@ -50,13 +147,23 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    started = time.perf_counter()
+    username = token_cache.get(token)
+    cache_result = "hit" if username is not None else "miss"
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
         if username is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
+            try:
+                payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+                username: str = payload.get("sub")
+                if username is None:
+                    raise credentials_exception
+            except JWTError:
+                raise credentials_exception
+            token_cache.set(token, username, payload.get("exp"))
+    finally:
+        auth_duration.observe(time.perf_counter() - started, cache_result)
+
+    # The user is looked up on every request, so disabling a user takes effect even for cached tokens
     user = get_user(username)
     if user is None:
         raise credentials_exception
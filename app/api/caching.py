@@ -0,0 +1,144 @@
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Protocol
+
+from app.api.configuration import settings
+from app.schemas.sample import SampleFilter
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    headers: Dict[str, str] = field(default_factory=dict)
+    expires_at: float = 0.0
+
+class CacheBackend(Protocol):
+    """
+    Storage used by the ResponseCache. The default MemoryBackend keeps the entries in the process, any object with
+    these methods (e.g. a wrapper around a shared key-value store) can replace it so that all workers share the cache.
+    """
+    def get(self, key: str) -> Optional[CachedResponse]: ...
+    def set(self, key: str, value: CachedResponse) -> None: ...
+    def delete(self, key: str) -> None: ...
+    def keys(self) -> Iterable[str]: ...
+    def clear(self) -> None: ...
+
+class MemoryBackend:
+    """
+    In-process LRU storage holding at most max_size entries.
+    """
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: OrderedDict[str, CachedResponse] = OrderedDict()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: CachedResponse) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def keys(self) -> Iterable[str]:
+        return list(self._entries)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+class ResponseCache:
+    """
+    Read-through cache of serialized GET /api/samples pages, keyed by the filters and the page (after, limit).
+    Writes invalidate the entries whose filters match the old or new values of the written rows, so unrelated list
+    views stay cached. A generation counter, bumped on each invalidation, prevents a read that raced with a write
+    from storing its (possibly stale) result.
+    """
+    def __init__(self, backend: CacheBackend, ttl: int, enabled: bool = True):
+        self.backend = backend
+        self.ttl = ttl
+        self.enabled = enabled
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key(filters: SampleFilter, after: Optional[str], limit: int) -> str:
+        return json.dumps({"filters": filters.model_dump(mode="json", exclude_none=True), "after": after,
+                           "limit": limit}, sort_keys=True)
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """
+        Look up a page in the cache.
+        :param key: Key built with ResponseCache.key.
+        :return: The cached response, or None if it is missing or expired.
+        """
+        if not self.enabled:
+            return None
+        value = self.backend.get(key)
+        if value is not None and value.expires_at > time.monotonic():
+            self.hits += 1
+            return value
+        self.misses += 1
+        return None
+
+    def set(self, key: str, body: bytes, headers: Dict[str, str], generation: int) -> None:
+        """
+        Store a page, unless the cache was invalidated since the page was read from the database.
+        :param key: Key built with ResponseCache.key.
+        :param body: Serialized response body.
+        :param headers: Headers to send along with the body (ETag, pagination cursor).
+        :param generation: Value of ResponseCache.generation before the page was read.
+        """
+        if self.enabled and generation == self.generation:
+            self.backend.set(key, CachedResponse(body=body, headers=headers, expires_at=time.monotonic() + self.ttl))
+
+    def invalidate(self, rows: List[dict]) -> None:
+        """
+        Drop the cached pages that may contain any of the given rows.
+        :param rows: Column values of the written samples, both before and after the write for updates.
+        """
+        self.generation += 1
+        self.invalidations += 1
+        for key in self.backend.keys():
+            entry = json.loads(key)
+            filters = SampleFilter.model_validate(entry["filters"])
+            if any(filters.matches(row) and (entry["after"] is None or row["sample_id"] > entry["after"])
+                   for row in rows):
+                self.backend.delete(key)
+
+    def clear(self) -> None:
+        """
+        Drop every cached page, used by bulk writes whose rows are not known one by one.
+        """
+        self.generation += 1
+        self.invalidations += 1
+        self.backend.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {"enabled": self.enabled, "size": len(list(self.backend.keys())), "hits": self.hits,
+                "misses": self.misses, "hit_rate": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations}
+
+# Pages cached by default when the application runs in a single worker
+DEFAULT_RESPONSE_CACHE_SIZE = 256
+
+def response_cache_size(settings) -> int:
+    """
+    :return: RESPONSE_CACHE_SIZE if set, else DEFAULT_RESPONSE_CACHE_SIZE with a single worker and 0 with several, whose
+    in-memory caches are not invalidated by the writes of the other workers.
+    """
+    if settings.response_cache_size is not None:
+        return settings.response_cache_size
+    return DEFAULT_RESPONSE_CACHE_SIZE if settings.web_concurrency <= 1 else 0
+
+response_cache = ResponseCache(backend=MemoryBackend(max_size=max(response_cache_size(settings), 1)),
+                               ttl=settings.response_cache_ttl_seconds, enabled=response_cache_size(settings) > 0)
@@ -0,0 +1,171 @@
+import asyncio
+import time
+from typing import AsyncIterator, List, Set
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.api.configuration import settings
+from app.api.metrics import request_stats
+from app.db.models import ChangeOperation, SampleChange
+from app.db.session import get_read_db
+from app.schemas.sample import SampleChangeFeed, SampleChangeRead, SampleRead
+
+router = APIRouter()
+
+DEFAULT_FEED_LIMIT = 1000
+MAX_FEED_LIMIT = 10000
+MAX_WAIT_SECONDS = 30
+# Idle time after which an SSE comment is sent, so that proxies do not close the connection
+HEARTBEAT_SECONDS = 15
+# Dialects on which sample_changes is written, by the triggers of SAMPLE_CHANGE_TRIGGERS in app/db/models.py
+CHANGE_LOG_DIALECTS = ("sqlite",)
+
+def _wake(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+class ChangeNotifier:
+    """
+    Wakes up the change feed requests waiting for new changes when a session of this process commits. Commits of
+    other processes are picked up by the waiters polling every CHANGE_FEED_POLL_SECONDS.
+    """
+    def __init__(self):
+        self._waiters: Set[asyncio.Future] = set()
+
+    def notify(self) -> None:
+        for waiter in list(self._waiters):
+            waiter.get_loop().call_soon_threadsafe(_wake, waiter)
+
+    async def wait(self, timeout: float) -> None:
+        """
+        Wait until the next commit or the timeout, whichever comes first. The time waited is added to the statistics
+        of the request, so that the slow request log does not count a long poll as processing time.
+        :param timeout: Maximum time to wait in seconds.
+        """
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.add(waiter)
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._waiters.discard(waiter)
+            stats = request_stats.get()
+            if stats is not None:
+                stats.wait_duration += time.perf_counter() - started
+
+change_notifier = ChangeNotifier()
+
+@event.listens_for(Session, "after_commit")
+def _notify_change_feed(session: Session) -> None:
+    change_notifier.notify()
+
+async def _read_changes(db: AsyncSession, since: int, limit: int) -> List[SampleChange]:
+    """
+    Read the changes following a sequence number, then end the read transaction: the connection goes back to the
+    pool while waiting, and the next read sees the changes committed in the meantime.
+    """
+    changes = (await db.scalars(select(SampleChange).where(SampleChange.sequence > since)
+                                .order_by(SampleChange.sequence).limit(limit))).all()
+    await db.close()
+    return changes
+
+def _check_change_log(db: AsyncSession) -> None:
+    """
+    Refuse to serve the feed from a database whose writes are not logged, rather than answering with no changes.
+    :param db: Database session of the request.
+    """
+    dialect = db.bind.dialect.name
+    if dialect not in CHANGE_LOG_DIALECTS:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED,
+                            detail=f"The change feed is not available on {dialect}, its writes are not logged")
+
+def _change_read(change: SampleChange) -> SampleChangeRead:
+    sample = None if change.operation is ChangeOperation.deleted else SampleRead.model_validate(change)
+    return SampleChangeRead(sequence=change.sequence, operation=change.operation, sample_id=change.sample_id,
+                            changed_at=change.changed_at, sample=sample)
+
+@router.get("/changes/samples", response_model=SampleChangeFeed)
+async def read_sample_changes(
+    since: int = Query(0, ge=0, description="Sequence of the last change already applied, 0 to read from the start"),
+    limit: int = Query(DEFAULT_FEED_LIMIT, ge=1, le=MAX_FEED_LIMIT, description="Maximum number of changes"),
+    wait: float = Query(0, ge=0, le=MAX_WAIT_SECONDS,
+                        description="Seconds to wait for a change when there is none yet (long polling)"),
+    db: AsyncSession = Depends(get_read_db)) -> SampleChangeFeed:
+    """
+    Return the changes of the samples following a sequence number, in sequence order, so that a mirror of the table
+    stays in sync by applying them (created and updated samples come with their values) and asking again with the
+    returned last_sequence. Reading from 0 replays the whole table. With `wait`, the request is held until a change
+    arrives or the time runs out.
+    :param since: Sequence number of the last change already applied.
+    :param limit: Maximum number of changes to return.
+    :param wait: Maximum time to wait for a change, in seconds.
+    :param db: Database session dependency.
+    :return: SampleChangeFeed with the changes and the sequence to pass as `since` next time.
+    """
+    _check_change_log(db)
+    deadline = time.monotonic() + wait
+    while True:
+        changes = await _read_changes(db, since, limit)
+        remaining = deadline - time.monotonic()
+        if changes or remaining <= 0:
+            break
+        await change_notifier.wait(min(remaining, settings.change_feed_poll_seconds))
+    return SampleChangeFeed(changes=[_change_read(change) for change in changes],
+                            last_sequence=changes[-1].sequence if changes else since)
+
+async def _stream_changes(since: int, db: AsyncSession) -> AsyncIterator[bytes]:
+    """
+    Encode the changes following a sequence number as Server-Sent Events, then keep the stream open and send the new
+    changes as they are committed. The id of each event is its sequence number. The generator owns the session and
+    closes it when the client disconnects.
+    :param since: Sequence number of the last change already applied.
+    :param db: Database session used to read the changes.
+    :return: Iterator of encoded events.
+    """
+    try:
+        idle = 0.0
+        while True:
+            changes = await _read_changes(db, since, DEFAULT_FEED_LIMIT)
+            for change in changes:
+                yield (f"id: {change.sequence}\nevent: change\n"
+                       f"data: {_change_read(change).model_dump_json()}\n\n").encode()
+            if changes:
+                since, idle = changes[-1].sequence, 0.0
+                if len(changes) == DEFAULT_FEED_LIMIT:
+                    continue
+            started = time.monotonic()
+            await change_notifier.wait(settings.change_feed_poll_seconds)
+            idle += time.monotonic() - started
+            if idle >= HEARTBEAT_SECONDS:
+                idle = 0.0
+                yield b": keep-alive\n\n"
+    finally:
+        await db.close()
+
+@router.get("/changes/samples/stream", response_class=StreamingResponse)
+async def stream_sample_changes(
+    request: Request,
+    since: int = Query(0, ge=0, description="Sequence of the last change already applied, 0 to read from the start"),
+    db: AsyncSession = Depends(get_read_db)) -> StreamingResponse:
+    """
+    Stream the changes of the samples as Server-Sent Events (text/event-stream), from a sequence number and then live.
+    EventSource clients reconnecting with a Last-Event-ID header resume after that event instead of `since`.
+    :param request: Incoming request, used for the Last-Event-ID header.
+    :param since: Sequence number of the last change already applied.
+    :param db: Database session dependency.
+    :return: StreamingResponse of the events, until the client disconnects.
+    """
+    _check_change_log(db)
+    last_event_id = request.headers.get("last-event-id")
+    if last_event_id is not None:
+        if not last_event_id.isdigit():
+            raise HTTPException(status_code=422, detail="Last-Event-ID must be a sequence number")
+        since = int(last_event_id)
+    return StreamingResponse(_stream_changes(since, db), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
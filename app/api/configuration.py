@@ -1,4 +1,6 @@
 import os
+from typing import Dict, List, Optional, Union
+
 from pydantic_settings import BaseSettings
 
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -10,6 +12,69 @@ class Settings(BaseSettings):
     access_token_expire_minutes: int
     project_root: str = PROJECT_ROOT
 
+    # Worker processes serving the application, exported by gunicorn.conf.py
+    web_concurrency: int = 1
+
+    # Validated access tokens kept in memory by get_current_user, a size of 0 disables the cache
+    token_cache_size: int = 1024
+    token_cache_ttl_seconds: int = 300
+
+    # Maximum number of bcrypt verifications running at once in the worker threads
+    password_hash_concurrency: int = 4
+
+    # Serialized GET /api/samples pages kept in memory, a size of 0 disables the cache. Unset, the cache holds 256 pages
+    # with a single worker and is disabled with several, as a page cached by one worker stays stale after a write
+    # handled by another
+    response_cache_size: Optional[int] = None
+    response_cache_ttl_seconds: int = 30
+
+    # Serve the statistics endpoint from the trigger-maintained sample_counts table (SQLite only)
+    statistics_summary_table: bool = True
+
+    # Positions of a storage box, used to report the free slots of a box by GET /api/locations/occupancy
+    box_capacity: int = 81
+
+    # Interval at which the change feed checks for writes made by other processes, writes of this process wake it up
+    change_feed_poll_seconds: float = 1.0
+
+    # Requests per second allowed to each user on average, in bursts of up to rate_limit_burst, 0 disables the limit
+    rate_limit_per_second: float = 50.0
+    rate_limit_burst: int = 100
+
+    # Listings, exports, statistics and searches processed at once by each worker, further ones get a 429, 0 disables
+    expensive_request_concurrency: int = 8
+
+    # Profile every request (SQL statements with their query plans and a Python call breakdown), e.g. on staging.
+    # The users of profiling_users can profile single requests by sending an X-Profile header
+    profile_requests: bool = False
+    profiling_users: List[str] = []
+    # Requests taking longer than this are logged with their database time, 0 disables the log
+    slow_request_seconds: float = 1.0
+
+    # Archived samples not updated for archive_after_days are moved to the archived_samples table by a background task
+    # of each worker, every archive_interval_seconds in batches of archive_batch_size, 0 days disables it
+    archive_after_days: int = 0
+    archive_interval_seconds: int = 3600
+    archive_batch_size: int = 500
+
+    # Connection pool of the database engine (not used for in-memory SQLite)
+    database_pool_size: int = 10
+    database_max_overflow: int = 10
+    database_pool_timeout: int = 30
+
+    # PRAGMAs applied to each new SQLite connection: a profile from app/db/session.py plus individual overrides,
+    # e.g. SQLITE_PRAGMAS='{"mmap_size": 0}'
+    sqlite_profile: str = "production"
+    sqlite_pragmas: Dict[str, Union[int, str]] = {}
+
+    # Read-only replicas serving the GET endpoints round-robin, e.g. DATABASE_REPLICA_URLS='["sqlite:///./replica.db"]'.
+    # A client that wrote within the last read_your_writes_seconds keeps reading from the primary, 0 disables this
+    database_replica_urls: List[str] = []
+    read_your_writes_seconds: float = 5.0
+
+    # Encode sample listings with orjson from the selected columns, instead of ORM objects validated by Pydantic
+    fast_json_serialization: bool = False
+
     class Config:
         env_file = os.path.join(PROJECT_ROOT, '.env')
         frozen = True  # Prevents modification of settings after initialization
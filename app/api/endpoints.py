@@ -1,96 +1,544 @@
-from typing import Optional, List
+import codecs
+import csv
+import hashlib
+import io
+import json
+from typing import Optional, List, AsyncIterator, Iterator, Tuple
+from uuid import uuid4
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import Select, select, insert, update, delete, func, union_all
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.schemas.sample import SampleCreate, SampleRead, SampleUpdate
-from app.db.models import Sample, SampleType, StatusType
-from app.db.session import get_db
+from app.schemas.sample import (SampleCreate, SampleRead, SampleUpdate, SampleFilter, BulkUpdate, BulkDelete,
+                                BulkWriteResult, BulkCreateResult, BulkRowError, SampleLookup, SampleLookupResult,
+                                SampleSelection)
+from app.db.archive import restore_samples
+from app.db.locations import register_locations
+from app.db.models import ArchivedSample, Sample
+from app.db.session import get_db, get_read_db
+from app.api.caching import ResponseCache, response_cache
+from app.api.configuration import settings
+from app.api.filters import sample_filters, sample_conditions, sample_models
+from app.api.ratelimit import limit_concurrency
 
 router = APIRouter()
 
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+BULK_CHUNK_SIZE = 1000
+
+samples_adapter = TypeAdapter(List[SampleRead])
+
+# Fields of SampleRead and the matching columns, selected as plain tuples by the fast serialization path
+SAMPLE_READ_FIELDS = list(SampleRead.model_fields)
+SAMPLE_READ_COLUMNS = [getattr(Sample, field) for field in SAMPLE_READ_FIELDS]
+
+def _sample_row_json(row, option: Optional[int] = None) -> bytes:
+    """
+    Encode a row selected with SAMPLE_READ_COLUMNS straight to JSON, skipping the ORM objects and Pydantic validation.
+    The output is the same as SampleRead's: same key order, enums by value and ISO dates.
+    :param row: Row whose first columns are SAMPLE_READ_COLUMNS, extra trailing columns are ignored.
+    :param option: orjson options, e.g. orjson.OPT_APPEND_NEWLINE.
+    :return: Encoded JSON object.
+    """
+    return orjson.dumps(dict(zip(SAMPLE_READ_FIELDS, row)), option=option)
+
+def _sample_values(db_sample: Sample) -> dict:
+    """
+    Snapshot the column values of a sample, used to invalidate the cached listings it appears in.
+    :param db_sample: Sample ORM object.
+    :return: Dictionary of column name to value.
+    """
+    return {column.key: getattr(db_sample, column.key) for column in Sample.__table__.columns}
+
 @router.post("/samples", response_model=SampleRead)
-def create_sample(sample: SampleCreate, db: Session = Depends(get_db)) -> SampleRead:
+async def create_sample(sample: SampleCreate, db: AsyncSession = Depends(get_db)) -> SampleRead:
     """
     Create a new sample in the database.
     :param sample: SampleCreate schema containing the details of the sample to be created.
     :param db: Database session dependency.
     :return: SampleRead schema containing the details of the created sample.
     """
+    await register_locations(db, [sample.storage_location])
     db_sample = Sample(**sample.model_dump())
     db.add(db_sample)
-    db.commit()
-    db.refresh(db_sample)
+    await db.commit()
+    await db.refresh(db_sample)
+    response_cache.invalidate([_sample_values(db_sample)])
     return db_sample
 
-@router.get("/samples/{sample_id}", response_model=SampleRead)
-def read_sample(sample_id: str, db: Session = Depends(get_db)) -> SampleRead:
+def _decode_body(body: bytes, content_type_parameters: str) -> str:
+    """
+    Decode the body of an upload with the charset parameter of its Content-Type.
+    :param body: Raw request body.
+    :param content_type_parameters: Parameters following the media type in the Content-Type header, e.g. charset=cp1252.
+    :return: Decoded text, without a leading byte order mark.
+    """
+    charset = "utf-8"
+    for parameter in content_type_parameters.split(";"):
+        name, _, value = parameter.partition("=")
+        if name.strip().lower() == "charset":
+            charset = value.strip().strip('"').lower()
+    try:
+        codec = "utf-8-sig" if codecs.lookup(charset).name == "utf-8" else charset
+        return body.decode(codec).removeprefix("\ufeff")
+    except LookupError:
+        raise HTTPException(status_code=415, detail=f"Unsupported charset: {charset}")
+    except UnicodeDecodeError as e:
+        raise HTTPException(status_code=422, detail=f"Body is not valid {charset}: {e.reason} at byte {e.start}")
+
+async def _read_bulk_rows(request: Request) -> List[object]:
+    """
+    Dependency that parses the body of a bulk upload into a list of raw rows. The format is selected from the
+    Content-Type header: a JSON array (application/json), one JSON object per line (application/x-ndjson) or a CSV
+    file with a header row (text/csv). The body is decoded with the charset of the Content-Type, UTF-8 by default,
+    ignoring a leading byte order mark as written by spreadsheet exports. Lines that cannot be parsed are kept as their
+    raw text so that they are reported as row errors instead of rejecting the whole upload.
+    :param request: Incoming request.
+    :return: List with one entry per uploaded row.
+    """
+    content_type, _, parameters = request.headers.get("content-type", "application/json").partition(";")
+    content_type = content_type.strip().lower()
+    if content_type not in ("application/json", "application/x-ndjson", "text/csv"):
+        raise HTTPException(status_code=415, detail=f"Unsupported content type: {content_type}")
+    body = _decode_body(await request.body(), parameters)
+
+    if content_type == "application/json":
+        try:
+            rows = json.loads(body or "[]")
+        except ValueError:
+            raise HTTPException(status_code=422, detail="Body is not valid JSON")
+        if not isinstance(rows, list):
+            raise HTTPException(status_code=422, detail="Body must be a JSON array of samples")
+        return rows
+    elif content_type == "application/x-ndjson":
+        rows = []
+        for line in body.splitlines():
+            if line.strip():
+                try:
+                    rows.append(json.loads(line))
+                except ValueError:
+                    rows.append(line)
+        return rows
+    else:
+        return list(csv.DictReader(io.StringIO(body)))
+
+async def _insert_chunk(db: AsyncSession, chunk: List[Tuple[int, dict]]) -> List[BulkRowError]:
+    """
+    Insert a chunk of validated samples with a single executemany in its own transaction. If the batch is rejected by
+    the database, the chunk is retried row by row so that only the offending rows are reported.
+    :param db: Database session.
+    :param chunk: Pairs of (row index in the upload, column values of the sample including its sample_id).
+    :return: Errors of the rows that could not be inserted.
+    """
+    try:
+        await register_locations(db, (values["storage_location"] for _, values in chunk))
+        await db.execute(insert(Sample), [values for _, values in chunk])
+        await db.commit()
+        return []
+    except SQLAlchemyError:
+        await db.rollback()
+
+    errors = []
+    for index, values in chunk:
+        try:
+            await register_locations(db, [values["storage_location"]])
+            await db.execute(insert(Sample), [values])
+            await db.commit()
+        except SQLAlchemyError as e:
+            await db.rollback()
+            errors.append(BulkRowError(index=index, errors=[{"type": "database_error", "msg": str(e.orig or e)}]))
+    return errors
+
+@router.post("/samples/bulk", response_model=BulkCreateResult, openapi_extra={"requestBody": {"content": {
+    "application/json": {"schema": {"type": "array", "items": SampleCreate.model_json_schema()}},
+    "application/x-ndjson": {"schema": {"type": "string"}},
+    "text/csv": {"schema": {"type": "string"}},
+}}})
+async def create_samples_bulk(rows: List[object] = Depends(_read_bulk_rows),
+                              db: AsyncSession = Depends(get_db)) -> BulkCreateResult:
+    """
+    Create many samples in a single request. Rows are validated with the SampleCreate schema and inserted in chunks
+    of BULK_CHUNK_SIZE, one transaction per chunk. Invalid rows are reported by their position in the upload and do
+    not prevent the valid rows from being created.
+    :param rows: Rows parsed from the request body (JSON array, NDJSON or CSV).
+    :param db: Database session dependency.
+    :return: BulkCreateResult with the IDs of the created samples and the errors of the rejected rows.
+    """
+    sample_ids, errors = [], []
+
+    for start in range(0, len(rows), BULK_CHUNK_SIZE):
+        chunk = []
+        for index, row in enumerate(rows[start:start + BULK_CHUNK_SIZE], start=start):
+            try:
+                sample = SampleCreate.model_validate(row)
+            except ValidationError as e:
+                errors.append(BulkRowError(index=index, errors=e.errors(include_url=False, include_context=False)))
+            else:
+                chunk.append((index, {"sample_id": str(uuid4()), **sample.model_dump()}))
+
+        if chunk:
+            chunk_errors = await _insert_chunk(db, chunk)
+            failed = {error.index for error in chunk_errors}
+            sample_ids.extend(values["sample_id"] for index, values in chunk if index not in failed)
+            errors.extend(chunk_errors)
+
+    if sample_ids:
+        response_cache.clear()
+    errors.sort(key=lambda error: error.index)
+    return BulkCreateResult(created=len(sample_ids), sample_ids=sample_ids, errors=errors)
+
+def _selection_chunks(selection: SampleSelection) -> Iterator[SampleSelection]:
+    """
+    Split a selection into selections of at most BULK_CHUNK_SIZE distinct sample_ids each, as lookup_samples does, so
+    that each IN list stays under the bound parameter limit of the database. Selections by filters only are kept whole.
+    :param selection: BulkUpdate or BulkDelete schema.
+    :return: Iterator of copies of the selection, one per chunk of IDs.
+    """
+    if selection.sample_ids is None:
+        yield selection
+        return
+    sample_ids = list(dict.fromkeys(selection.sample_ids))
+    for start in range(0, len(sample_ids), BULK_CHUNK_SIZE):
+        yield selection.model_copy(update={"sample_ids": sample_ids[start:start + BULK_CHUNK_SIZE]})
+
+@router.patch("/samples/bulk", response_model=BulkWriteResult)
+async def update_samples_bulk(bulk_update: BulkUpdate, db: AsyncSession = Depends(get_db)) -> BulkWriteResult:
+    """
+    Update every sample matching a list of IDs and/or filters with one UPDATE statement per BULK_CHUNK_SIZE of IDs, in
+    a single transaction. The matching samples of archived_samples are moved back to samples first, as by
+    PUT /api/samples/{sample_id}.
+    :param bulk_update: BulkUpdate schema with the selection, the fields to change and whether to return the rows.
+    :param db: Database session dependency.
+    :return: BulkWriteResult with the number of updated samples and, if requested, their new values.
+    """
+    changes = bulk_update.changes.model_dump(exclude_unset=True)
+    if not changes:
+        raise HTTPException(status_code=422, detail="No fields to update")
+    if "storage_location" in changes:
+        await register_locations(db, [changes["storage_location"]])
+
+    samples, affected = [], 0
+    for chunk in _selection_chunks(bulk_update):
+        if ArchivedSample in sample_models(chunk):
+            await restore_samples(db, sample_conditions(chunk, ArchivedSample))
+        statement = (update(Sample).where(*sample_conditions(chunk)).values(**changes)
+                     .execution_options(synchronize_session=False))
+        if bulk_update.returning:
+            samples.extend(SampleRead.model_validate(sample)
+                           for sample in (await db.scalars(statement.returning(Sample))).all())
+        else:
+            affected += (await db.execute(statement)).rowcount
+    await db.commit()
+    response_cache.clear()
+    if bulk_update.returning:
+        return BulkWriteResult(affected=len(samples), samples=samples)
+    return BulkWriteResult(affected=affected)
+
+@router.delete("/samples/bulk", response_model=BulkWriteResult)
+async def delete_samples_bulk(bulk_delete: BulkDelete, db: AsyncSession = Depends(get_db)) -> BulkWriteResult:
     """
-    Retrieve a sample by its ID.
+    Delete every sample matching a list of IDs and/or filters with one DELETE statement on samples and one on
+    archived_samples per BULK_CHUNK_SIZE of IDs, in a single transaction.
+    :param bulk_delete: BulkDelete schema with the selection and whether to return the deleted rows.
+    :param db: Database session dependency.
+    :return: BulkWriteResult with the number of deleted samples and, if requested, their last values.
+    """
+    samples, affected = [], 0
+    for chunk in _selection_chunks(bulk_delete):
+        for model in sample_models(chunk):
+            statement = (delete(model).where(*sample_conditions(chunk, model))
+                         .execution_options(synchronize_session=False))
+            if bulk_delete.returning:
+                samples.extend(SampleRead.model_validate(sample)
+                               for sample in (await db.scalars(statement.returning(model))).all())
+            else:
+                affected += (await db.execute(statement)).rowcount
+    await db.commit()
+    response_cache.clear()
+    if bulk_delete.returning:
+        return BulkWriteResult(affected=len(samples), samples=samples)
+    return BulkWriteResult(affected=affected)
+
+@router.post("/samples/lookup", response_model=SampleLookupResult)
+async def lookup_samples(lookup: SampleLookup, db: AsyncSession = Depends(get_read_db)) -> SampleLookupResult:
+    """
+    Retrieve many samples by their IDs in one call, e.g. every tube of a scanned rack, instead of one GET per sample.
+    The IDs are looked up with one IN query per BULK_CHUNK_SIZE of them, so that the statement stays under the bound
+    parameter limit of the database, and those not found are then looked up in archived_samples.
+    :param lookup: SampleLookup schema with the IDs to retrieve, duplicates are ignored.
+    :param db: Database session dependency.
+    :return: SampleLookupResult with the samples found, in the order of the requested IDs, and the IDs not found.
+    """
+    sample_ids = list(dict.fromkeys(lookup.sample_ids))
+    found = {}
+    for model in (Sample, ArchivedSample):
+        pending = [sample_id for sample_id in sample_ids if sample_id not in found]
+        for start in range(0, len(pending), BULK_CHUNK_SIZE):
+            chunk = pending[start:start + BULK_CHUNK_SIZE]
+            found.update((sample.sample_id, sample)
+                         for sample in await db.scalars(select(model).where(model.sample_id.in_(chunk))))
+    return SampleLookupResult(samples=[SampleRead.model_validate(found[sample_id])
+                                       for sample_id in sample_ids if sample_id in found],
+                              missing=[sample_id for sample_id in sample_ids if sample_id not in found])
+
+def _etag(*parts) -> str:
+    """
+    Build a strong ETag from the values that identify a version of a resource.
+    :param parts: Values identifying the version, e.g. the ID and last update time of a sample.
+    :return: Quoted ETag.
+    """
+    return '"' + hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest() + '"'
+
+def _matches_if_none_match(request: Request, etag: str) -> bool:
+    """
+    Check the ETag of the current representation against the If-None-Match header of the request. As required for
+    If-None-Match, the comparison is weak: a W/ prefix on the client side is ignored.
+    :param request: Incoming request.
+    :param etag: ETag of the current representation.
+    :return: True if the client already has this representation and a 304 can be returned.
+    """
+    header = request.headers.get("if-none-match")
+    if header is None:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in header.split(","))
+
+@router.get("/samples/{sample_id}", response_model=SampleRead, responses={304: {"description": "Not modified"}})
+async def read_sample(sample_id: str, request: Request, response: Response,
+                      db: AsyncSession = Depends(get_read_db)) -> SampleRead:
+    """
+    Retrieve a sample by its ID, from archived_samples if it was moved there. The response carries an ETag; when the
+    request sends it back in If-None-Match and the sample did not change, only its update time is read and a 304 is
+    returned.
     :param sample_id: The ID of the sample to retrieve.
+    :param request: Incoming request, used for the If-None-Match header.
+    :param response: Response object used to set the ETag header.
     :param db: Database session dependency.
     :return: SampleRead schema containing the details of the retrieved sample.
     """
-    db_sample = db.query(Sample).filter(Sample.sample_id == sample_id).first()
+    if "if-none-match" in request.headers:
+        updated_at = (
+            await db.scalar(select(Sample.updated_at).where(Sample.sample_id == sample_id))
+            or await db.scalar(select(ArchivedSample.updated_at).where(ArchivedSample.sample_id == sample_id)))
+        etag = _etag(sample_id, updated_at)
+        if updated_at is not None and _matches_if_none_match(request, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    db_sample = (await db.scalar(select(Sample).where(Sample.sample_id == sample_id))
+                 or await db.scalar(select(ArchivedSample).where(ArchivedSample.sample_id == sample_id)))
     if not db_sample:
         raise HTTPException(status_code=404, detail="Sample not found")
     else:
+        response.headers["ETag"] = _etag(db_sample.sample_id, db_sample.updated_at)
         return db_sample
 
-@router.get("/samples", response_model=List[SampleRead])
-def read_samples(
-    sample_status: Optional[StatusType] = Query(None, description="Filter by sample status"),
-    sample_type: Optional[SampleType] = Query(None, description="Filter by sample type"),
-    db: Session = Depends(get_db)) -> List[SampleRead]:
+async def _stream_samples(conditions: list, db: AsyncSession,
+                          statement: Optional[Select] = None) -> AsyncIterator[bytes]:
+    """
+    Encode the matching samples as NDJSON, one sample per line, in ID order. Rows are fetched from the cursor in
+    batches of STREAM_BATCH_SIZE, so only one batch is held in memory at a time. The generator owns the session and
+    closes it once the stream is exhausted or the client disconnects.
+    :param conditions: Filter conditions over Sample.
+    :param db: Database session used to run the query.
+    :param statement: Query of rows starting with SAMPLE_READ_COLUMNS to stream instead of the matching samples, its
+        rows are always encoded with orjson.
+    :return: Iterator of encoded NDJSON lines.
+    """
+    options = {"yield_per": STREAM_BATCH_SIZE}
+    try:
+        if statement is not None or settings.fast_json_serialization:
+            if statement is None:
+                statement = select(*SAMPLE_READ_COLUMNS).where(*conditions).order_by(Sample.sample_id)
+            async for row in await db.stream(statement.execution_options(**options)):
+                yield _sample_row_json(row, orjson.OPT_APPEND_NEWLINE)
+        else:
+            statement = select(Sample).where(*conditions).order_by(Sample.sample_id)
+            async for db_sample in await db.stream_scalars(statement.execution_options(**options)):
+                yield SampleRead.model_validate(db_sample).model_dump_json().encode() + b"\n"
+    finally:
+        await db.close()
+
+def _samples_with_archived(filters: SampleFilter, after: Optional[str], limit: Optional[int]) -> Select:
     """
-    Retrieve all samples from the database.
-    :param sample_type: Filter by sample type (e.g., blood, saliva, tissue).
-    :param sample_status: Filter by sample status (e.g., collected, processing, archived).
+    Select the samples matching the filters from samples and archived_samples as a single set in ID order. Each table
+    is filtered, ordered and limited before the union, so a page reads at most `limit` rows of each through its
+    primary key instead of sorting every matching row.
+    :param filters: Sample filters.
+    :param after: Sample ID of the last row of the previous page.
+    :param limit: Maximum number of rows, None to select them all.
+    :return: Query of rows of SAMPLE_READ_COLUMNS followed by updated_at.
+    """
+    selects = []
+    for model in sample_models(filters):
+        conditions = sample_conditions(filters, model)
+        if after is not None:
+            conditions.append(model.sample_id > after)
+        rows = (select(*(getattr(model, field) for field in SAMPLE_READ_FIELDS), model.updated_at)
+                .where(*conditions).order_by(model.sample_id).limit(limit).subquery())
+        selects.append(select(rows))
+    samples = union_all(*selects).subquery()
+    return select(samples).order_by(samples.c.sample_id).limit(limit)
+
+def _page_headers(samples: list, limit: int) -> dict:
+    """
+    Build the headers of a page of samples: its ETag, derived from the size, first and last IDs and latest update time
+    of the page, and the cursor of the next page when the page is full.
+    :param samples: Samples or rows of the page, with sample_id and updated_at attributes.
+    :param limit: Page size requested.
+    :return: Dictionary of headers.
+    """
+    headers = {"ETag": _etag(len(samples), samples[0].sample_id if samples else None,
+                             samples[-1].sample_id if samples else None,
+                             max((sample.updated_at for sample in samples), default=None))}
+    if len(samples) == limit:
+        headers[NEXT_CURSOR_HEADER] = samples[-1].sample_id
+    return headers
+
+async def _read_samples_with_archived(request: Request, filters: SampleFilter, limit: int, after: Optional[str],
+                                      stream: bool, db: AsyncSession) -> Response:
+    """
+    GET /api/samples with include_archived: the pages and streams of _samples_with_archived, encoded with orjson from
+    the selected columns. Archived samples are rarely asked for, so these pages are not cached and the If-None-Match
+    check compares the ETag of the page once read.
+    """
+    if stream:
+        return StreamingResponse(_stream_samples([], db, _samples_with_archived(filters, after, None)),
+                                 media_type="application/x-ndjson")
+
+    samples = (await db.execute(_samples_with_archived(filters, after, limit))).all()
+    headers = _page_headers(samples, limit)
+    if _matches_if_none_match(request, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    body = b"[" + b",".join(_sample_row_json(row) for row in samples) + b"]"
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@router.get("/samples", response_model=List[SampleRead], responses={304: {"description": "Not modified"}},
+            dependencies=[Depends(limit_concurrency)])
+async def read_samples(
+    request: Request,
+    filters: SampleFilter = Depends(sample_filters),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of samples per page"),
+    after: Optional[str] = Query(None, description="Return samples whose ID sorts after this cursor"),
+    stream: bool = Query(False, description="Stream every matching sample as NDJSON instead of a single page"),
+    include_archived: bool = Query(False, description="Also return the samples moved to the archived_samples table"),
+    db: AsyncSession = Depends(get_read_db)) -> List[SampleRead]:
+    """
+    Retrieve samples from the database, ordered by their ID and paginated with a keyset cursor. When a page is full,
+    the cursor for the next page is returned in the X-Next-Cursor header and can be passed back as `after`.
+    Pages carry an ETag derived from the size, first and last IDs and latest update time of the page. When it is
+    sent back in If-None-Match, these are computed with a single aggregate query and a 304 is returned if they match.
+    Serialized pages are kept in the response cache until a write touches a sample matching their filters. Clients
+    that wrote recently skip the cache lookup, as the page may have been cached before their write reached the
+    primary. Only pages read from the primary are cached: a lagging replica could store a page older than the last
+    invalidation, which would then be served to every client until it expires. With
+    FAST_JSON_SERIALIZATION, only the returned columns are selected and encoded with orjson, without ORM objects.
+    Only the hot samples table is read, unless include_archived asks to merge in the samples moved to archived_samples.
+    :param request: Incoming request, used for the If-None-Match header.
+    :param filters: Sample filters taken from the query string.
+    :param limit: Maximum number of samples to return, ignored when streaming.
+    :param after: Sample ID of the last row of the previous page.
+    :param stream: If set, every matching sample after the cursor is streamed as application/x-ndjson.
+    :param include_archived: If set, the samples of archived_samples are returned too, in the same ID order.
     :param db: Database session dependency.
-    :return: List of SampleRead schemas containing the details of all samples.
+    :return: List of SampleRead schemas containing the details of the samples in the page.
     """
-    query = db.query(Sample)
+    if include_archived:
+        return await _read_samples_with_archived(request, filters, limit, after, stream, db)
+
+    conditions = sample_conditions(filters)
+    if after is not None:
+        conditions.append(Sample.sample_id > after)
+
+    if stream:
+        return StreamingResponse(_stream_samples(conditions, db), media_type="application/x-ndjson")
 
-    if sample_status:
-        query = query.filter(Sample.status == sample_status)
-    if sample_type:
-        query = query.filter(Sample.sample_type == sample_type)
+    cache_key = ResponseCache.key(filters, after, limit)
+    cached = None if db.info.get("read_your_writes") else response_cache.get(cache_key)
+    if cached is not None:
+        if _matches_if_none_match(request, cached.headers["ETag"]):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cached.headers)
+        return Response(content=cached.body, media_type="application/json", headers=cached.headers)
+    generation = response_cache.generation
 
-    return query.all()
+    if "if-none-match" in request.headers:
+        page = (select(Sample.sample_id, Sample.updated_at).where(*conditions)
+                .order_by(Sample.sample_id).limit(limit).subquery())
+        version = (await db.execute(select(func.count(), func.min(page.c.sample_id), func.max(page.c.sample_id),
+                                           func.max(page.c.updated_at)))).one()
+        etag = _etag(*version)
+        if _matches_if_none_match(request, etag):
+            headers = {"ETag": etag}
+            if version[0] == limit:
+                headers[NEXT_CURSOR_HEADER] = version[2]
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if settings.fast_json_serialization:
+        samples = (await db.execute(select(*SAMPLE_READ_COLUMNS, Sample.updated_at).where(*conditions)
+                                    .order_by(Sample.sample_id).limit(limit))).all()
+        body = b"[" + b",".join(_sample_row_json(row) for row in samples) + b"]"
+    else:
+        samples = (await db.scalars(select(Sample).where(*conditions).order_by(Sample.sample_id).limit(limit))).all()
+        body = samples_adapter.dump_json(samples_adapter.validate_python(samples, from_attributes=True))
+
+    headers = _page_headers(samples, limit)
+    if not db.info.get("replica"):
+        response_cache.set(cache_key, body, headers, generation)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @router.delete("/samples/{sample_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_sample(sample_id: str, db: Session = Depends(get_db)) -> None:
+async def delete_sample(sample_id: str, db: AsyncSession = Depends(get_db)) -> None:
     """
-    Delete a sample by its ID.
+    Delete a sample by its ID, from archived_samples if it was moved there.
     :param sample_id: The ID of the sample to delete.
     :param db: Database session dependency.
     """
-    db_sample = db.query(Sample).filter(Sample.sample_id == sample_id).first()
-    if not db_sample:
-        raise HTTPException(status_code=404, detail="Sample not found")
+    db_sample = await db.scalar(select(Sample).where(Sample.sample_id == sample_id))
+    if db_sample:
+        values = _sample_values(db_sample)
+        await db.delete(db_sample)
+        await db.commit()
+        response_cache.invalidate([values])
+    elif (await db.execute(delete(ArchivedSample).where(ArchivedSample.sample_id == sample_id))).rowcount:
+        # The cached listings only hold samples of the hot table
+        await db.commit()
     else:
-        db.delete(db_sample)
-        db.commit()
+        raise HTTPException(status_code=404, detail="Sample not found")
 
 @router.put("/samples/{sample_id}", response_model=SampleRead)
-def update_sample(sample_id: str, update_data: SampleUpdate, db: Session = Depends(get_db)) -> SampleRead:
+async def update_sample(sample_id: str, update_data: SampleUpdate, db: AsyncSession = Depends(get_db)) -> SampleRead:
     """
-    Update an existing sample in the database based on its ID.
+    Update an existing sample in the database based on its ID. A sample moved to archived_samples is moved back to
+    samples in the same transaction, the archiver moves it again once it is due.
     :param sample_id: The ID of the sample to update.
     :param update_data: SampleUpdate schema containing the fields to update.
     :param db: Database session dependency.
     :return: SampleRead schema containing the updated sample details.
     """
-    sample = db.query(Sample).filter(Sample.sample_id == sample_id).first()
+    sample = await db.scalar(select(Sample).where(Sample.sample_id == sample_id))
+    if not sample and await restore_samples(db, [ArchivedSample.sample_id == sample_id]):
+        sample = await db.scalar(select(Sample).where(Sample.sample_id == sample_id))
 
     if not sample:
         raise HTTPException(status_code=404, detail="Sample not found")
     else:
+        values = _sample_values(sample)
         update_dict = update_data.model_dump(exclude_unset=True)
+        if update_dict.get("storage_location") is not None:
+            await register_locations(db, [update_dict["storage_location"]])
 
         for field, value in update_dict.items():
             setattr(sample, field, value)
 
-        db.commit()
-        db.refresh(sample)
+        await db.commit()
+        await db.refresh(sample)
+        response_cache.invalidate([values, _sample_values(sample)])
         return sample
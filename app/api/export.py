@@ -0,0 +1,224 @@
+import csv
+import io
+import zlib
+from typing import AsyncIterator, Dict, List
+
+import pyarrow
+import pyarrow.ipc
+import pyarrow.parquet
+import zstandard
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Date, Enum, Select, String, select, type_coerce, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.filters import sample_filters, sample_conditions, sample_models
+from app.db.models import Sample
+from app.db.session import get_read_db
+from app.schemas.sample import SampleFilter, SampleRead, ExportFormat, ExportCompression
+
+router = APIRouter()
+
+# Rows fetched from the server-side cursor and encoded at once, the memory used by an export is bounded by one batch
+EXPORT_BATCH_SIZE = 10000
+
+EXPORT_FIELDS = list(SampleRead.model_fields)
+
+def export_columns(model) -> list:
+    """
+    Columns of EXPORT_FIELDS of a samples table. Enum and date columns are read without their SQLAlchemy type
+    processing: SQLite returns the stored enum names and ISO date strings as they are, instead of converting every
+    value to a Python object and then back to text.
+    :param model: Sample or ArchivedSample.
+    :return: List of labeled columns.
+    """
+    return [(type_coerce(column, String) if isinstance(column.type, (Enum, Date)) else column).label(column.key)
+            for column in (model.__table__.c[field] for field in EXPORT_FIELDS)]
+
+EXPORT_COLUMNS = export_columns(Sample)
+# Value of the enum members by stored name, for each enum field
+ENUM_VALUES = {field: {member.name: member.value for member in Sample.__table__.c[field].type.enum_class}
+               for field in EXPORT_FIELDS if isinstance(Sample.__table__.c[field].type, Enum)}
+EXPORT_SCHEMA = pyarrow.schema([
+    ("sample_type", pyarrow.string()),
+    ("subject_id", pyarrow.string()),
+    ("collection_date", pyarrow.date32()),
+    ("status", pyarrow.string()),
+    ("storage_location", pyarrow.string()),
+    ("sample_id", pyarrow.string()),
+])
+
+MEDIA_TYPES = {
+    ExportFormat.csv: "text/csv",
+    ExportFormat.arrow: "application/vnd.apache.arrow.stream",
+    ExportFormat.parquet: "application/vnd.apache.parquet",
+}
+COMPRESSED_MEDIA_TYPES = {ExportCompression.gzip: ("application/gzip", ".gz"),
+                          ExportCompression.zstd: ("application/zstd", ".zst")}
+
+class _ChunkSink:
+    """
+    Write-only file object collecting what the Arrow and Parquet writers produce, drained after each batch.
+    """
+    def __init__(self):
+        self.closed = False
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def _columns(rows: list) -> Dict[str, list]:
+    """
+    Transpose a batch of rows into columns, with stored enum names replaced by their values.
+    :param rows: Rows of EXPORT_COLUMNS.
+    :return: Dictionary of field name to the list of its values.
+    """
+    columns = {}
+    for index, field in enumerate(EXPORT_FIELDS):
+        values = [row[index] for row in rows]
+        if field in ENUM_VALUES:
+            values = [ENUM_VALUES[field][value] for value in values]
+        columns[field] = values
+    return columns
+
+def _record_batch(rows: list) -> pyarrow.RecordBatch:
+    """
+    Convert a batch of rows into an Arrow record batch of EXPORT_SCHEMA, dates are parsed by Arrow when they are read
+    as strings.
+    :param rows: Rows of EXPORT_COLUMNS.
+    :return: RecordBatch.
+    """
+    arrays = [pyarrow.array(values).cast(field.type) for values, field in zip(_columns(rows).values(), EXPORT_SCHEMA)]
+    return pyarrow.RecordBatch.from_arrays(arrays, schema=EXPORT_SCHEMA)
+
+def _compressor(compression: ExportCompression):
+    """
+    Streaming compressor of the export body.
+    :param compression: Requested compression.
+    :return: Object with compress(data) and flush() methods, or None without compression.
+    """
+    if compression is ExportCompression.gzip:
+        return zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    elif compression is ExportCompression.zstd:
+        return zstandard.ZstdCompressor().compressobj()
+    return None
+
+async def _encode_batches(batches: AsyncIterator[list], export_format: ExportFormat,
+                          compression: ExportCompression) -> AsyncIterator[bytes]:
+    """
+    Encode batches of rows in the export format. CSV and Arrow IPC streams are compressed as a whole, Parquet files
+    compress their column chunks with the codec instead, so that they stay readable by any Parquet reader.
+    :param batches: Batches of rows of EXPORT_COLUMNS.
+    :param export_format: Format of the export.
+    :param compression: Requested compression.
+    :return: Iterator of encoded chunks.
+    """
+    if export_format is ExportFormat.csv:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_FIELDS)
+        async for rows in batches:
+            writer.writerows(zip(*_columns(rows).values()))
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue().encode()
+        return
+
+    sink = _ChunkSink()
+    if export_format is ExportFormat.arrow:
+        writer = pyarrow.ipc.new_stream(sink, EXPORT_SCHEMA)
+    else:
+        writer = pyarrow.parquet.ParquetWriter(sink, EXPORT_SCHEMA, compression=compression.value)
+    async for rows in batches:
+        writer.write_batch(_record_batch(rows))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+def _export_statement(filters: SampleFilter, include_archived: bool) -> Select:
+    """
+    Select the samples matching the filters in ID order. With include_archived, the rows of samples and
+    archived_samples are merged by the database, each table being read in the order of its primary key.
+    :param filters: Sample filters.
+    :param include_archived: Whether to export the samples of archived_samples too.
+    :return: Query of rows of EXPORT_COLUMNS.
+    """
+    selects = [select(*export_columns(model)).where(*sample_conditions(filters, model))
+               for model in (sample_models(filters) if include_archived else [Sample])]
+    if len(selects) == 1:
+        return selects[0].order_by(Sample.sample_id)
+    samples = union_all(*selects)
+    return samples.order_by(samples.selected_columns.sample_id)
+
+async def _export_samples(statement: Select, export_format: ExportFormat, compression: ExportCompression,
+                          db: AsyncSession) -> AsyncIterator[bytes]:
+    """
+    Stream the rows of a query, read from a server-side cursor in batches of EXPORT_BATCH_SIZE rows. The generator
+    owns the session and closes it once the export is complete or the client disconnects.
+    :param statement: Query of rows of EXPORT_COLUMNS, from _export_statement.
+    :param export_format: Format of the export.
+    :param compression: Requested compression.
+    :param db: Database session used to run the query.
+    :return: Iterator of body chunks.
+    """
+    statement = statement.execution_options(yield_per=EXPORT_BATCH_SIZE)
+    compressor = None if export_format is ExportFormat.parquet else _compressor(compression)
+    try:
+        # Core execution on the connection of the session, the rows do not need the ORM result processing
+        result = await (await db.connection()).stream(statement)
+        async for chunk in _encode_batches(result.partitions(), export_format, compression):
+            if compressor is not None:
+                chunk = compressor.compress(chunk)
+            if chunk:
+                yield chunk
+        if compressor is not None:
+            yield compressor.flush()
+    finally:
+        await db.close()
+
+@router.get("/export/samples", response_class=StreamingResponse, responses={200: {"content": {
+    media_type: {} for media_type in [*MEDIA_TYPES.values(), "application/gzip", "application/zstd"]}}})
+async def export_samples(
+    export_format: ExportFormat = Query(ExportFormat.csv, alias="format", description="File format of the export"),
+    compression: ExportCompression = Query(ExportCompression.none, description="Compression of the export"),
+    include_archived: bool = Query(False, description="Also export the samples moved to the archived_samples table"),
+    filters: SampleFilter = Depends(sample_filters),
+    db: AsyncSession = Depends(get_read_db)) -> StreamingResponse:
+    """
+    Export every sample matching the filters as CSV, Arrow IPC stream or Parquet. The body is streamed while the rows
+    are read from the database in fixed-size batches, so neither the result set nor the file is held in memory.
+    Compressed CSV and Arrow exports are sent as .gz or .zst files, Parquet files compress their columns internally.
+    :param export_format: File format (csv, arrow or parquet).
+    :param compression: Compression (none, gzip or zstd).
+    :param include_archived: If set, the samples of archived_samples are exported too, in the same ID order.
+    :param filters: Sample filters taken from the query string.
+    :param db: Database session dependency.
+    :return: StreamingResponse with the exported file as attachment.
+    """
+    media_type = MEDIA_TYPES[export_format]
+    filename = f"samples.{export_format.value}"
+    if export_format is not ExportFormat.parquet and compression is not ExportCompression.none:
+        media_type, extension = COMPRESSED_MEDIA_TYPES[compression]
+        filename += extension
+    statement = _export_statement(filters, include_archived)
+    return StreamingResponse(_export_samples(statement, export_format, compression, db),
+                             media_type=media_type,
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
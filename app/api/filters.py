@@ -0,0 +1,77 @@
+from datetime import date
+from typing import Optional
+
+from fastapi import Query
+
+from app.db.models import ArchivedSample, Sample, SampleType, StatusType
+from app.schemas.sample import SampleFilter, SampleSelection
+
+def sample_filters(
+    sample_status: Optional[StatusType] = Query(None, description="Filter by sample status"),
+    sample_type: Optional[SampleType] = Query(None, description="Filter by sample type"),
+    subject_id: Optional[str] = Query(None, description="Filter by subject ID"),
+    collected_from: Optional[date] = Query(None, description="Only samples collected on or after this date"),
+    collected_to: Optional[date] = Query(None, description="Only samples collected on or before this date"),
+    storage_location_prefix: Optional[str] = Query(None, description="Filter by storage location prefix")
+) -> SampleFilter:
+    """
+    Dependency that collects the sample filters from the query string.
+    :param sample_status: Filter by sample status (e.g., collected, processing, archived).
+    :param sample_type: Filter by sample type (e.g., blood, saliva, tissue).
+    :param subject_id: Filter by the exact subject ID.
+    :param collected_from: Lower bound (inclusive) of the collection date.
+    :param collected_to: Upper bound (inclusive) of the collection date.
+    :param storage_location_prefix: Filter by storage locations starting with this prefix (e.g., freezer-1).
+    :return: SampleFilter with the requested filters.
+    """
+    return SampleFilter(sample_status=sample_status, sample_type=sample_type, subject_id=subject_id,
+                        collected_from=collected_from, collected_to=collected_to,
+                        storage_location_prefix=storage_location_prefix)
+
+def prefix_conditions(column, prefix: str) -> list:
+    """
+    Build a prefix match as a range on the column (prefix <= value < next prefix) instead of LIKE, so that it can be
+    answered by a plain index on the column regardless of the database collation.
+    :param column: Column to match.
+    :param prefix: Prefix to look for.
+    :return: List of conditions to be combined with AND.
+    """
+    conditions = [column >= prefix]
+    if prefix and ord(prefix[-1]) < 0x10FFFF:
+        conditions.append(column < prefix[:-1] + chr(ord(prefix[-1]) + 1))
+    return conditions
+
+def sample_models(filters: SampleFilter) -> list:
+    """
+    Tables holding the samples that can match the filters. archived_samples only holds archived samples, so it is left
+    out when filtering on another status.
+    :param filters: Filters to apply.
+    :return: List of models, Sample first.
+    """
+    if filters.sample_status in (None, StatusType.archived):
+        return [Sample, ArchivedSample]
+    return [Sample]
+
+def sample_conditions(filters: SampleFilter, model=Sample) -> list:
+    """
+    Translate a SampleFilter (or a SampleSelection) into SQL conditions on the samples table.
+    :param filters: Filters to apply, unset filters are ignored.
+    :param model: Model to build the conditions on, any model with the filtered columns (e.g. SampleCount).
+    :return: List of conditions to be combined with AND.
+    """
+    conditions = []
+    if isinstance(filters, SampleSelection) and filters.sample_ids is not None:
+        conditions.append(model.sample_id.in_(filters.sample_ids))
+    if filters.sample_status:
+        conditions.append(model.status == filters.sample_status)
+    if filters.sample_type:
+        conditions.append(model.sample_type == filters.sample_type)
+    if filters.subject_id is not None:
+        conditions.append(model.subject_id == filters.subject_id)
+    if filters.collected_from:
+        conditions.append(model.collection_date >= filters.collected_from)
+    if filters.collected_to:
+        conditions.append(model.collection_date <= filters.collected_to)
+    if filters.storage_location_prefix:
+        conditions.extend(prefix_conditions(model.storage_location, filters.storage_location_prefix))
+    return conditions
@@ -0,0 +1,111 @@
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import func, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.configuration import settings
+from app.api.endpoints import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, SAMPLE_READ_FIELDS
+from app.api.filters import prefix_conditions, sample_conditions, sample_filters, sample_models
+from app.db.locations import location_path, parse_location
+from app.db.models import ArchivedSample, Sample, StorageLocation
+from app.db.session import get_read_db
+from app.schemas.sample import LocationChild, LocationOccupancy, SampleFilter, SampleRead
+
+router = APIRouter()
+
+LOCATION_DESCRIPTION = "Subtree of the storage hierarchy, e.g. freezer-1-shelfA, the whole hierarchy when omitted"
+
+def _subtree(location: Optional[str]) -> Tuple[Dict[str, str], str]:
+    """
+    Parse the location of a subtree given in the query string.
+    :param location: Storage location, in any format accepted by parse_location, or None for the whole hierarchy.
+    :return: Levels of the location and its path, the prefix of the paths in the subtree.
+    """
+    if not location:
+        return {}, ""
+    levels = parse_location(location)
+    if levels is None:
+        raise HTTPException(status_code=422, detail="Storage location does not follow the "
+                                                    "site/freezer/shelf/rack/box/position format")
+    return levels, location_path(levels)
+
+@router.get("/locations/samples", response_model=List[SampleRead])
+async def read_location_samples(
+    response: Response,
+    location: Optional[str] = Query(None, description=LOCATION_DESCRIPTION),
+    filters: SampleFilter = Depends(sample_filters),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of samples per page"),
+    after: Optional[str] = Query(None, description="Return samples whose ID sorts after this cursor"),
+    db: AsyncSession = Depends(get_read_db)) -> List[SampleRead]:
+    """
+    List the samples stored anywhere in a subtree of the storage hierarchy, e.g. every box of a shelf. The storage
+    locations of the subtree are a range of the path index of storage_locations, the samples are then looked up by
+    location. Samples are ordered by ID and paginated like GET /api/samples. The samples moved to archived_samples
+    still fill their boxes, so they are listed too, as they are counted by the occupancy.
+    :param response: Response, to set the X-Next-Cursor header.
+    :param location: Root of the subtree.
+    :param filters: Sample filters taken from the query string.
+    :param limit: Maximum number of samples to return.
+    :param after: Sample ID of the last row of the previous page.
+    :param db: Database session dependency.
+    :return: List of SampleRead schemas of the samples in the subtree.
+    """
+    _, prefix = _subtree(location)
+    locations = select(StorageLocation.storage_location).where(*prefix_conditions(StorageLocation.path, prefix))
+    # Each table is ordered and limited before the union, like the pages of GET /api/samples?include_archived=true
+    selects = []
+    for model in sample_models(filters):
+        conditions = [model.storage_location.in_(locations), *sample_conditions(filters, model)]
+        if after is not None:
+            conditions.append(model.sample_id > after)
+        rows = (select(*(getattr(model, field) for field in SAMPLE_READ_FIELDS))
+                .where(*conditions).order_by(model.sample_id).limit(limit).subquery())
+        selects.append(select(rows))
+    stored = union_all(*selects).subquery()
+
+    samples = (await db.execute(select(stored).order_by(stored.c.sample_id).limit(limit))).all()
+    if len(samples) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = samples[-1].sample_id
+    return samples
+
+@router.get("/locations/occupancy", response_model=LocationOccupancy)
+async def read_location_occupancy(
+    location: Optional[str] = Query(None, description=LOCATION_DESCRIPTION),
+    db: AsyncSession = Depends(get_read_db)) -> LocationOccupancy:
+    """
+    Count the samples of a subtree of the storage hierarchy, in total and per child (e.g. per shelf of a freezer).
+    On SQLite the counts are summed from the trigger-maintained storage_locations table, reading only its path
+    index. Elsewhere the rows of samples and archived_samples are counted per location, as the listing reads both.
+    For a box, the free slots are its BOX_CAPACITY minus the samples it holds.
+    :param location: Root of the subtree.
+    :param db: Database session dependency.
+    :return: LocationOccupancy schema with the total and the count of each non-empty child.
+    """
+    levels, prefix = _subtree(location)
+    dialect = db.bind.dialect.name
+    # Next component of the path below the root, e.g. shelf:A/, empty for samples stored at the root itself
+    remainder = func.substr(StorageLocation.path, len(prefix) + 1)
+    separator = func.instr(remainder, "/") if dialect == "sqlite" else func.strpos(remainder, "/")
+    child = func.substr(remainder, 1, separator).label("child")
+
+    if dialect == "sqlite":
+        statement = select(child, func.sum(StorageLocation.sample_count).label("samples"))
+    else:
+        stored = union_all(*(select(model.storage_location) for model in (Sample, ArchivedSample))).subquery()
+        statement = (select(child, func.count().label("samples"))
+                     .join(stored, stored.c.storage_location == StorageLocation.storage_location))
+    statement = statement.where(*prefix_conditions(StorageLocation.path, prefix)).group_by(child).order_by(child)
+    rows = (await db.execute(statement)).all()
+
+    children = []
+    for row in rows:
+        if row.child and row.samples:
+            level, name = row.child[:-1].split(":", 1)
+            children.append(LocationChild(path=prefix + row.child, level=level, name=name, samples=row.samples))
+    occupancy = LocationOccupancy(path=prefix, samples=sum(row.samples or 0 for row in rows), children=children)
+
+    if "box" in levels and "position" not in levels:
+        occupancy.capacity = settings.box_capacity
+        occupancy.free_slots = max(settings.box_capacity - occupancy.samples, 0)
+    return occupancy
@@ -0,0 +1,191 @@
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Upper bounds (in seconds) of the latency buckets, from sub-millisecond cache hits to multi-second exports
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    return "+Inf" if value == float("inf") else repr(value)
+
+class Counter:
+    """
+    Monotonic counter, one value per combination of label values.
+    """
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {} if self.labelnames else {(): 0}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+                for labels, value in self._values.items()]
+
+class Gauge(Counter):
+    """
+    Value that can go up and down, e.g. the number of requests in flight.
+    """
+    type = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+class CallbackMetric:
+    """
+    Unlabelled counter or gauge read from a function when the metrics are rendered, for values already kept by another
+    object (e.g. the hit counts of a cache), which then does not need to know about the registry.
+    """
+    def __init__(self, name: str, documentation: str, read: Callable[[], float], type: str = "gauge"):
+        self.name = name
+        self.documentation = documentation
+        self.read = read
+        self.type = type
+
+    def samples(self) -> List[str]:
+        return [f"{self.name} {_format_value(float(self.read()))}"]
+
+class Histogram:
+    """
+    Distribution of observed values in fixed buckets. Each observation costs a binary search and two additions, the
+    cumulative bucket counts are only computed when the metrics are rendered.
+    """
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # Per label values: count of each bucket (the last one is +Inf), sum of the observations
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        entry = self._values.get(labels)
+        if entry is None:
+            entry = self._values[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1][0] += value
+
+    def samples(self) -> List[str]:
+        lines = []
+        for labels, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                bucket = _format_labels(self.labelnames, labels, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{bucket} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total[0])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    """
+    Metrics of the process, rendered in the Prometheus text exposition format.
+    """
+    def __init__(self):
+        self.metrics: List[object] = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+request_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "Time to process a request, until its body is sent.",
+    ("method", "route", "status")))
+requests_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "Requests being processed."))
+request_db_queries = registry.register(Histogram(
+    "http_request_db_queries", "Database queries run by a request.", ("method", "route"), QUERY_COUNT_BUCKETS))
+request_db_duration = registry.register(Histogram(
+    "http_request_db_duration_seconds", "Time spent in database queries by a request.", ("method", "route")))
+db_query_duration = registry.register(Histogram(
+    "db_query_duration_seconds", "Time to execute a database query."))
+auth_duration = registry.register(Histogram(
+    "auth_duration_seconds", "Time to authenticate the access token of a request.", ("token_cache",)))
+rejected_requests = registry.register(Counter(
+    "http_requests_rejected_total", "Requests rejected with a 429 by the rate limit or the concurrency cap.",
+    ("reason",)))
+
+@dataclass
+class RequestStats:
+    db_queries: int = 0
+    db_duration: float = 0.0
+    # Time spent waiting for something to happen rather than processing, e.g. a change feed long poll
+    wait_duration: float = 0.0
+
+# Database statistics of the request being processed, None outside of a request
+request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+def record_query(duration: float) -> None:
+    """
+    Record a database query, called by the cursor execution hooks of the engines.
+    :param duration: Execution time of the query in seconds.
+    """
+    db_query_duration.observe(duration)
+    stats = request_stats.get()
+    if stats is not None:
+        stats.db_queries += 1
+        stats.db_duration += duration
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing each HTTP request, until the last chunk of its body is sent for streamed responses.
+    Requests are labelled with their route template (e.g. /api/samples/{sample_id}) so that the number of series stays
+    bounded, requests not matching any route are labelled "unmatched".
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - started
+            requests_in_flight.dec()
+            request_stats.reset(token)
+            route = scope.get("route")
+            labels = (scope["method"], route.path if route is not None else "unmatched")
+            request_duration.observe(duration, *labels, str(status_code))
+            request_db_queries.observe(stats.db_queries, *labels)
+            request_db_duration.observe(stats.db_duration, *labels)
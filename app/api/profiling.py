@@ -0,0 +1,234 @@
+import cProfile
+import logging
+import pstats
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import List, Optional
+from uuid import uuid4
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from jose import JWTError, jwt
+
+from app.api.authentication import ALGORITHM, SECRET_KEY, get_current_user, token_cache
+from app.api.configuration import settings
+from app.api.metrics import request_stats
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+PROFILE_HEADER = b"x-profile"
+# Profiles kept in memory to be read from GET /debug/profiles/{profile_id}, the oldest are dropped first
+PROFILE_HISTORY_SIZE = 100
+# Statements recorded per profile, further ones are only counted (e.g. the batches of a long export)
+MAX_PROFILED_QUERIES = 500
+# Functions of the call breakdown, by cumulative time
+MAX_PROFILED_FUNCTIONS = 30
+
+@dataclass
+class QueryProfile:
+    statement: str
+    duration: float
+    plan: Optional[List[str]] = None
+
+class RequestProfile:
+    """
+    SQL statements and Python calls of one request. Statements are recorded by the cursor execution hooks of the
+    engines with their duration and, on SQLite, the EXPLAIN QUERY PLAN of the SELECT statements. Calls are recorded by
+    cProfile, which sees every coroutine run by the event loop meanwhile, including those of concurrent requests.
+    """
+    def __init__(self, method: str, path: str):
+        self.id = uuid4().hex
+        self.method = method
+        self.path = path
+        self.status_code: Optional[int] = None
+        self.duration = 0.0
+        self.db_queries = 0
+        self.db_duration = 0.0
+        self.queries: List[QueryProfile] = []
+        self.profiler: Optional[cProfile.Profile] = None
+
+    def record_query(self, connection, statement: str, parameters, duration: float, executemany: bool) -> None:
+        """
+        Record a statement run by the request, called by the after_cursor_execute hook of the engines.
+        :param connection: SQLAlchemy connection that ran the statement.
+        :param statement: SQL statement as sent to the database.
+        :param parameters: Parameters of the statement.
+        :param duration: Execution time of the statement in seconds.
+        :param executemany: Whether the statement was run once per set of parameters.
+        """
+        self.db_queries += 1
+        self.db_duration += duration
+        if len(self.queries) >= MAX_PROFILED_QUERIES:
+            return
+        query = QueryProfile(statement=statement, duration=duration)
+        if (connection.dialect.name == "sqlite" and not executemany
+                and statement.lstrip()[:6].upper() in ("SELECT", "WITH")):
+            # Run on the DBAPI connection, so that the hooks do not record the EXPLAIN as a query of the request
+            cursor = connection.connection.cursor()
+            try:
+                cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+                query.plan = [row[-1] for row in cursor.fetchall()]
+            finally:
+                cursor.close()
+        self.queries.append(query)
+
+    def server_timing(self, duration: float) -> str:
+        return (f'db;dur={self.db_duration * 1000:.1f};desc="{self.db_queries} queries", '
+                f'app;dur={duration * 1000:.1f}')
+
+    def report(self) -> dict:
+        calls = []
+        if self.profiler is not None:
+            stats = pstats.Stats(self.profiler).stats
+            for (filename, line, function), (_, calls_count, total, cumulative, _) in sorted(
+                    stats.items(), key=lambda item: item[1][3], reverse=True)[:MAX_PROFILED_FUNCTIONS]:
+                calls.append({"function": f"{filename}:{line}({function})", "calls": calls_count,
+                              "total_ms": round(total * 1000, 3), "cumulative_ms": round(cumulative * 1000, 3)})
+        return {
+            "id": self.id, "method": self.method, "path": self.path, "status_code": self.status_code,
+            "duration_ms": round(self.duration * 1000, 3), "db_queries": self.db_queries,
+            "db_duration_ms": round(self.db_duration * 1000, 3),
+            "queries": [{"statement": query.statement, "duration_ms": round(query.duration * 1000, 3),
+                         "plan": query.plan} for query in self.queries],
+            "calls": calls,
+        }
+
+# Profile of the request being processed, None when the request is not profiled
+current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("current_profile", default=None)
+recent_profiles: OrderedDict[str, dict] = OrderedDict()
+# cProfile follows a single profiler per thread, concurrent profiled requests only record their statements
+_profiler_in_use = False
+
+def _profiling_user(scope) -> Optional[str]:
+    """
+    Authenticate a request asking to be profiled with the X-Profile header, before it reaches get_current_user.
+    :param scope: ASGI scope of the request.
+    :return: Username of the access token if it is one of PROFILING_USERS, otherwise None.
+    """
+    headers = dict(scope["headers"])
+    authorization = headers.get(b"authorization", b"").decode("latin-1")
+    if PROFILE_HEADER not in headers or not authorization.lower().startswith("bearer "):
+        return None
+    token = authorization[7:]
+    username = token_cache.peek(token)
+    if username is None:
+        try:
+            username = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+        except JWTError:
+            return None
+    return username if username in settings.profiling_users else None
+
+def _processing_time(started: float) -> float:
+    """
+    Time spent processing the request so far, leaving out the time it waited for changes (long polling).
+    :param started: perf_counter value when the request arrived.
+    :return: Processing time in seconds.
+    """
+    stats = request_stats.get()
+    return time.perf_counter() - started - (stats.wait_duration if stats else 0.0)
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling the requests when PROFILE_REQUESTS is set, or when a user of PROFILING_USERS sends the
+    X-Profile header. Profiled responses carry Server-Timing and X-Profile-Id headers, and the report is kept for
+    GET /debug/profiles/{profile_id}. Requests taking longer than SLOW_REQUEST_SECONDS to start their response are
+    logged, profiled or not: the time spent sending a streamed body (exports, stream=true listings, Server-Sent
+    Events) and waiting in a long poll is not processing time. Other requests only pay for reading the settings and
+    the clock.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        if settings.profile_requests or (settings.profiling_users and _profiling_user(scope)):
+            return await self._profile(scope, receive, send)
+        if settings.slow_request_seconds <= 0:
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        processing: Optional[float] = None
+
+        async def send_wrapper(message):
+            nonlocal processing
+            if message["type"] == "http.response.start":
+                processing = _processing_time(started)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self._log_if_slow(scope, _processing_time(started) if processing is None else processing, None)
+
+    async def _profile(self, scope, receive, send) -> None:
+        global _profiler_in_use
+        profile = RequestProfile(scope["method"], scope["path"])
+        started = time.perf_counter()
+        processing: Optional[float] = None
+
+        async def send_wrapper(message):
+            nonlocal processing
+            if message["type"] == "http.response.start":
+                processing = _processing_time(started)
+                profile.status_code = message["status"]
+                message["headers"] = [*message.get("headers", []),
+                                      (b"server-timing", profile.server_timing(time.perf_counter() - started).encode()),
+                                      (b"x-profile-id", profile.id.encode())]
+            await send(message)
+
+        token = current_profile.set(profile)
+        if not _profiler_in_use:
+            _profiler_in_use = True
+            profile.profiler = cProfile.Profile()
+            profile.profiler.enable()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if profile.profiler is not None:
+                profile.profiler.disable()
+                _profiler_in_use = False
+            current_profile.reset(token)
+            profile.duration = time.perf_counter() - started
+            recent_profiles[profile.id] = profile.report()
+            while len(recent_profiles) > PROFILE_HISTORY_SIZE:
+                recent_profiles.popitem(last=False)
+            self._log_if_slow(scope, _processing_time(started) if processing is None else processing, profile)
+
+    @staticmethod
+    def _log_if_slow(scope, duration: float, profile: Optional[RequestProfile]) -> None:
+        if settings.slow_request_seconds <= 0 or duration < settings.slow_request_seconds:
+            return
+        stats = request_stats.get()
+        queries, db_duration = (profile.db_queries, profile.db_duration) if profile else (
+            (stats.db_queries, stats.db_duration) if stats else (0, 0.0))
+        logger.warning("Slow request %s %s: %.0f ms, %d queries in %.0f ms%s", scope["method"], scope["path"],
+                       duration * 1000, queries, db_duration * 1000,
+                       f", profile {profile.id}" if profile else "")
+
+def record_profiled_query(connection, statement: str, parameters, duration: float, executemany: bool) -> None:
+    """
+    Record a statement in the profile of the current request, if it is profiled.
+    """
+    profile = current_profile.get()
+    if profile is not None:
+        profile.record_query(connection, statement, parameters, duration, executemany)
+
+@router.get("/debug/profiles/{profile_id}")
+async def read_profile(profile_id: str, current_user: dict = Depends(get_current_user)) -> dict:
+    """
+    Endpoint returning the report of a profiled request: its SQL statements with their duration and query plan, and
+    the functions that took the most time.
+    :param profile_id: Value of the X-Profile-Id header of the profiled response.
+    :param current_user: The current user, who must be one of PROFILING_USERS.
+    :return: A dictionary with the profile report.
+    """
+    if current_user["username"] not in settings.profiling_users:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not allowed to read profiles")
+    if profile_id not in recent_profiles:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return recent_profiles[profile_id]
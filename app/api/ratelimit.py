@@ -0,0 +1,144 @@
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import List, Optional, Protocol, Tuple
+
+from fastapi import Depends, HTTPException, status
+
+from app.api.authentication import get_current_user
+from app.api.configuration import settings
+from app.api.metrics import rejected_requests
+
+class RateLimitStore(Protocol):
+    """
+    Storage of the token buckets of the RateLimiter. The default MemoryStore keeps them in the process, so each worker
+    enforces the limit on its own. Any object with this method doing the same arithmetic atomically in a shared
+    key-value store (e.g. a Redis script) can replace it, so that the limit holds across all workers.
+    """
+    def take(self, key: str, rate: float, burst: int) -> float: ...
+
+class MemoryStore:
+    """
+    In-process token buckets, one per key, holding at most max_size keys. The least recently used bucket is dropped
+    beyond that, which at worst gives an idle client a full bucket again.
+    """
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._buckets: OrderedDict[str, Tuple[float, float]] = OrderedDict()
+
+    def take(self, key: str, rate: float, burst: int) -> float:
+        """
+        Take a token from the bucket of a key. The bucket holds up to burst tokens and refills at rate tokens per
+        second, it is refilled lazily from the time elapsed since it was last used.
+        :param key: Key of the bucket, e.g. the username.
+        :param rate: Tokens added per second.
+        :param burst: Capacity of the bucket, a new bucket starts full.
+        :return: 0 if a token was taken, otherwise the seconds until the next token is available.
+        """
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.pop(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated_at) * rate)
+        retry_after = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            retry_after = (1 - tokens) / rate
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_size:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+class RateLimiter:
+    """
+    Token bucket rate limit per client: each client may send `rate` requests per second on average, with bursts of up
+    to `burst` requests.
+    """
+    def __init__(self, store: RateLimitStore, rate: float, burst: int):
+        self.store = store
+        self.rate = rate
+        self.burst = burst
+        self.enabled = rate > 0
+
+    def check(self, key: str) -> float:
+        """
+        Count a request of a client against its limit.
+        :param key: Identifier of the client.
+        :return: 0 if the request is allowed, otherwise the seconds after which the client may retry.
+        """
+        if not self.enabled:
+            return 0.0
+        return self.store.take(key, self.rate, max(self.burst, 1))
+
+class ConcurrencyLimiter:
+    """
+    Cap on the expensive requests (listings, exports, statistics, searches) processed at once by this process, so
+    that they cannot take every database connection. Requests beyond the cap are rejected instead of queued.
+    """
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_flight = 0
+
+    def try_acquire(self) -> bool:
+        if 0 < self.limit <= self.in_flight:
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self) -> None:
+        self.in_flight -= 1
+
+rate_limiter = RateLimiter(MemoryStore(max_size=10000), rate=settings.rate_limit_per_second,
+                           burst=settings.rate_limit_burst)
+expensive_request_limiter = ConcurrencyLimiter(settings.expensive_request_concurrency)
+
+# Slots of the ConcurrencyLimiter held by the request being processed, None outside of AdmissionMiddleware
+held_slots: ContextVar[Optional[List[ConcurrencyLimiter]]] = ContextVar("held_slots", default=None)
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware releasing the ConcurrencyLimiter slots taken by a request once its response is fully sent. The
+    exit code of a dependency runs before a streamed body is sent, so a dependency alone could not hold a slot for
+    the duration of an export.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        slots = []
+        token = held_slots.set(slots)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            held_slots.reset(token)
+            for limiter in slots:
+                limiter.release()
+
+def _too_many_requests(detail: str, retry_after: float, reason: str) -> HTTPException:
+    rejected_requests.inc(reason)
+    # Retry-After is a whole number of seconds, rounded up so that the client does not retry too early
+    return HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=detail,
+                         headers={"Retry-After": str(max(int(-(-retry_after // 1)), 1))})
+
+async def rate_limit(current_user: dict = Depends(get_current_user)) -> None:
+    """
+    Dependency applying the rate limit of the authenticated user, the subject of its access token.
+    :param current_user: User returned by get_current_user, resolved once per request.
+    """
+    retry_after = rate_limiter.check(current_user["username"])
+    if retry_after:
+        raise _too_many_requests("Rate limit exceeded", retry_after, "rate_limit")
+
+async def limit_concurrency() -> None:
+    """
+    Dependency admitting an expensive request only if fewer than EXPENSIVE_REQUEST_CONCURRENCY are being processed.
+    The slot is released by AdmissionMiddleware when the response is sent.
+    """
+    slots = held_slots.get()
+    if slots is None:
+        return
+    if not expensive_request_limiter.try_acquire():
+        raise _too_many_requests("Too many expensive requests in progress", 1, "concurrency")
+    slots.append(expensive_request_limiter)
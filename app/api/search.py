@@ -0,0 +1,148 @@
+import re
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import and_, case, column, func, literal_column, or_, select, table, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.endpoints import SAMPLE_READ_FIELDS
+from app.api.filters import sample_filters, sample_conditions, sample_models
+from app.db.models import ArchivedSample, Sample
+from app.db.session import get_read_db
+from app.schemas.sample import SampleFilter, SampleRead, SearchField
+
+router = APIRouter()
+
+# Matches ranked by a search for each rank, the newest ones. Ranking costs a lookup per match, which is bounded by
+# this window instead of growing with the table for texts common to many samples (e.g. "freezer").
+MAX_SEARCH_RESULTS = 1000
+
+# FTS5 indexes of each samples table, see SAMPLE_SEARCH_DDL and ARCHIVED_SAMPLE_SEARCH_DDL in app/db/models.py. Their
+# rowid is the rowid of the sample in its table.
+SEARCH_INDEXES = {Sample: table("samples_fts", column("rowid")),
+                  ArchivedSample: table("archived_samples_fts", column("rowid"))}
+
+def _rowid(model):
+    return literal_column(f"{model.__tablename__}.rowid")
+
+def search_tokens(text: str) -> List[str]:
+    """
+    Split a search text into tokens the way the unicode61 tokenizer of the index does: runs of letters and digits,
+    case-insensitive. A freezer path like freezer-1-shelfA gives freezer, 1 and shelfa.
+    :param text: Text typed by the user.
+    :return: List of lowercase tokens.
+    """
+    return re.findall(r"[^\W_]+", text.lower())
+
+def fts_query(tokens: List[str], field: Optional[SearchField], initial: bool = False, prefix: bool = True) -> str:
+    """
+    Build the FTS5 query matching the tokens as a phrase, in order and adjacent, with the last token as a prefix.
+    Tokens only contain letters and digits, so user input can not inject FTS5 operators.
+    :param tokens: Tokens from search_tokens.
+    :param field: Column to search, both when None.
+    :param initial: Only match the phrase at the start of a column.
+    :param prefix: Match the last token as a prefix, otherwise as a whole token.
+    :return: FTS5 MATCH expression, e.g. storage_location : "freezer 1 shel" *
+    """
+    phrase = f'{"^ " if initial else ""}"{" ".join(tokens)}"{" *" if prefix else ""}'
+    return f"{field.value} : {phrase}" if field else phrase
+
+def _search_columns(field: Optional[SearchField], model=Sample) -> list:
+    return [getattr(model, field.value)] if field else [model.subject_id, model.storage_location]
+
+def relevance(text: str, field: Optional[SearchField], model=Sample):
+    """
+    Rank of a match: 0 when a searched column is the text, 1 when it starts with the text, 2 when the text only
+    matches tokens inside the value (e.g. "shelfA" in freezer-1-shelfA). Comparisons are case-insensitive.
+    bm25 is not used: on short identifiers it mostly ranks by length, and computing it reads the whole index entries
+    of tokens that every sample shares.
+    :param text: Lowercase search text.
+    :param field: Column to search, both when None.
+    :param model: Sample or ArchivedSample.
+    :return: SQL expression of the rank, lower is better.
+    """
+    columns = [func.lower(column_) for column_ in _search_columns(field, model)]
+    return case((or_(*(column_ == text for column_ in columns)), 0),
+                (or_(*(column_.startswith(text, autoescape=True) for column_ in columns)), 1), else_=2)
+
+def _like_conditions(tokens: List[str], field: Optional[SearchField], model=Sample) -> list:
+    """
+    Fallback for databases without FTS5: every token must appear in the searched columns.
+    """
+    return [or_(*(column_.ilike(f"%{token}%") for column_ in _search_columns(field, model))) for token in tokens]
+
+@router.get("/search/samples", response_model=List[SampleRead])
+async def search_samples(
+    q: str = Query(..., min_length=1, description="Text to search, e.g. a subject ID or freezer path prefix"),
+    field: Optional[SearchField] = Query(None, description="Search only this field instead of both"),
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of samples per page"),
+    offset: int = Query(0, ge=0, description="Number of results to skip"),
+    include_archived: bool = Query(False, description="Also search the samples moved to the archived_samples table"),
+    filters: SampleFilter = Depends(sample_filters),
+    db: AsyncSession = Depends(get_read_db)) -> List[SampleRead]:
+    """
+    Search samples by subject ID and storage location. The text is matched as a phrase whose last token is a prefix,
+    so "P0001" finds subjects starting with P0001 and "freezer-1-sh" finds the shelves of freezer 1. On SQLite the
+    lookup uses the samples_fts full-text index. Exact matches come first, then prefix matches, then the others.
+    Each rank is looked up in its own window of the newest MAX_SEARCH_RESULTS candidates, read from the index with a
+    query anchored like the rank (the text as the first whole tokens of a column, then as their prefix), so that newer
+    matches of a lower rank do not push out the better ones. A text matching more samples should be refined (e.g.
+    with the filters). With include_archived, archived_samples is searched through its own index, and its matches
+    follow those of samples within each rank.
+    :param q: Text to search.
+    :param field: Restrict the search to subject_id or storage_location.
+    :param limit: Maximum number of samples to return.
+    :param offset: Number of results to skip, for pagination.
+    :param include_archived: If set, the samples of archived_samples are searched too.
+    :param filters: Sample filters taken from the query string, combined with the search.
+    :param db: Database session dependency.
+    :return: List of SampleRead schemas of the matching samples, best matches first.
+    """
+    tokens = search_tokens(q)
+    if not tokens:
+        return []
+
+    text = q.strip().lower()
+    models = sample_models(filters) if include_archived else [Sample]
+    if db.bind.dialect.name == "sqlite":
+        return await _search_ranks(db, tokens, field, text, filters, limit, offset, models)
+    matches = union_all(*(select(*(getattr(model, name) for name in SAMPLE_READ_FIELDS),
+                                 relevance(text, field, model).label("rank"))
+                          .where(*sample_conditions(filters, model), and_(*_like_conditions(tokens, field, model)))
+                          for model in models)).subquery()
+    statement = select(matches).order_by(matches.c.rank, matches.c.sample_id)
+    return (await db.execute(statement.limit(limit).offset(offset))).all()
+
+async def _search_ranks(db: AsyncSession, tokens: List[str], field: Optional[SearchField], text: str,
+                        filters: SampleFilter, limit: int, offset: int, models: list) -> list:
+    """
+    Page of a search on SQLite, rank by rank. The candidates of the exact matches, of the prefix matches and of the
+    others are read from the index of each table newest first (so without sorting all of them), up to
+    MAX_SEARCH_RESULTS each, and a rank is only looked up when the better ones do not fill the page.
+    :param text: Lowercase search text, ranked with relevance.
+    :param models: Tables to search, Sample first.
+    :return: The samples of the page, best matches first and newest first within a rank and table.
+    """
+    queries = [fts_query(tokens, field, initial=True, prefix=False), fts_query(tokens, field, initial=True),
+               fts_query(tokens, field)]
+    matches = []
+    for tier, query in enumerate(queries):
+        for model in models:
+            index, rowid = SEARCH_INDEXES[model], _rowid(model)
+            window = (select(rowid.label("rowid"), relevance(text, field, model).label("rank")).select_from(model)
+                      .join(index, index.c.rowid == rowid)
+                      .where(literal_column(index.name).match(query), *sample_conditions(filters, model))
+                      .order_by(index.c.rowid.desc()).limit(MAX_SEARCH_RESULTS).subquery())
+            matches.extend((model, match) for match in
+                           await db.scalars(select(window.c.rowid).where(window.c.rank == tier)))
+        if len(matches) >= offset + limit:
+            break
+
+    page = matches[offset:offset + limit]
+    samples = {}
+    for model in models:
+        rowids = [match for match_model, match in page if match_model is model]
+        if rowids:
+            samples.update(((model, match), sample) for match, sample in await db.execute(
+                select(_rowid(model), model).where(_rowid(model).in_(rowids))))
+    return [samples[match] for match in page]
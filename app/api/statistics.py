@@ -0,0 +1,73 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import Date, cast, func, select, type_coerce, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.configuration import settings
+from app.api.filters import sample_filters, sample_conditions, sample_models
+from app.db.models import SampleCount
+from app.db.session import get_read_db
+from app.schemas.sample import SampleFilter, SampleStatistics, SampleGroupCount, StatisticsField, DateBucket
+
+router = APIRouter()
+
+# SQLite date() modifiers moving a date to the first day of its bucket (weeks start on Monday)
+SQLITE_BUCKET_MODIFIERS = {
+    DateBucket.week: ("weekday 0", "-6 days"),
+    DateBucket.month: ("start of month",),
+}
+
+def _date_bucket(column, bucket: DateBucket, dialect: str):
+    """
+    Truncate a date column to the first day of its day, week or month bucket.
+    :param column: Date column to truncate.
+    :param bucket: Size of the buckets.
+    :param dialect: Name of the database dialect, SQLite and PostgreSQL have different date functions.
+    :return: SQL expression of type Date.
+    """
+    if bucket is DateBucket.day:
+        return column
+    elif dialect == "sqlite":
+        return type_coerce(func.date(column, *SQLITE_BUCKET_MODIFIERS[bucket]), Date)
+    else:
+        return cast(func.date_trunc(bucket.value, column), Date)
+
+@router.get("/statistics/samples", response_model=SampleStatistics)
+async def read_sample_statistics(
+    group_by: List[StatisticsField] = Query([StatisticsField.status, StatisticsField.sample_type],
+                                            description="Fields to group the samples by"),
+    date_bucket: DateBucket = Query(DateBucket.month, description="Bucket size when grouping by collection_date"),
+    filters: SampleFilter = Depends(sample_filters),
+    db: AsyncSession = Depends(get_read_db)) -> SampleStatistics:
+    """
+    Count samples grouped by any combination of status, type, storage location and collection date bucket, the samples
+    moved to archived_samples included. Counts are computed with GROUP BY in the database. On SQLite, and unless
+    filtering by subject, they are read from the trigger-maintained sample_counts summary table instead of scanning
+    the samples tables.
+    :param group_by: Fields to group by, an empty list returns only the total.
+    :param date_bucket: Bucket size (day, week or month) for the collection_date grouping.
+    :param filters: Sample filters taken from the query string.
+    :param db: Database session dependency.
+    :return: SampleStatistics schema with the total and the count of each group.
+    """
+    dialect = db.bind.dialect.name
+    use_summary = settings.statistics_summary_table and dialect == "sqlite" and filters.subject_id is None
+    if use_summary:
+        rows = select(SampleCount).where(*sample_conditions(filters, SampleCount)).subquery()
+        count = func.sum(rows.c.sample_count)
+    else:
+        rows = union_all(*(select(*(getattr(model, field.value) for field in StatisticsField))
+                           .where(*sample_conditions(filters, model)) for model in sample_models(filters))).subquery()
+        count = func.count()
+
+    columns = []
+    for field in dict.fromkeys(group_by):
+        column = rows.c[field.value]
+        if field is StatisticsField.collection_date:
+            column = _date_bucket(column, date_bucket, dialect)
+        columns.append(column.label(field.value))
+
+    statement = select(*columns, count.label("count")).group_by(*columns).order_by(*columns)
+    groups = [SampleGroupCount(**row._mapping) for row in await db.execute(statement) if row.count]
+    return SampleStatistics(total=sum(group.count for group in groups), groups=groups)
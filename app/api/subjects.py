@@ -0,0 +1,123 @@
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import Select, func, select, union
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.endpoints import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER
+from app.api.filters import sample_conditions, sample_filters, sample_models
+from app.api.ratelimit import limit_concurrency
+from app.db.session import get_read_db
+from app.schemas.sample import SampleFilter, SampleRead, SubjectSummary
+
+router = APIRouter()
+
+def _subjects_page(filters: SampleFilter, after: Optional[str], limit: int) -> Select:
+    """
+    Select a page of the subjects having samples that match the filters, in samples or in archived_samples. Each table
+    is grouped by subject through its subject index and limited before the union.
+    :param filters: Sample filters.
+    :param after: Subject ID of the last subject of the previous page.
+    :param limit: Maximum number of subjects.
+    :return: Query of the subject IDs of the page.
+    """
+    pages = []
+    for model in sample_models(filters):
+        page = select(model.subject_id).where(*sample_conditions(filters, model))
+        if after is not None:
+            page = page.where(model.subject_id > after)
+        pages.append(page.group_by(model.subject_id).order_by(model.subject_id).limit(limit))
+    if len(pages) == 1:
+        return pages[0]
+    subjects = union(*(select(page.subquery()) for page in pages)).subquery()
+    return select(subjects.c.subject_id).order_by(subjects.c.subject_id).limit(limit)
+
+async def _summarize_subjects(db: AsyncSession, subjects, filters: SampleFilter) -> Dict[str, SubjectSummary]:
+    """
+    Summarize the samples of some subjects with one query per table grouped by subject, type and status. The query on
+    samples is answered from the ix_samples_subject_summary index without reading the table, the one on
+    archived_samples finds the subjects through ix_archived_samples_subject_id.
+    :param db: Database session.
+    :param subjects: Subject IDs to summarize, a list or a subquery selecting them.
+    :param filters: Sample filters restricting the samples that are counted.
+    :return: Dictionary of subject ID to its summary, in subject ID order, without subjects that have no samples.
+    """
+    summaries = {}
+    for model in sample_models(filters):
+        statement = (select(model.subject_id, model.sample_type, model.status, func.count().label("samples"),
+                            func.min(model.collection_date).label("first_collection_date"),
+                            func.max(model.collection_date).label("last_collection_date"))
+                     .where(model.subject_id.in_(subjects), *sample_conditions(filters, model))
+                     .group_by(model.subject_id, model.sample_type, model.status))
+        for row in await db.execute(statement):
+            summary = summaries.get(row.subject_id)
+            if summary is None:
+                summary = summaries[row.subject_id] = SubjectSummary(
+                    subject_id=row.subject_id, sample_count=0, by_type={}, by_status={},
+                    first_collection_date=row.first_collection_date, last_collection_date=row.last_collection_date)
+            summary.sample_count += row.samples
+            summary.by_type[row.sample_type] = summary.by_type.get(row.sample_type, 0) + row.samples
+            summary.by_status[row.status] = summary.by_status.get(row.status, 0) + row.samples
+            summary.first_collection_date = min(summary.first_collection_date, row.first_collection_date)
+            summary.last_collection_date = max(summary.last_collection_date, row.last_collection_date)
+    return dict(sorted(summaries.items()))
+
+async def _attach_samples(db: AsyncSession, summaries: Dict[str, SubjectSummary], filters: SampleFilter) -> None:
+    """
+    Read the samples of the summarized subjects with one query per table and attach them to their summaries, in ID
+    order.
+    :param db: Database session.
+    :param summaries: Summaries returned by _summarize_subjects.
+    :param filters: Sample filters restricting the samples, the same as for the summaries.
+    """
+    samples = defaultdict(list)
+    for model in sample_models(filters):
+        statement = select(model).where(model.subject_id.in_(list(summaries)), *sample_conditions(filters, model))
+        for sample in await db.scalars(statement):
+            samples[sample.subject_id].append(SampleRead.model_validate(sample))
+    for subject_id, summary in summaries.items():
+        summary.samples = sorted(samples[subject_id], key=lambda sample: sample.sample_id)
+
+@router.get("/subjects", response_model=List[SubjectSummary], dependencies=[Depends(limit_concurrency)])
+async def read_subjects(
+    response: Response,
+    filters: SampleFilter = Depends(sample_filters),
+    include_samples: bool = Query(False, description="Attach the list of samples to each subject"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of subjects per page"),
+    after: Optional[str] = Query(None, description="Return subjects whose ID sorts after this cursor"),
+    db: AsyncSession = Depends(get_read_db)) -> List[SubjectSummary]:
+    """
+    List the subjects having samples that match the filters, with the number of samples per type and status and the
+    range of their collection dates. Samples moved to archived_samples are included. Subjects are ordered by ID and
+    paginated with keyset pagination like GET /api/samples: the page of subjects and their counts are read in one
+    grouped query per table, the samples in one more.
+    :param response: Response, to set the X-Next-Cursor header.
+    :param filters: Sample filters taken from the query string, subjects are listed if any of their samples match.
+    :param include_samples: Whether to return the matching samples of each subject.
+    :param limit: Maximum number of subjects to return.
+    :param after: Subject ID of the last subject of the previous page.
+    :param db: Database session dependency.
+    :return: List of SubjectSummary schemas.
+    """
+    summaries = await _summarize_subjects(db, _subjects_page(filters, after, limit), filters)
+    if include_samples and summaries:
+        await _attach_samples(db, summaries, filters)
+    if len(summaries) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = next(reversed(summaries))
+    return list(summaries.values())
+
+@router.get("/subjects/{subject_id}", response_model=SubjectSummary)
+async def read_subject(subject_id: str, db: AsyncSession = Depends(get_read_db)) -> SubjectSummary:
+    """
+    Retrieve a subject with the number of samples per type and status and all its samples, archived_samples included,
+    ordered by ID.
+    :param subject_id: The ID of the subject to retrieve.
+    :param db: Database session dependency.
+    :return: SubjectSummary schema including the samples of the subject.
+    """
+    summaries = await _summarize_subjects(db, [subject_id], SampleFilter())
+    if subject_id not in summaries:
+        raise HTTPException(status_code=404, detail="Subject not found")
+    await _attach_samples(db, summaries, SampleFilter())
+    return summaries[subject_id]
@@ -0,0 +1,47 @@
+from datetime import datetime
+
+from sqlalchemy import delete, insert, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import ArchivedSample, Sample, StatusType, utcnow
+
+# Columns copied from samples to archived_samples
+ARCHIVED_COLUMNS = [column.key for column in Sample.__table__.columns]
+
+async def archive_samples(db: AsyncSession, archived_before: datetime, batch_size: int) -> int:
+    """
+    Move a batch of archived samples, last updated before a time, from samples to archived_samples in one
+    transaction. The rows are copied with INSERT ... SELECT, which takes the write lock first, then deleted by the IDs
+    it returned. The triggers take the move for what it is: the samples stay counted in the statistics and the storage
+    occupancy, move from the search index of samples to the one of archived_samples, and are not logged as deleted in
+    the change feed.
+    :param db: Database session of the primary.
+    :param archived_before: Samples whose last update (their archival, as archived samples are not edited) is older
+        than this are moved.
+    :param batch_size: Maximum number of samples moved.
+    :return: Number of samples moved, lower than batch_size once no more samples are due.
+    """
+    due = (select(*(getattr(Sample, column) for column in ARCHIVED_COLUMNS), literal(utcnow()))
+           .where(Sample.status == StatusType.archived, Sample.updated_at < archived_before).limit(batch_size))
+    sample_ids = (await db.scalars(insert(ArchivedSample).from_select([*ARCHIVED_COLUMNS, "archived_at"], due)
+                                   .returning(ArchivedSample.sample_id))).all()
+    if sample_ids:
+        await db.execute(delete(Sample).where(Sample.sample_id.in_(sample_ids))
+                         .execution_options(synchronize_session=False))
+    await db.commit()
+    return len(sample_ids)
+
+async def restore_samples(db: AsyncSession, conditions: list) -> int:
+    """
+    Move samples back from archived_samples to samples, in the transaction of the session, so that they can be written
+    again. They are inserted into samples before being deleted from archived_samples, which the triggers take for a
+    move: they are neither logged in the change feed nor counted twice.
+    :param db: Database session of the primary.
+    :param conditions: Conditions over ArchivedSample selecting the samples to restore.
+    :return: Number of samples restored.
+    """
+    archived = select(*(getattr(ArchivedSample, column) for column in ARCHIVED_COLUMNS)).where(*conditions)
+    result = await db.execute(insert(Sample).from_select(ARCHIVED_COLUMNS, archived))
+    if result.rowcount:
+        await db.execute(delete(ArchivedSample).where(*conditions).execution_options(synchronize_session=False))
+    return result.rowcount
@@ -0,0 +1,83 @@
+import re
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import StorageLocation
+
+# Levels of the storage hierarchy, from the outermost to the innermost
+LOCATION_LEVELS = ("site", "freezer", "shelf", "rack", "box", "position")
+LEVEL_ALIASES = {"pos": "position", "slot": "position"}
+
+_SEPARATORS = re.compile(r"[\s/:_-]+")
+_LABELLED = re.compile(r"(site|freezer|shelf|rack|box|position|pos|slot)(.*)", re.IGNORECASE)
+
+def parse_location(storage_location: str) -> Optional[Dict[str, str]]:
+    """
+    Parse a storage location into the levels of the hierarchy. Each level is a label followed by its value, attached
+    or as the next token: freezer-1-shelfA, site:BCN/freezer 2/rack-3/box-12/pos-A1. A bare token after the box is
+    its position (box-12-A1). Levels must go from the outermost to the innermost but can be skipped, and values are
+    case-insensitive.
+    :param storage_location: Free-form storage location of a sample.
+    :return: Dictionary of level to uppercase value, or None if the location does not follow this format.
+    """
+    tokens = [token for token in _SEPARATORS.split(storage_location) if token]
+    levels, depth, i = {}, -1, 0
+    while i < len(tokens):
+        match = _LABELLED.fullmatch(tokens[i])
+        if match:
+            level, value = LEVEL_ALIASES.get(match[1].lower(), match[1].lower()), match[2]
+            if not value:
+                i += 1
+                if i == len(tokens):
+                    return None
+                value = tokens[i]
+        elif depth == LOCATION_LEVELS.index("box"):
+            level, value = "position", tokens[i]
+        else:
+            return None
+        if LOCATION_LEVELS.index(level) <= depth:
+            return None
+        depth = LOCATION_LEVELS.index(level)
+        levels[level] = value.upper()
+        i += 1
+    return levels or None
+
+def location_path(levels: Dict[str, str]) -> str:
+    """
+    Materialized path of parsed levels, e.g. freezer:1/shelf:A/. The path of a location starts with the path of
+    every location containing it, so a subtree is a range of paths.
+    :param levels: Levels returned by parse_location.
+    :return: Path with one level:value/ component per level, outermost first.
+    """
+    return "".join(f"{level}:{levels[level]}/" for level in LOCATION_LEVELS if level in levels)
+
+def location_row(storage_location: str) -> dict:
+    """
+    Values of the storage_locations row of a location, without its sample count.
+    :param storage_location: Free-form storage location of a sample.
+    :return: Dictionary of column name to value, the levels and path are None if the location cannot be parsed.
+    """
+    levels = parse_location(storage_location) or {}
+    return {"storage_location": storage_location, **{level: levels.get(level) for level in LOCATION_LEVELS},
+            "path": location_path(levels) if levels else None}
+
+async def register_locations(db: AsyncSession, storage_locations: Iterable[str]) -> None:
+    """
+    Add storage locations to the storage_locations table, to be called before writing the samples referencing them
+    in the same transaction. Locations already registered are left as they are, unless the count triggers added them
+    without their levels.
+    :param db: Database session.
+    :param storage_locations: Storage locations about to be written, duplicates are ignored.
+    """
+    rows = [location_row(storage_location) for storage_location in sorted(set(storage_locations))]
+    if not rows:
+        return
+    dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+    statement = dialect.insert(StorageLocation)
+    statement = statement.on_conflict_do_update(
+        index_elements=[StorageLocation.storage_location],
+        set_={column: statement.excluded[column] for column in (*LOCATION_LEVELS, "path")},
+        where=StorageLocation.path.is_(None))
+    await db.execute(statement, rows)
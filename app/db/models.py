@@ -1,7 +1,8 @@
 import enum
+from datetime import datetime, timezone
 from uuid import uuid4
 
-from sqlalchemy import Column, String, Date, Enum
+from sqlalchemy import Column, String, Date, DateTime, Enum, Index, Integer, DDL, event
 
 from app.db.base import Base
 
@@ -15,12 +16,232 @@ class StatusType(enum.Enum):
     processing = "processing"
     archived = "archived"
 
+class ChangeOperation(enum.Enum):
+    created = "created"
+    updated = "updated"
+    deleted = "deleted"
+
+def utcnow() -> datetime:
+    """
+    Current UTC time as a naive datetime, the way DateTime columns are stored in SQLite.
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
 class Sample(Base):
     __tablename__ = "samples"
+    __table_args__ = (
+        # Equality filters on status/type followed by the keyset order on sample_id
+        Index("ix_samples_status_sample_type", "status", "sample_type", "sample_id"),
+        # Lookups by subject, and the per-subject counts of the subjects endpoints read from the index alone
+        Index("ix_samples_subject_summary", "subject_id", "sample_type", "status", "collection_date"),
+    )
 
     sample_id = Column(String, primary_key=True, default=lambda: str(uuid4()))
     sample_type = Column(Enum(SampleType), nullable=False)
     subject_id = Column(String, nullable=False)
+    collection_date = Column(Date, nullable=False, index=True)
+    status = Column(Enum(StatusType), nullable=False)
+    storage_location = Column(String, nullable=False, index=True)
+    # Set on every insert and update (including bulk statements), used to build the ETags of the sample endpoints
+    updated_at = Column(DateTime, nullable=False, default=utcnow, onupdate=utcnow)
+
+class ArchivedSample(Base):
+    """
+    Cold storage of the samples archived for longer than ARCHIVE_AFTER_DAYS, moved out of samples by the archiver (see
+    app/db/archive.py) so that the hot table and its indexes only grow with the samples in use. It has the columns of
+    samples plus the time of the move. Besides its primary key it is only indexed on the subject, for the subjects
+    endpoints: the listings with include_archived and other filters scan it in ID order. Its samples are still counted
+    in sample_counts and storage_locations, and archived_samples_fts indexes them for the searches with
+    include_archived.
+    """
+    __tablename__ = "archived_samples"
+
+    sample_id = Column(String, primary_key=True)
+    sample_type = Column(Enum(SampleType), nullable=False)
+    subject_id = Column(String, nullable=False, index=True)
     collection_date = Column(Date, nullable=False)
     status = Column(Enum(StatusType), nullable=False)
     storage_location = Column(String, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
+    archived_at = Column(DateTime, nullable=False, default=utcnow)
+
+class SampleChange(Base):
+    """
+    Append-only log of the writes to samples, numbered by a sequence that only grows (AUTOINCREMENT never reuses a
+    number). Created and updated samples are logged with their new values, deleted ones only with their ID. On SQLite
+    it is written by the triggers below, in the transaction of the write, and SQLite commits one write transaction at
+    a time, so changes become visible in sequence order.
+    """
+    __tablename__ = "sample_changes"
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    sequence = Column(Integer, primary_key=True, autoincrement=True)
+    sample_id = Column(String, nullable=False)
+    operation = Column(Enum(ChangeOperation), nullable=False)
+    sample_type = Column(Enum(SampleType))
+    subject_id = Column(String)
+    collection_date = Column(Date)
+    status = Column(Enum(StatusType))
+    storage_location = Column(String)
+    changed_at = Column(DateTime, nullable=False, default=utcnow)
+
+class SampleCount(Base):
+    """
+    Number of samples per (status, sample_type, storage_location, collection_date), kept up to date by the triggers
+    below on every insert, update and delete of samples. The samples moved to archived_samples stay counted until they
+    are deleted from there. It is much smaller than the samples table and can answer the statistics endpoint without
+    scanning it.
+    """
+    __tablename__ = "sample_counts"
+
+    status = Column(Enum(StatusType), primary_key=True)
+    sample_type = Column(Enum(SampleType), primary_key=True)
+    storage_location = Column(String, primary_key=True)
+    collection_date = Column(Date, primary_key=True)
+    sample_count = Column(Integer, nullable=False)
+
+# Conditions of the triggers telling the moves between samples and archived_samples (see app/db/archive.py) from the
+# writes: the archiver inserts a sample into archived_samples before deleting it from samples, and a restored sample is
+# inserted into samples before being deleted from archived_samples
+_NOT_ARCHIVED = "WHEN NOT EXISTS (SELECT 1 FROM archived_samples WHERE sample_id = {row}.sample_id) "
+_NOT_HOT = "WHEN NOT EXISTS (SELECT 1 FROM samples WHERE sample_id = OLD.sample_id) "
+
+_SAMPLE_COUNT_KEY = "status, sample_type, storage_location, collection_date"
+_SAMPLE_COUNT_MATCH = ("status = OLD.status AND sample_type = OLD.sample_type "
+                       "AND storage_location = OLD.storage_location AND collection_date = OLD.collection_date")
+_SAMPLE_COUNT_INCREMENT = f"""
+    INSERT INTO sample_counts ({_SAMPLE_COUNT_KEY}, sample_count)
+    VALUES (NEW.status, NEW.sample_type, NEW.storage_location, NEW.collection_date, 1)
+    ON CONFLICT ({_SAMPLE_COUNT_KEY}) DO UPDATE SET sample_count = sample_count + 1;"""
+_SAMPLE_COUNT_DECREMENT = f"""
+    UPDATE sample_counts SET sample_count = sample_count - 1 WHERE {_SAMPLE_COUNT_MATCH};
+    DELETE FROM sample_counts WHERE {_SAMPLE_COUNT_MATCH} AND sample_count <= 0;"""
+
+# SQLite triggers maintaining sample_counts, also created by revision 5c2e7b1d9f40 for migrated databases. The moves
+# between samples and archived_samples are skipped (revision e7a3c9d41b06).
+SAMPLE_COUNT_TRIGGERS = [
+    f"CREATE TRIGGER IF NOT EXISTS sample_counts_insert AFTER INSERT ON samples {_NOT_ARCHIVED.format(row='NEW')}"
+    f"BEGIN {_SAMPLE_COUNT_INCREMENT} END",
+    f"CREATE TRIGGER IF NOT EXISTS sample_counts_delete AFTER DELETE ON samples {_NOT_ARCHIVED.format(row='OLD')}"
+    f"BEGIN {_SAMPLE_COUNT_DECREMENT} END",
+    f"CREATE TRIGGER IF NOT EXISTS sample_counts_archived_delete AFTER DELETE ON archived_samples {_NOT_HOT}"
+    f"BEGIN {_SAMPLE_COUNT_DECREMENT} END",
+    f"CREATE TRIGGER IF NOT EXISTS sample_counts_update AFTER UPDATE OF {_SAMPLE_COUNT_KEY} ON samples "
+    f"BEGIN {_SAMPLE_COUNT_DECREMENT} {_SAMPLE_COUNT_INCREMENT} END",
+]
+
+for trigger in SAMPLE_COUNT_TRIGGERS:
+    event.listen(Base.metadata, "after_create", DDL(trigger).execute_if(dialect="sqlite"))
+
+class StorageLocation(Base):
+    """
+    Each distinct storage location of the samples, parsed into the levels of the storage hierarchy (see
+    app/db/locations.py) and its materialized path. Locations that do not follow the format have no levels nor path.
+    Rows are added by the write endpoints before the samples referencing them, and sample_count is kept up to date by
+    the triggers below, so that the occupancy of a subtree is read from the path index alone.
+    """
+    __tablename__ = "storage_locations"
+    __table_args__ = (
+        # Covering index of the occupancy counts: a subtree is a range of paths
+        Index("ix_storage_locations_path", "path", "sample_count"),
+    )
+
+    storage_location = Column(String, primary_key=True)
+    site = Column(String)
+    freezer = Column(String)
+    shelf = Column(String)
+    rack = Column(String)
+    box = Column(String)
+    position = Column(String)
+    path = Column(String)
+    sample_count = Column(Integer, nullable=False, default=0)
+
+_LOCATION_INCREMENT = """
+    INSERT INTO storage_locations (storage_location, sample_count) VALUES (NEW.storage_location, 1)
+    ON CONFLICT (storage_location) DO UPDATE SET sample_count = sample_count + 1;"""
+_LOCATION_DECREMENT = """
+    UPDATE storage_locations SET sample_count = sample_count - 1 WHERE storage_location = OLD.storage_location;
+    DELETE FROM storage_locations WHERE storage_location = OLD.storage_location AND sample_count <= 0;"""
+
+# SQLite triggers maintaining storage_locations.sample_count, also created by revision 9b4e1c7a2d63. A location
+# written without being registered first is still counted, without levels. The samples moved to archived_samples stay
+# in their boxes and are still counted (revision e7a3c9d41b06).
+STORAGE_LOCATION_TRIGGERS = [
+    f"CREATE TRIGGER IF NOT EXISTS storage_locations_insert AFTER INSERT ON samples {_NOT_ARCHIVED.format(row='NEW')}"
+    f"BEGIN {_LOCATION_INCREMENT} END",
+    f"CREATE TRIGGER IF NOT EXISTS storage_locations_delete AFTER DELETE ON samples {_NOT_ARCHIVED.format(row='OLD')}"
+    f"BEGIN {_LOCATION_DECREMENT} END",
+    f"CREATE TRIGGER IF NOT EXISTS storage_locations_archived_delete AFTER DELETE ON archived_samples {_NOT_HOT}"
+    f"BEGIN {_LOCATION_DECREMENT} END",
+    f"CREATE TRIGGER IF NOT EXISTS storage_locations_update AFTER UPDATE OF storage_location ON samples "
+    f"WHEN OLD.storage_location <> NEW.storage_location BEGIN {_LOCATION_INCREMENT} {_LOCATION_DECREMENT} END",
+]
+
+for trigger in STORAGE_LOCATION_TRIGGERS:
+    event.listen(Base.metadata, "after_create", DDL(trigger).execute_if(dialect="sqlite"))
+
+_SAMPLE_CHANGE_COLUMNS = "sample_id, operation, sample_type, subject_id, collection_date, status, storage_location"
+_SAMPLE_CHANGE_NOW = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+def _log_sample_change(operation: ChangeOperation) -> str:
+    values = ("OLD.sample_id, 'deleted', NULL, NULL, NULL, NULL, NULL" if operation is ChangeOperation.deleted else
+              f"NEW.sample_id, '{operation.name}', NEW.sample_type, NEW.subject_id, NEW.collection_date, NEW.status, "
+              f"NEW.storage_location")
+    return (f"INSERT INTO sample_changes ({_SAMPLE_CHANGE_COLUMNS}, changed_at) "
+            f"VALUES ({values}, {_SAMPLE_CHANGE_NOW});")
+
+# SQLite triggers writing sample_changes, also created by revision 3f8a6d2e5c91. The moves between samples and
+# archived_samples are not logged, the deletion of an archived sample is (revision e7a3c9d41b06).
+SAMPLE_CHANGE_TRIGGERS = [
+    f"CREATE TRIGGER IF NOT EXISTS sample_changes_insert AFTER INSERT ON samples {_NOT_ARCHIVED.format(row='NEW')}"
+    f"BEGIN {_log_sample_change(ChangeOperation.created)} END",
+    f"CREATE TRIGGER IF NOT EXISTS sample_changes_update AFTER UPDATE ON samples "
+    f"BEGIN {_log_sample_change(ChangeOperation.updated)} END",
+    f"CREATE TRIGGER IF NOT EXISTS sample_changes_delete AFTER DELETE ON samples {_NOT_ARCHIVED.format(row='OLD')}"
+    f"BEGIN {_log_sample_change(ChangeOperation.deleted)} END",
+    f"CREATE TRIGGER IF NOT EXISTS sample_changes_archived_delete AFTER DELETE ON archived_samples {_NOT_HOT}"
+    f"BEGIN {_log_sample_change(ChangeOperation.deleted)} END",
+]
+
+for trigger in SAMPLE_CHANGE_TRIGGERS:
+    # DDL formats its statement with %, the strftime format needs escaping
+    event.listen(Base.metadata, "after_create", DDL(trigger.replace("%", "%%")).execute_if(dialect="sqlite"))
+
+# SQLite FTS5 index of subject_id and storage_location used by the search endpoint. It is an external content table,
+# reading the indexed text back from samples by rowid, with prefix indexes for the short prefixes typed by users.
+# The triggers keep it in sync with samples; revision 7d3f2a9c4b18 creates the same objects for migrated databases.
+SAMPLE_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS samples_fts USING fts5(subject_id, storage_location, content='samples', "
+    "content_rowid='rowid', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS samples_fts_insert AFTER INSERT ON samples BEGIN "
+    "INSERT INTO samples_fts (rowid, subject_id, storage_location) "
+    "VALUES (NEW.rowid, NEW.subject_id, NEW.storage_location); END",
+    "CREATE TRIGGER IF NOT EXISTS samples_fts_delete AFTER DELETE ON samples BEGIN "
+    "INSERT INTO samples_fts (samples_fts, rowid, subject_id, storage_location) "
+    "VALUES ('delete', OLD.rowid, OLD.subject_id, OLD.storage_location); END",
+    "CREATE TRIGGER IF NOT EXISTS samples_fts_update AFTER UPDATE OF subject_id, storage_location ON samples BEGIN "
+    "INSERT INTO samples_fts (samples_fts, rowid, subject_id, storage_location) "
+    "VALUES ('delete', OLD.rowid, OLD.subject_id, OLD.storage_location); "
+    "INSERT INTO samples_fts (rowid, subject_id, storage_location) "
+    "VALUES (NEW.rowid, NEW.subject_id, NEW.storage_location); END",
+]
+
+for statement in SAMPLE_SEARCH_DDL:
+    event.listen(Base.metadata, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+
+# The same index over archived_samples, searched with include_archived, also created by revision e7a3c9d41b06.
+# Archived samples are not updated in place (the write endpoints move them back to samples first), so only inserts and
+# deletes are indexed.
+ARCHIVED_SAMPLE_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS archived_samples_fts USING fts5(subject_id, storage_location, "
+    "content='archived_samples', content_rowid='rowid', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS archived_samples_fts_insert AFTER INSERT ON archived_samples BEGIN "
+    "INSERT INTO archived_samples_fts (rowid, subject_id, storage_location) "
+    "VALUES (NEW.rowid, NEW.subject_id, NEW.storage_location); END",
+    "CREATE TRIGGER IF NOT EXISTS archived_samples_fts_delete AFTER DELETE ON archived_samples BEGIN "
+    "INSERT INTO archived_samples_fts (archived_samples_fts, rowid, subject_id, storage_location) "
+    "VALUES ('delete', OLD.rowid, OLD.subject_id, OLD.storage_location); END",
+]
+
+for statement in ARCHIVED_SAMPLE_SEARCH_DDL:
+    event.listen(Base.metadata, "after_create", DDL(statement).execute_if(dialect="sqlite"))
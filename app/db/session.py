@@ -1,24 +1,235 @@
-from typing import Generator
+import hashlib
+import itertools
+import os
+import time
+from typing import AsyncGenerator, Dict, Iterable, List, Optional, Union
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 
 from app.api.configuration import settings
+from app.api.metrics import record_query
+from app.api.profiling import record_profiled_query
 
-engine = create_engine(settings.database_url, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Async DBAPI driver used for each database backend when the configured URL names a blocking one (or none)
+ASYNC_DRIVERS = {
+    "sqlite": "aiosqlite",
+    "postgresql": "asyncpg",
+}
 
-def get_db() -> Generator[Session, None, None]:
+# PRAGMA presets for SQLite connections. "default" keeps SQLite's own settings (rollback journal, synchronous=FULL).
+# "production" uses WAL so that readers no longer block behind a writer, with synchronous=NORMAL (durable up to the
+# last checkpoint on power loss, which is safe in WAL mode), a busy timeout instead of immediate "database is locked"
+# errors, a 64 MiB page cache, 256 MiB of memory-mapped I/O and in-memory temporary tables.
+SQLITE_PROFILES: Dict[str, Dict[str, Union[int, str]]] = {
+    "default": {},
+    "production": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,
+        "cache_size": -65536,
+        "mmap_size": 268435456,
+        "temp_store": "MEMORY",
+    },
+}
+
+def async_database_url(database_url: str) -> URL:
+    """
+    Translate a database URL into its asyncio equivalent, e.g. sqlite:///./test.db becomes
+    sqlite+aiosqlite:///./test.db and postgresql://... becomes postgresql+asyncpg://... URLs that already name an
+    async driver are returned unchanged.
+    :param database_url: Database URL as written in the settings.
+    :return: URL using an async driver.
+    """
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend in ASYNC_DRIVERS and url.get_driver_name() not in ASYNC_DRIVERS.values():
+        url = url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+    return url
+
+def sqlite_pragmas() -> Dict[str, Union[int, str]]:
+    """
+    PRAGMAs configured in the settings: the SQLITE_PROFILE preset updated with the SQLITE_PRAGMAS overrides.
+    :return: Dictionary of PRAGMA name to value.
+    """
+    if settings.sqlite_profile not in SQLITE_PROFILES:
+        raise ValueError(f"Unknown SQLite profile {settings.sqlite_profile!r}, expected one of {list(SQLITE_PROFILES)}")
+    return {**SQLITE_PROFILES[settings.sqlite_profile], **settings.sqlite_pragmas}
+
+def create_database_engine(database_url: str, pragmas: Optional[Dict[str, Union[int, str]]] = None) -> AsyncEngine:
+    """
+    Create the async engine of the application. The pool is sized from the settings, and for SQLite the given PRAGMAs
+    are run on every new connection through a connect event hook. Cursor execution hooks time every query for the
+    metrics, and record it in the profile of the request when it is profiled.
+    :param database_url: Database URL as written in the settings.
+    :param pragmas: PRAGMAs to apply to SQLite connections, ignored for other databases.
+    :return: AsyncEngine.
+    """
+    url = async_database_url(database_url)
+    is_sqlite = url.get_backend_name() == "sqlite"
+
+    options = {}
+    if not (is_sqlite and url.database in (None, "", ":memory:")):
+        options = {"pool_size": settings.database_pool_size, "max_overflow": settings.database_max_overflow,
+                   "pool_timeout": settings.database_pool_timeout}
+    engine = create_async_engine(url, **options)
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def start_query_timer(connection, cursor, statement, parameters, context, executemany) -> None:
+        context.query_started = time.perf_counter()
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def record_query_time(connection, cursor, statement, parameters, context, executemany) -> None:
+        duration = time.perf_counter() - context.query_started
+        record_query(duration)
+        record_profiled_query(connection, statement, parameters, duration, executemany)
+
+    if is_sqlite and pragmas:
+        @event.listens_for(engine.sync_engine, "connect")
+        def apply_pragmas(dbapi_connection, connection_record) -> None:
+            cursor = dbapi_connection.cursor()
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name} = {value}")
+            cursor.close()
+
+    return engine
+
+class ReadRouter:
+    """
+    Chooses the database of read-only requests. Reads are spread round-robin over the replicas, except for clients
+    that wrote within the last read_your_writes_seconds: these keep reading from the primary, so that they see their
+    own writes despite the replication lag. Without replicas every read goes to the primary.
+    """
+    # Number of tracked clients above which the expired ones are dropped
+    MAX_TRACKED_CLIENTS = 1024
+
+    def __init__(self, primary: async_sessionmaker, replicas: Iterable[async_sessionmaker],
+                 read_your_writes_seconds: float):
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.read_your_writes_seconds = read_your_writes_seconds
+        self._next_replica = itertools.cycle(self.replicas)
+        self._last_writes: Dict[str, float] = {}
+
+    def record_write(self, client: str) -> None:
+        """
+        Pin the reads of a client to the primary for the next read_your_writes_seconds.
+        :param client: Key identifying the client, see client_key.
+        """
+        if self.read_your_writes_seconds <= 0:
+            return
+        now = time.monotonic()
+        self._last_writes[client] = now
+        if len(self._last_writes) > self.MAX_TRACKED_CLIENTS:
+            self._last_writes = {key: written for key, written in self._last_writes.items()
+                                 if now - written < self.read_your_writes_seconds}
+
+    def reads_own_writes(self, client: Optional[str]) -> bool:
+        written = self._last_writes.get(client)
+        return written is not None and time.monotonic() - written < self.read_your_writes_seconds
+
+    def sessionmaker(self, client: Optional[str] = None) -> async_sessionmaker:
+        """
+        Sessionmaker to use for a read-only request.
+        :param client: Key identifying the client, None if unknown.
+        :return: The primary sessionmaker if there are no replicas or the client wrote recently, else the next replica.
+        """
+        if not self.replicas or self.reads_own_writes(client):
+            return self.primary
+        return next(self._next_replica)
+
+def client_key(request: Request) -> str:
+    """
+    Key identifying the client of a request for read-your-writes: a hash of its credentials, or its address if the
+    request is not authenticated.
+    :param request: Incoming request.
+    :return: Opaque string key.
+    """
+    authorization = request.headers.get("authorization")
+    if authorization:
+        return hashlib.sha256(authorization.encode()).hexdigest()
+    return request.client.host if request.client else ""
+
+class Database:
+    """
+    Engines of the primary database and of the replicas, and the ReadRouter over their sessionmakers. They are created
+    on first use rather than at import, by the process using them: a multi-worker server can import (preload) the
+    application once and fork the workers without them inheriting an engine or its pooled connections. The lifespan
+    of the application connects at startup and disposes of the engines at shutdown.
+    """
+    def __init__(self):
+        self._engines: List[AsyncEngine] = []
+        self._read_router: Optional[ReadRouter] = None
+        self._pid: Optional[int] = None
+
+    @property
+    def read_router(self) -> ReadRouter:
+        if self._pid != os.getpid():
+            self.connect()
+        return self._read_router
+
+    def connect(self) -> None:
+        """
+        Create the engines from the settings, unless this process already did.
+        """
+        if self._pid == os.getpid():
+            return
+        # Engines inherited from the parent process: drop their pools without closing the parent's connections
+        for engine in self._engines:
+            engine.sync_engine.dispose(close=False)
+
+        primary = create_database_engine(settings.database_url, sqlite_pragmas())
+        # Replicas only serve reads, so SQLite replicas are also opened with query_only to reject accidental writes
+        replicas = [create_database_engine(url, {**sqlite_pragmas(), "query_only": 1})
+                    for url in settings.database_replica_urls]
+        self._engines = [primary, *replicas]
+        sessionmakers = [async_sessionmaker(autoflush=False, expire_on_commit=False, bind=engine)
+                         for engine in self._engines]
+        self._read_router = ReadRouter(sessionmakers[0], sessionmakers[1:], settings.read_your_writes_seconds)
+        self._pid = os.getpid()
+
+    async def dispose(self) -> None:
+        """
+        Close the pooled connections of the engines, they are created again on next use.
+        """
+        for engine in self._engines:
+            await engine.dispose()
+        self._engines, self._read_router, self._pid = [], None, None
+
+database = Database()
+
+async def get_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
     """
     Dependency that provides a database session for the lifetime of a request. We use a Python Generator to ensure that
-    the finally block is executed to close the session after the request is processed. Using a return statement will be
-    problematic as it will always exit the function immediately, and the finally block will not be executed.
-    :return: SessionLocal
+    the session is closed after the request is processed, the async context manager releases the connection back to the
+    pool even if the request fails. Objects are not expired on commit, as reloading expired attributes would need
+    implicit IO, which is not allowed with an AsyncSession. The session is bound to the primary database, and
+    requests that may write pin the reads of their client to the primary (see ReadRouter).
+    :param request: Incoming request, used to identify the client.
+    :return: Session of the primary.
     """
-    db = SessionLocal()
+    read_router = database.read_router
     try:
-        # Ensure the database connection is established
-        yield db
+        async with read_router.primary() as db:
+            yield db
     finally:
-        # Close the session to release resources
-        db.close()
+        if request.method not in ("GET", "HEAD", "OPTIONS"):
+            read_router.record_write(client_key(request))
+
+async def get_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency that provides a database session for read-only requests, bound to a replica chosen by the ReadRouter.
+    The session info holds "read_your_writes" when it was routed to the primary because its client wrote recently, and
+    "replica" when it is bound to a replica, whose reads may lag behind the primary.
+    :param request: Incoming request, used to identify the client.
+    :return: Session of the primary or of a replica.
+    """
+    client = client_key(request)
+    read_router = database.read_router
+    sessionmaker = read_router.sessionmaker(client)
+    async with sessionmaker() as db:
+        db.info["read_your_writes"] = read_router.reads_own_writes(client)
+        db.info["replica"] = sessionmaker is not read_router.primary
+        yield db
@@ -1,11 +1,58 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
+
 from fastapi import FastAPI, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
 from fastapi.security import OAuth2PasswordRequestForm
 
 from app.api.endpoints import router
+from app.api.statistics import router as statistics_router
+from app.api.export import router as export_router
+from app.api.search import router as search_router
+from app.api.locations import router as locations_router
+from app.api.changes import router as changes_router
+from app.api.subjects import router as subjects_router
 from app.api.authentication import authenticate_user, create_access_token, get_current_user
+from app.api.archiving import run_archiver
+from app.api.caching import response_cache
+from app.api.configuration import settings
+from app.api.metrics import MetricsMiddleware, registry
+from app.api.profiling import ProfilingMiddleware, router as profiling_router
+from app.api.ratelimit import AdmissionMiddleware, limit_concurrency, rate_limit
+from app.db.session import database
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Create the database engines when the server starts, in the worker process (after the fork of a preloading
+    server), and close their connections on shutdown. The archiver runs in the background meanwhile, if enabled.
+    """
+    database.connect()
+    archiver = asyncio.create_task(run_archiver()) if settings.archive_after_days > 0 else None
+    yield
+    if archiver is not None:
+        archiver.cancel()
+        with suppress(asyncio.CancelledError):
+            await archiver
+    await database.dispose()
+
+app = FastAPI(title="Sample Management API", version="1.0.0", lifespan=lifespan)
+app.add_middleware(AdmissionMiddleware)
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(MetricsMiddleware)
 
-app = FastAPI(title="Sample Management API", version="1.0.0")
-app.include_router(router, prefix="/api", dependencies=[Depends(get_current_user)])
+# Every API request counts against the rate limit of its user, the routers running heavy queries are also capped in
+# concurrency (the listings of samples and subjects through their own route dependencies)
+api_dependencies = [Depends(get_current_user), Depends(rate_limit)]
+expensive_dependencies = [*api_dependencies, Depends(limit_concurrency)]
+app.include_router(router, prefix="/api", dependencies=api_dependencies)
+app.include_router(statistics_router, prefix="/api", dependencies=expensive_dependencies)
+app.include_router(export_router, prefix="/api", dependencies=expensive_dependencies)
+app.include_router(search_router, prefix="/api", dependencies=expensive_dependencies)
+app.include_router(locations_router, prefix="/api", dependencies=expensive_dependencies)
+app.include_router(changes_router, prefix="/api", dependencies=api_dependencies)
+app.include_router(subjects_router, prefix="/api", dependencies=api_dependencies)
+app.include_router(profiling_router)
 
 @app.post("/auth/token")
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()) -> dict:
@@ -14,7 +61,7 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     :param form_data: The form data containing username and password.
     :return: A dictionary containing the access token and its type.
     """
-    user = authenticate_user(form_data.username, form_data.password)
+    user = await authenticate_user(form_data.username, form_data.password)
     if not user:
         raise HTTPException(status_code=400, detail="Incorrect username or password")
     else:
@@ -29,3 +76,19 @@ async def read_users_me(current_user = Depends(get_current_user)) -> dict:
     :return: A dictionary containing the current user's information.
     """
     return current_user
+
+@app.get("/cache/stats", dependencies=[Depends(get_current_user)])
+async def read_cache_stats() -> dict:
+    """
+    Endpoint to get the size and hit rate of the response cache of the sample listing.
+    :return: A dictionary containing the cache statistics.
+    """
+    return response_cache.stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def read_metrics() -> PlainTextResponse:
+    """
+    Endpoint exposing the request, database and authentication metrics of the process in the Prometheus text format.
+    :return: Metrics as plain text.
+    """
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
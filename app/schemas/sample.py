@@ -1,9 +1,10 @@
-from datetime import date
-from typing import Optional
+import enum
+from datetime import date, datetime
+from typing import Dict, Optional, List
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, field_validator, model_validator
 
-from app.db.models import SampleType, StatusType
+from app.db.models import ChangeOperation, SampleType, StatusType
 
 class SampleCreate(BaseModel):
     sample_type: SampleType
@@ -24,3 +25,139 @@ class SampleUpdate(BaseModel):
     collection_date: Optional[date] = None
     status: Optional[StatusType] = None
     storage_location: Optional[str] = None
+
+    @field_validator("*")
+    @classmethod
+    def check_not_null(cls, value):
+        # Fields are optional so that they can be left out, the columns themselves are NOT NULL
+        if value is None:
+            raise ValueError("Field cannot be null, leave it out to keep its value")
+        return value
+
+class SampleFilter(BaseModel):
+    sample_status: Optional[StatusType] = None
+    sample_type: Optional[SampleType] = None
+    subject_id: Optional[str] = None
+    collected_from: Optional[date] = None
+    collected_to: Optional[date] = None
+    storage_location_prefix: Optional[str] = None
+
+    def matches(self, values: dict) -> bool:
+        """
+        Evaluate the filters on the column values of a sample in Python, mirroring the SQL conditions of the listing.
+        :param values: Column values of a sample, keyed by column name.
+        :return: True if the sample would be returned by a listing with these filters.
+        """
+        return ((self.sample_status is None or values["status"] == self.sample_status)
+                and (self.sample_type is None or values["sample_type"] == self.sample_type)
+                and (self.subject_id is None or values["subject_id"] == self.subject_id)
+                and (self.collected_from is None or values["collection_date"] >= self.collected_from)
+                and (self.collected_to is None or values["collection_date"] <= self.collected_to)
+                and (not self.storage_location_prefix
+                     or values["storage_location"].startswith(self.storage_location_prefix)))
+
+class SampleSelection(SampleFilter):
+    sample_ids: Optional[List[str]] = Field(None, max_length=10000)
+
+    @model_validator(mode="after")
+    def check_selection_is_not_empty(self) -> "SampleSelection":
+        # Refuse selections without IDs nor filters, they would match the whole table
+        if self.sample_ids is None and not self.model_dump(include=set(SampleFilter.model_fields), exclude_none=True):
+            raise ValueError("Provide sample_ids or at least one filter")
+        return self
+
+class BulkUpdate(SampleSelection):
+    changes: SampleUpdate
+    returning: bool = False
+
+class BulkDelete(SampleSelection):
+    returning: bool = False
+
+class BulkWriteResult(BaseModel):
+    affected: int
+    samples: Optional[List[SampleRead]] = None
+
+class SampleLookup(BaseModel):
+    sample_ids: List[str] = Field(..., min_length=1, max_length=10000)
+
+class SampleLookupResult(BaseModel):
+    samples: List[SampleRead]
+    missing: List[str]
+
+class BulkRowError(BaseModel):
+    index: int
+    errors: List[dict]
+
+class BulkCreateResult(BaseModel):
+    created: int
+    sample_ids: List[str]
+    errors: List[BulkRowError]
+
+class StatisticsField(enum.Enum):
+    status = "status"
+    sample_type = "sample_type"
+    storage_location = "storage_location"
+    collection_date = "collection_date"
+
+class DateBucket(enum.Enum):
+    day = "day"
+    week = "week"
+    month = "month"
+
+class SampleGroupCount(BaseModel):
+    status: Optional[StatusType] = None
+    sample_type: Optional[SampleType] = None
+    storage_location: Optional[str] = None
+    collection_date: Optional[date] = None
+    count: int
+
+class SampleStatistics(BaseModel):
+    total: int
+    groups: List[SampleGroupCount]
+
+class ExportFormat(enum.Enum):
+    csv = "csv"
+    arrow = "arrow"
+    parquet = "parquet"
+
+class ExportCompression(enum.Enum):
+    none = "none"
+    gzip = "gzip"
+    zstd = "zstd"
+
+class SearchField(enum.Enum):
+    subject_id = "subject_id"
+    storage_location = "storage_location"
+
+class LocationChild(BaseModel):
+    path: str
+    level: str
+    name: str
+    samples: int
+
+class LocationOccupancy(BaseModel):
+    path: str
+    samples: int
+    capacity: Optional[int] = None
+    free_slots: Optional[int] = None
+    children: List[LocationChild]
+
+class SampleChangeRead(BaseModel):
+    sequence: int
+    operation: ChangeOperation
+    sample_id: str
+    changed_at: datetime
+    sample: Optional[SampleRead] = None
+
+class SampleChangeFeed(BaseModel):
+    changes: List[SampleChangeRead]
+    last_sequence: int
+
+class SubjectSummary(BaseModel):
+    subject_id: str
+    sample_count: int
+    by_type: Dict[SampleType, int]
+    by_status: Dict[StatusType, int]
+    first_collection_date: date
+    last_collection_date: date
+    samples: Optional[List[SampleRead]] = None
@@ -0,0 +1,245 @@
+"""
+Load test of the API endpoints.
+
+Runs the application in-process with the database dependencies overridden, as in tests/conftest.py: either the shared
+in-memory SQLite database (StaticPool) of the tests, on which the requests take turns, or a fresh file-backed SQLite
+database using the production PRAGMA profile. After seeding the samples table, each scenario sends a number of
+requests with a fixed number in flight, and reports the throughput, the p50/p95/p99 latencies and the failed
+requests.
+
+Results can be written as JSON with --output, and compared with those of another commit with --compare:
+
+    python -m benchmarks.bench_api --database file --rows 100000 --output before.json
+    python -m benchmarks.bench_api --database file --rows 100000 --compare before.json --max-regression 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List
+from uuid import uuid4
+
+import httpx
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+
+from app.api import ratelimit
+from app.api.ratelimit import ConcurrencyLimiter, MemoryStore, RateLimiter
+from app.db.base import Base
+from app.db.models import Sample, SampleType, StatusType
+from app.db.session import SQLITE_PROFILES, create_database_engine, get_db, get_read_db
+from app.main import app
+
+SEED_BATCH_SIZE = 10000
+CREDENTIALS = {"username": "johndoe", "password": "secret123"}
+
+def new_sample(rng: random.Random, rows: int) -> dict:
+    return {
+        "sample_type": rng.choice(list(SampleType)).value,
+        "subject_id": f"P{rng.randrange(rows):07d}",
+        "collection_date": str(date(2024, 1, 1) + timedelta(days=rng.randrange(365))),
+        "status": rng.choice(list(StatusType)).value,
+        "storage_location": f"freezer-{rng.randrange(20)}-box-{rng.randrange(100)}",
+    }
+
+async def seed(engine: AsyncEngine, rows: int, rng: random.Random) -> List[str]:
+    """
+    Create the tables and insert the samples.
+    :return: IDs of the inserted samples.
+    """
+    sample_ids = []
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+        for start in range(0, rows, SEED_BATCH_SIZE):
+            batch = []
+            for _ in range(min(SEED_BATCH_SIZE, rows - start)):
+                sample = new_sample(rng, rows)
+                sample["sample_id"] = str(uuid4())
+                sample["sample_type"] = SampleType(sample["sample_type"])
+                sample["status"] = StatusType(sample["status"])
+                sample["collection_date"] = date.fromisoformat(sample["collection_date"])
+                batch.append(sample)
+            await connection.execute(insert(Sample), batch)
+            sample_ids.extend(sample["sample_id"] for sample in batch)
+    return sample_ids
+
+def scenarios(args: argparse.Namespace, sample_ids: List[str], rng: random.Random) -> Dict[str, Callable]:
+    """
+    Request of each scenario, as a function of the client and the index of the request returning the response.
+    Deletes use their own slice of the seeded samples, so that reads and updates never hit a deleted sample.
+    """
+    deleted, kept = sample_ids[:args.requests], sample_ids[args.requests:] or sample_ids
+
+    def create(client, i):
+        return client.post("/api/samples", json=new_sample(rng, args.rows))
+
+    def bulk_create(client, i):
+        return client.post("/api/samples/bulk", json=[new_sample(rng, args.rows) for _ in range(args.bulk_size)])
+
+    def get_by_id(client, i):
+        return client.get(f"/api/samples/{rng.choice(kept)}")
+
+    def lookup(client, i):
+        return client.post("/api/samples/lookup", json={"sample_ids": rng.sample(kept, args.lookup_size)})
+
+    def list_filtered(client, i):
+        return client.get("/api/samples", params={
+            "sample_status": rng.choice(list(StatusType)).value, "sample_type": rng.choice(list(SampleType)).value,
+            "after": rng.choice(kept), "limit": args.page_size})
+
+    def update(client, i):
+        return client.put(f"/api/samples/{rng.choice(kept)}", json={"status": rng.choice(list(StatusType)).value})
+
+    def delete(client, i):
+        return client.delete(f"/api/samples/{deleted[i % len(deleted)]}")
+
+    def login(client, i):
+        return client.post("/auth/token", data=CREDENTIALS)
+
+    return {"create": create, "bulk_create": bulk_create, "get_by_id": get_by_id, "lookup": lookup,
+            "list_filtered": list_filtered, "update": update, "delete": delete, "login": login}
+
+async def run_scenario(client: httpx.AsyncClient, request: Callable[..., Awaitable[httpx.Response]], requests: int,
+                       concurrency: int) -> dict:
+    """
+    Send the requests of a scenario, keeping `concurrency` of them in flight.
+    :return: Dictionary with the number of requests and errors, the throughput and the latency percentiles.
+    """
+    latencies, errors = [], 0
+    next_index = iter(range(requests))
+
+    async def worker() -> None:
+        nonlocal errors
+        for i in next_index:
+            started = time.perf_counter()
+            response = await request(client, i)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {"requests": requests, "errors": errors, "rps": round(requests / elapsed, 1),
+            "p50_ms": round(quantiles[49], 2), "p95_ms": round(quantiles[94], 2), "p99_ms": round(quantiles[98], 2)}
+
+async def run(args: argparse.Namespace, database_url: str) -> Dict[str, dict]:
+    rng = random.Random(args.seed)
+    pragmas = SQLITE_PROFILES["production"] if args.database == "file" else None
+    engine = create_database_engine(database_url, pragmas)
+    sessionmaker = async_sessionmaker(autoflush=False, expire_on_commit=False, bind=engine)
+    # The StaticPool of the in-memory database has a single connection, the sessions take turns on it so that the
+    # transactions of concurrent requests do not get mixed up
+    connection_lock = asyncio.Lock() if args.database == "memory" else None
+
+    async def override_get_db():
+        if connection_lock is None:
+            async with sessionmaker() as db:
+                yield db
+        else:
+            async with connection_lock, sessionmaker() as db:
+                yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    if not args.rate_limits:
+        # All the requests come from one user, the limits would reject most of them instead of measuring the API
+        ratelimit.rate_limiter = RateLimiter(MemoryStore(max_size=1), rate=0, burst=0)
+        ratelimit.expensive_request_limiter = ConcurrencyLimiter(limit=0)
+    sample_ids = await seed(engine, args.rows, rng)
+    requests = scenarios(args, sample_ids, rng)
+
+    results = {}
+    # Unhandled errors of the application are counted as 500 responses instead of stopping the benchmark
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        token = (await client.post("/auth/token", data=CREDENTIALS)).json()["access_token"]
+        client.headers["Authorization"] = f"Bearer {token}"
+        for name in args.scenarios:
+            count = args.logins if name == "login" else args.requests
+            results[name] = await run_scenario(client, requests[name], count, args.concurrency)
+            print_result(name, results[name])
+
+    app.dependency_overrides.clear()
+    await engine.dispose()
+    return results
+
+def print_result(name: str, result: dict, baseline: dict = None) -> None:
+    line = (f"{name:<15}{result['requests']:>9}{result['errors']:>8}{result['rps']:>10.1f}"
+            f"{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}")
+    if baseline:
+        line += (f"{(result['rps'] / baseline['rps'] - 1) * 100:>+10.1f}%"
+                 f"{(result['p95_ms'] / baseline['p95_ms'] - 1) * 100:>+10.1f}%")
+    print(line)
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database", choices=["memory", "file"], default="memory",
+                        help="In-memory SQLite shared through a StaticPool, or a temporary SQLite file")
+    parser.add_argument("--rows", type=int, default=10000, help="Samples seeded before the scenarios")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per scenario")
+    parser.add_argument("--logins", type=int, default=20, help="Requests of the login scenario (bcrypt is slow)")
+    parser.add_argument("--concurrency", type=int, default=16, help="Requests in flight at the same time")
+    parser.add_argument("--bulk-size", type=int, default=100, help="Samples per bulk create request")
+    parser.add_argument("--lookup-size", type=int, default=96, help="Sample IDs per lookup request (a rack)")
+    parser.add_argument("--page-size", type=int, default=100, help="Limit of the filtered listings")
+    parser.add_argument("--rate-limits", action="store_true",
+                        help="Keep the configured rate limit and concurrency cap, disabled by default")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the random data and requests")
+    parser.add_argument("--scenarios", nargs="+", default=["create", "bulk_create", "get_by_id", "lookup",
+                                                            "list_filtered", "update", "delete", "login"])
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON results of a previous run to compare with")
+    parser.add_argument("--max-regression", type=float,
+                        help="With --compare, exit with an error if the req/s of a scenario dropped by more "
+                             "than this %%")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        print(f"Comparing with {baseline['meta']['commit']} ({args.compare})")
+
+    print(f"{'scenario':<15}{'requests':>9}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        database_url = (f"sqlite:///{os.path.join(directory, 'bench.db')}" if args.database == "file"
+                        else "sqlite:///:memory:")
+        results = asyncio.run(run(args, database_url))
+
+    if baseline:
+        print(f"\n{'scenario':<15}{'requests':>9}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+              f"{'Δ req/s':>11}{'Δ p95':>11}")
+        for name, result in results.items():
+            print_result(name, result, baseline["results"].get(name))
+
+    if args.output:
+        meta = {"commit": git_commit(), "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "python": platform.python_version(), "platform": platform.platform(),
+                **{key: value for key, value in vars(args).items() if key not in ("output", "compare")}}
+        with open(args.output, "w") as file:
+            json.dump({"meta": meta, "results": results}, file, indent=2)
+
+    if baseline and args.max_regression is not None:
+        regressions = [name for name, result in results.items() if name in baseline["results"]
+                       and result["rps"] < baseline["results"][name]["rps"] * (1 - args.max_regression / 100)]
+        if regressions:
+            raise SystemExit(f"Throughput regressed by more than {args.max_regression}%: {', '.join(regressions)}")
+
+if __name__ == "__main__":
+    main()
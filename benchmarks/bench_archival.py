@@ -0,0 +1,127 @@
+"""
+Benchmark of the archival of the archived samples.
+
+Seeds a file-backed SQLite database where most samples are archived, then runs a page of GET /api/samples for several
+filters with every sample in the hot table, moves the archived samples to archived_samples with archive_samples, and
+runs the same pages again on the hot table only and with include_archived. Prints the time of the move and the median
+time of each page.
+
+    python -m benchmarks.bench_archival --rows 1000000 --archived 0.8
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from uuid import uuid4
+
+from sqlalchemy import insert, select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.api.endpoints import SAMPLE_READ_COLUMNS, _samples_with_archived
+from app.api.filters import sample_conditions
+from app.db.archive import archive_samples
+from app.db.base import Base
+from app.db.models import Sample, SampleType, StatusType, utcnow
+from app.db.session import SQLITE_PROFILES, create_database_engine
+from app.schemas.sample import SampleFilter
+
+SEED_BATCH_SIZE = 10000
+
+# Listing filters of the benchmarked pages
+FILTERS = {
+    "no filter": SampleFilter(),
+    "status collected": SampleFilter(sample_status=StatusType.collected),
+    "subject": SampleFilter(subject_id="P0000042"),
+    "collection date (one day)": SampleFilter(collected_from=date(2024, 6, 1), collected_to=date(2024, 6, 1)),
+    "storage location (one box)": SampleFilter(storage_location_prefix="freezer-7-box-42"),
+}
+
+async def seed(engine, rows: int, archived: float) -> None:
+    rng = random.Random(0)
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+        for start in range(0, rows, SEED_BATCH_SIZE):
+            batch = []
+            for _ in range(min(SEED_BATCH_SIZE, rows - start)):
+                status = (StatusType.archived if rng.random() < archived
+                          else rng.choice([StatusType.collected, StatusType.processing]))
+                batch.append({
+                    "sample_id": str(uuid4()),
+                    "sample_type": rng.choice(list(SampleType)),
+                    "subject_id": f"P{rng.randrange(rows // 10):07d}",
+                    "collection_date": date(2024, 1, 1) + timedelta(days=rng.randrange(365)),
+                    "status": status,
+                    "storage_location": f"freezer-{rng.randrange(20)}-box-{rng.randrange(100)}",
+                    # Archived samples were last updated when they were archived, years ago
+                    "updated_at": datetime(2022, 1, 1) if status is StatusType.archived else utcnow(),
+                })
+            await connection.execute(insert(Sample), batch)
+        await connection.execute(text("ANALYZE"))
+
+def hot_page(filters: SampleFilter, page_size: int):
+    return select(*SAMPLE_READ_COLUMNS, Sample.updated_at).where(*sample_conditions(filters)) \
+        .order_by(Sample.sample_id).limit(page_size)
+
+async def measure(sessionmaker, build, repeat: int, page_size: int) -> dict:
+    """
+    :return: Dictionary of filter name to the median time of its page in milliseconds.
+    """
+    results = {}
+    async with sessionmaker() as db:
+        for name, filters in FILTERS.items():
+            statement = build(filters, page_size)
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                (await db.execute(statement)).all()
+                timings.append((time.perf_counter() - started) * 1000)
+            results[name] = statistics.median(timings)
+    return results
+
+async def run(rows: int, archived: float, repeat: int, page_size: int, batch_size: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_database_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}",
+                                        SQLITE_PROFILES["production"])
+        started = time.perf_counter()
+        await seed(engine, rows, archived)
+        print(f"Seeded {rows:,} samples, {archived:.0%} archived, in {time.perf_counter() - started:.1f}s")
+        sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+
+        results = {"all rows hot": await measure(sessionmaker, hot_page, repeat, page_size)}
+
+        started, moved, count = time.perf_counter(), 0, batch_size
+        while count == batch_size:
+            async with sessionmaker() as db:
+                count = await archive_samples(db, utcnow() - timedelta(days=365), batch_size)
+            moved += count
+        duration = time.perf_counter() - started
+        print(f"Moved {moved:,} samples in batches of {batch_size:,} in {duration:.1f}s "
+              f"({moved / duration:,.0f} samples/s)")
+        async with engine.begin() as connection:
+            await connection.execute(text("ANALYZE"))
+
+        results["hot table only"] = await measure(sessionmaker, hot_page, repeat, page_size)
+        results["include_archived"] = await measure(
+            sessionmaker, lambda filters, limit: _samples_with_archived(filters, None, limit), repeat, page_size)
+        await engine.dispose()
+
+    print(f"\n{'page of ' + str(page_size):<30}" + "".join(f"{name:>20}" for name in results))
+    for name in FILTERS:
+        print(f"{name:<30}" + "".join(f"{timings[name]:>17.2f} ms" for timings in results.values()))
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000, help="Samples to seed")
+    parser.add_argument("--archived", type=float, default=0.8, help="Share of archived samples")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs of each page, the median is reported")
+    parser.add_argument("--page-size", type=int, default=100, help="Samples per page")
+    parser.add_argument("--batch-size", type=int, default=500, help="Samples moved per transaction")
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.archived, args.repeat, args.page_size, args.batch_size))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark of the sample export.
+
+Seeds a file-backed SQLite database, then streams the whole table through the export generator of
+GET /api/export/samples in each format and compression, reporting the time, throughput, size of the file and the peak
+memory of the process (which includes the SQLite page cache and memory map, printed once the table is seeded).
+
+    python -m benchmarks.bench_export --rows 5000000
+"""
+import argparse
+import asyncio
+import os
+import random
+import resource
+import tempfile
+import time
+from datetime import date, timedelta
+from uuid import uuid4
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.api.export import _export_samples, _export_statement
+from app.db.base import Base
+from app.db.models import Sample, SampleType, StatusType
+from app.db.session import SQLITE_PROFILES, create_database_engine
+from app.schemas.sample import ExportFormat, ExportCompression, SampleFilter
+
+SEED_BATCH_SIZE = 10000
+
+CASES = [
+    (ExportFormat.csv, ExportCompression.none),
+    (ExportFormat.csv, ExportCompression.gzip),
+    (ExportFormat.csv, ExportCompression.zstd),
+    (ExportFormat.arrow, ExportCompression.none),
+    (ExportFormat.arrow, ExportCompression.zstd),
+    (ExportFormat.parquet, ExportCompression.zstd),
+]
+
+def peak_rss() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+async def run(rows: int) -> None:
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_database_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}",
+                                        SQLITE_PROFILES["production"])
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+            for start in range(0, rows, SEED_BATCH_SIZE):
+                await connection.execute(insert(Sample), [{
+                    "sample_id": str(uuid4()),
+                    "sample_type": rng.choice(list(SampleType)),
+                    "subject_id": f"P{rng.randrange(rows):07d}",
+                    "collection_date": date(2024, 1, 1) + timedelta(days=rng.randrange(365)),
+                    "status": rng.choice(list(StatusType)),
+                    "storage_location": f"freezer-{rng.randrange(20)}-box-{rng.randrange(100)}",
+                } for _ in range(min(SEED_BATCH_SIZE, rows - start))])
+
+        sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+        print(f"Peak RSS after seeding {rows:,} rows: {peak_rss():.0f} MiB")
+        print(f"{'format':<9}{'compression':<13}{'time':>10}{'rows/s':>14}{'size':>12}{'peak RSS':>12}")
+        for export_format, compression in CASES:
+            size = 0
+            started = time.perf_counter()
+            statement = _export_statement(SampleFilter(), include_archived=False)
+            async for chunk in _export_samples(statement, export_format, compression, sessionmaker()):
+                size += len(chunk)
+            elapsed = time.perf_counter() - started
+            print(f"{export_format.value:<9}{compression.value:<13}{elapsed:>9.2f}s{rows / elapsed:>14,.0f}"
+                  f"{size / 2 ** 20:>9.1f} MiB{peak_rss():>8.0f} MiB")
+        await engine.dispose()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000, help="Samples in the exported table")
+    args = parser.parse_args()
+    asyncio.run(run(args.rows))
+
+if __name__ == "__main__":
+    main()
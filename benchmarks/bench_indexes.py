@@ -0,0 +1,108 @@
+"""
+Benchmark of the secondary indexes on the samples table.
+
+Seeds a file-backed SQLite database with synthetic samples, then runs the query paths used by GET /api/samples
+without and with the indexes of the samples table (those of revision 1e551782610d, with ix_samples_subject_summary
+since c4d81f6e2a57), printing the EXPLAIN QUERY PLAN and the median latency of each.
+
+    python -m benchmarks.bench_indexes --rows 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+from uuid import uuid4
+
+from sqlalchemy import create_engine, insert, select, text
+
+from app.db.base import Base
+from app.db.models import Sample, SampleType, StatusType
+
+PAGE_SIZE = 100
+
+QUERIES = {
+    "status + type": select(Sample).where(Sample.status == StatusType.collected,
+                                          Sample.sample_type == SampleType.blood),
+    "subject_id": select(Sample).where(Sample.subject_id == "P000042"),
+    "collection date range": select(Sample).where(Sample.collection_date >= date(2024, 3, 1),
+                                                  Sample.collection_date <= date(2024, 3, 1)),
+    "storage location prefix": select(Sample).where(Sample.storage_location >= "freezer-3-shelfB-box7",
+                                                    Sample.storage_location < "freezer-3-shelfB-box8"),
+}
+
+def seed(engine, rows: int, batch_size: int = 50000) -> None:
+    """
+    Insert synthetic samples spread over 100k subjects, one year of collection dates and 10 freezers.
+    :param engine: Engine of the benchmark database.
+    :param rows: Number of samples to insert.
+    :param batch_size: Number of samples per executemany.
+    """
+    rng = random.Random(0)
+    start = date(2024, 1, 1)
+    with engine.begin() as connection:
+        for offset in range(0, rows, batch_size):
+            connection.execute(insert(Sample), [{
+                "sample_id": str(uuid4()),
+                "sample_type": rng.choice(list(SampleType)),
+                "subject_id": f"P{rng.randrange(100000):06d}",
+                "collection_date": start + timedelta(days=rng.randrange(366)),
+                "status": rng.choice(list(StatusType)),
+                "storage_location": f"freezer-{rng.randrange(10)}-shelf{rng.choice('ABCDE')}-box{rng.randrange(50)}",
+            } for _ in range(min(batch_size, rows - offset))])
+
+def measure(engine, repeat: int) -> dict:
+    """
+    Run every benchmark query as a first page of the listing (ORDER BY sample_id LIMIT PAGE_SIZE).
+    :param engine: Engine of the benchmark database.
+    :param repeat: Number of timed executions per query.
+    :return: Dictionary of query name to (query plan, median latency in milliseconds).
+    """
+    results = {}
+    with engine.connect() as connection:
+        for name, query in QUERIES.items():
+            statement = str(query.order_by(Sample.sample_id).limit(PAGE_SIZE)
+                            .compile(engine, compile_kwargs={"literal_binds": True}))
+            plan = [row[-1] for row in connection.execute(text(f"EXPLAIN QUERY PLAN {statement}"))]
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                connection.execute(text(statement)).fetchall()
+                timings.append((time.perf_counter() - started) * 1000)
+            results[name] = (plan, statistics.median(timings))
+    return results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000, help="Number of samples to seed")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed executions per query")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        for index in Sample.__table__.indexes:
+            index.drop(engine)
+
+        started = time.perf_counter()
+        seed(engine, args.rows)
+        print(f"Seeded {args.rows} samples in {time.perf_counter() - started:.1f}s\n")
+
+        before = measure(engine, args.repeat)
+        for index in Sample.__table__.indexes:
+            index.create(engine)
+        with engine.begin() as connection:
+            connection.execute(text("ANALYZE"))
+        after = measure(engine, args.repeat)
+        engine.dispose()
+
+    for name in QUERIES:
+        (plan_before, ms_before), (plan_after, ms_after) = before[name], after[name]
+        print(f"## {name}: {ms_before:.2f} ms -> {ms_after:.2f} ms")
+        print(f"   before: {' | '.join(plan_before)}")
+        print(f"   after:  {' | '.join(plan_after)}\n")
+
+if __name__ == "__main__":
+    main()
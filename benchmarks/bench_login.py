@@ -0,0 +1,77 @@
+"""
+Benchmark of the login endpoint under concurrent load.
+
+Fires a burst of POST /auth/token requests at the application in-process while a probe keeps calling GET /users/me,
+and reports the login throughput together with the probe latency, which shows how much the logins stall the event
+loop for everyone else. Use --inline to compare with verifying the password directly on the event loop.
+
+    python -m benchmarks.bench_login --logins 200 --concurrency 32
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from app.api import authentication
+from app.main import app
+
+def percentile(values: list, q: float) -> float:
+    return statistics.quantiles(values, n=100)[int(q) - 1] if len(values) > 1 else values[0]
+
+async def run(logins: int, concurrency: int) -> None:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        credentials = {"username": "johndoe", "password": "secret123"}
+        token = (await client.post("/auth/token", data=credentials)).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        semaphore = asyncio.Semaphore(concurrency)
+        login_latencies, probe_latencies = [], []
+        done = asyncio.Event()
+
+        async def login() -> None:
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post("/auth/token", data=credentials)
+                login_latencies.append((time.perf_counter() - started) * 1000)
+                assert response.status_code == 200
+
+        async def probe() -> None:
+            while not done.is_set():
+                started = time.perf_counter()
+                await client.get("/users/me", headers=headers)
+                probe_latencies.append((time.perf_counter() - started) * 1000)
+                await asyncio.sleep(0.01)
+
+        probe_task = asyncio.create_task(probe())
+        started = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(logins)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await probe_task
+
+    print(f"Logins: {logins} in {elapsed:.2f}s ({logins / elapsed:.1f} logins/s), concurrency {concurrency}")
+    print(f"Login latency  p50 {percentile(login_latencies, 50):8.1f} ms"
+          f"   p99 {percentile(login_latencies, 99):8.1f} ms")
+    print(f"Probe latency  p50 {percentile(probe_latencies, 50):8.1f} ms"
+          f"   p99 {percentile(probe_latencies, 99):8.1f} ms"
+          f"   max {max(probe_latencies):8.1f} ms   ({len(probe_latencies)} probes)")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200, help="Number of logins in the burst")
+    parser.add_argument("--concurrency", type=int, default=32, help="Logins in flight at the same time")
+    parser.add_argument("--inline", action="store_true", help="Verify passwords on the event loop (previous behavior)")
+    args = parser.parse_args()
+
+    if args.inline:
+        async def verify_on_event_loop(plain_password, hashed_password) -> bool:
+            return authentication.verify_password(plain_password, hashed_password)
+        authentication.verify_password_async = verify_on_event_loop
+
+    asyncio.run(run(args.logins, args.concurrency))
+
+if __name__ == "__main__":
+    main()
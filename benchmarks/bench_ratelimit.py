@@ -0,0 +1,84 @@
+"""
+Benchmark of the overhead of the rate limiter and the admission control.
+
+Times the token bucket check alone, for one client and spread over many clients, then sends authenticated requests
+in-process to a minimal FastAPI app whose single route is served with and without AdmissionMiddleware and the
+rate_limit and limit_concurrency dependencies, and reports the added time per request.
+
+    python -m benchmarks.bench_ratelimit --requests 5000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List
+
+import httpx
+from fastapi import Depends, FastAPI
+
+from app.api import ratelimit
+from app.api.authentication import create_access_token, get_current_user
+from app.api.ratelimit import AdmissionMiddleware, MemoryStore, RateLimiter, limit_concurrency, rate_limit
+
+def time_checks(clients: int, checks: int) -> float:
+    """
+    :return: Mean time of a RateLimiter.check in microseconds.
+    """
+    # A rate high enough that no request is limited, as for a client within its limit
+    limiter = RateLimiter(MemoryStore(max_size=max(clients, 1)), rate=1e9, burst=1000)
+    keys = [f"user{i}" for i in range(clients)]
+    started = time.perf_counter()
+    for i in range(checks):
+        limiter.check(keys[i % clients])
+    return (time.perf_counter() - started) / checks * 1e6
+
+def build_app(limited: bool) -> FastAPI:
+    app = FastAPI()
+    dependencies = [Depends(get_current_user)]
+    if limited:
+        app.add_middleware(AdmissionMiddleware)
+        dependencies += [Depends(rate_limit), Depends(limit_concurrency)]
+
+    @app.get("/items", dependencies=dependencies)
+    async def read_items() -> dict:
+        return {}
+
+    return app
+
+async def time_requests(apps: List[FastAPI], requests: int) -> List[float]:
+    """
+    Send the requests to the apps in turn, so that a slowdown of the machine affects all of them alike.
+    :return: Median latency of a request to each app in microseconds.
+    """
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': 'johndoe'})}"}
+    clients = [httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", headers=headers)
+               for app in apps]
+    timings = [[] for _ in apps]
+    for _ in range(requests):
+        for client, client_timings in zip(clients, timings):
+            started = time.perf_counter()
+            response = await client.get("/items")
+            client_timings.append((time.perf_counter() - started) * 1e6)
+            assert response.status_code == 200, response.text
+    for client in clients:
+        await client.aclose()
+    return [statistics.median(client_timings) for client_timings in timings]
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checks", type=int, default=1000000, help="Token bucket checks timed")
+    parser.add_argument("--requests", type=int, default=5000, help="Requests sent to each app")
+    args = parser.parse_args()
+
+    for clients in (1, 10000):
+        print(f"RateLimiter.check, {clients:>5} clients: {time_checks(clients, args.checks):.2f} µs")
+
+    # Raise the limit of the process-wide limiter, so that the requests below are never rejected
+    ratelimit.rate_limiter = RateLimiter(MemoryStore(max_size=10), rate=1e9, burst=1000)
+
+    baseline, limited = asyncio.run(time_requests([build_app(limited=False), build_app(limited=True)], args.requests))
+    print(f"Request without limits: {baseline:.1f} µs, with limits: {limited:.1f} µs "
+          f"({limited - baseline:+.1f} µs, {(limited / baseline - 1) * 100:+.1f}%)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark of the sample search.
+
+Seeds a file-backed SQLite database (the samples_fts index is filled by its triggers), then runs the query of
+GET /api/search/samples for a few kinds of search text and reports the median time of a page of results.
+
+    python -m benchmarks.bench_search --rows 1000000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+from uuid import uuid4
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.api.search import search_samples
+from app.db.base import Base
+from app.db.models import Sample, SampleType, StatusType
+from app.db.session import SQLITE_PROFILES, create_database_engine
+from app.schemas.sample import SampleFilter, SearchField
+
+SEED_BATCH_SIZE = 10000
+
+# Search text and field of each case
+CASES = {
+    "subject exact": ("P0012345", None),
+    "subject prefix": ("P00123", SearchField.subject_id),
+    "location path": ("freezer-7-box-4", SearchField.storage_location),
+    "location prefix": ("freezer-7-bo", SearchField.storage_location),
+    "no match": ("Z999", None),
+}
+
+async def run(rows: int, repeat: int, limit: int) -> None:
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_database_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}",
+                                        SQLITE_PROFILES["production"])
+        started = time.perf_counter()
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+            for start in range(0, rows, SEED_BATCH_SIZE):
+                await connection.execute(insert(Sample), [{
+                    "sample_id": str(uuid4()),
+                    "sample_type": rng.choice(list(SampleType)),
+                    "subject_id": f"P{rng.randrange(rows):07d}",
+                    "collection_date": date(2024, 1, 1) + timedelta(days=rng.randrange(365)),
+                    "status": rng.choice(list(StatusType)),
+                    "storage_location": f"freezer-{rng.randrange(20)}-box-{rng.randrange(100)}",
+                } for _ in range(min(SEED_BATCH_SIZE, rows - start))])
+        print(f"Seeded and indexed {rows:,} rows in {time.perf_counter() - started:.1f}s")
+
+        sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+        print(f"{'case':<18}{'results':>9}{'median':>12}{'max':>12}")
+        for name, (text, field) in CASES.items():
+            timings = []
+            async with sessionmaker() as db:
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    results = await search_samples(q=text, field=field, limit=limit, offset=0, filters=SampleFilter(),
+                                                   db=db)
+                    timings.append((time.perf_counter() - started) * 1000)
+            print(f"{name:<18}{len(results):>9}{statistics.median(timings):>9.2f} ms{max(timings):>9.2f} ms")
+        await engine.dispose()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000, help="Samples in the searched table")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs of each search, the median is reported")
+    parser.add_argument("--limit", type=int, default=20, help="Page size of the searches")
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.repeat, args.limit))
+
+if __name__ == "__main__":
+    main()
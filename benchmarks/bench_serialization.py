@@ -0,0 +1,87 @@
+"""
+Benchmark of the JSON serialization paths of sample listings.
+
+Seeds a file-backed SQLite database, then selects and encodes the whole table with each path and reports rows/second:
+    response_model   ORM objects validated one by one and dumped to Python, then json.dumps (FastAPI's response_model)
+    adapter          ORM objects validated and dumped to JSON at once by a TypeAdapter (default path of read_samples)
+    fast             SAMPLE_READ_COLUMNS selected as tuples and encoded with orjson (FAST_JSON_SERIALIZATION)
+
+    python -m benchmarks.bench_serialization --rows 10000 100000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+from uuid import uuid4
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.api.endpoints import SAMPLE_READ_COLUMNS, _sample_row_json, samples_adapter
+from app.db.base import Base
+from app.db.models import Sample, SampleType, StatusType
+from app.db.session import create_database_engine
+from app.schemas.sample import SampleRead
+
+async def response_model(db: AsyncSession) -> bytes:
+    samples = (await db.scalars(select(Sample).order_by(Sample.sample_id))).all()
+    content = [SampleRead.model_validate(sample).model_dump(mode="json") for sample in samples]
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+async def adapter(db: AsyncSession) -> bytes:
+    samples = (await db.scalars(select(Sample).order_by(Sample.sample_id))).all()
+    return samples_adapter.dump_json(samples_adapter.validate_python(samples, from_attributes=True))
+
+async def fast(db: AsyncSession) -> bytes:
+    rows = (await db.execute(select(*SAMPLE_READ_COLUMNS).order_by(Sample.sample_id))).all()
+    return b"[" + b",".join(_sample_row_json(row) for row in rows) + b"]"
+
+PATHS = {"response_model": response_model, "adapter": adapter, "fast": fast}
+
+async def run(rows: int, repeat: int) -> None:
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_database_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+            await connection.execute(insert(Sample), [{
+                "sample_id": str(uuid4()),
+                "sample_type": rng.choice(list(SampleType)),
+                "subject_id": f"P{rng.randrange(rows):07d}",
+                "collection_date": date(2024, 1, 1) + timedelta(days=rng.randrange(365)),
+                "status": rng.choice(list(StatusType)),
+                "storage_location": f"freezer-{rng.randrange(20)}-box-{rng.randrange(100)}",
+            } for _ in range(rows)])
+
+        sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+        bodies = {}
+        for name, path in PATHS.items():
+            timings = []
+            for _ in range(repeat):
+                async with sessionmaker() as db:
+                    started = time.perf_counter()
+                    bodies[name] = await path(db)
+                    timings.append(time.perf_counter() - started)
+            elapsed = statistics.median(timings)
+            print(f"{rows:>9}  {name:<16}{elapsed * 1000:>10.1f} ms{rows / elapsed:>14,.0f} rows/s")
+        await engine.dispose()
+
+    assert len(set(bodies.values())) == 1, "The serialization paths returned different bodies"
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000], help="Table sizes to benchmark")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs of each path, the median is reported")
+    args = parser.parse_args()
+
+    print(f"{'rows':>9}  {'path':<16}{'time':>13}{'throughput':>21}")
+    for rows in args.rows:
+        asyncio.run(run(rows, args.repeat))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark of the SQLite tuning profiles under a mixed read/write workload.
+
+For each profile of app/db/session.py, seeds a file-backed database and runs concurrent workers for a fixed time.
+Each operation is either a write (insert one sample and commit) or a read (first page of a filtered listing), and the
+benchmark reports the throughput, latency percentiles and errors (e.g. "database is locked") of each kind.
+
+    python -m benchmarks.bench_sqlite_tuning --workers 32 --duration 10 --write-ratio 0.2
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date
+from uuid import uuid4
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.db.base import Base
+from app.db.models import Sample, SampleType, StatusType
+from app.db.session import SQLITE_PROFILES, create_database_engine
+
+def new_sample(rng: random.Random) -> dict:
+    return {
+        "sample_id": str(uuid4()),
+        "sample_type": rng.choice(list(SampleType)),
+        "subject_id": f"P{rng.randrange(10000):05d}",
+        "collection_date": date(2024, 1, 1),
+        "status": rng.choice(list(StatusType)),
+        "storage_location": f"freezer-{rng.randrange(10)}",
+    }
+
+def percentile(values: list, q: int) -> float:
+    return statistics.quantiles(values, n=100)[q - 1] if len(values) > 1 else (values or [0.0])[0]
+
+async def run_profile(profile: str, rows: int, workers: int, duration: float, write_ratio: float) -> dict:
+    """
+    Run the mixed workload against a fresh database using the given PRAGMA profile.
+    :return: Dictionary with the latencies and errors of reads and writes.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_database_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}", SQLITE_PROFILES[profile])
+        sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+        rng = random.Random(0)
+
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+            await connection.execute(insert(Sample), [new_sample(rng) for _ in range(rows)])
+
+        results = {"read": [], "write": [], "read_errors": 0, "write_errors": 0}
+        deadline = time.perf_counter() + duration
+
+        async def worker(seed: int) -> None:
+            worker_rng = random.Random(seed)
+            while time.perf_counter() < deadline:
+                kind = "write" if worker_rng.random() < write_ratio else "read"
+                started = time.perf_counter()
+                try:
+                    async with sessionmaker() as db:
+                        if kind == "write":
+                            await db.execute(insert(Sample), [new_sample(worker_rng)])
+                            await db.commit()
+                        else:
+                            statement = (select(Sample).where(Sample.status == worker_rng.choice(list(StatusType)))
+                                         .order_by(Sample.sample_id).limit(100))
+                            (await db.scalars(statement)).all()
+                except SQLAlchemyError:
+                    results[f"{kind}_errors"] += 1
+                else:
+                    results[kind].append((time.perf_counter() - started) * 1000)
+
+        await asyncio.gather(*(worker(seed) for seed in range(workers)))
+        await engine.dispose()
+    return results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000, help="Samples seeded before the run")
+    parser.add_argument("--workers", type=int, default=32, help="Concurrent workers")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of load per profile")
+    parser.add_argument("--write-ratio", type=float, default=0.2, help="Share of operations that are writes")
+    parser.add_argument("--profiles", nargs="+", default=list(SQLITE_PROFILES), choices=list(SQLITE_PROFILES))
+    args = parser.parse_args()
+
+    print(f"{'profile':<12}{'kind':<7}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for profile in args.profiles:
+        results = asyncio.run(run_profile(profile, args.rows, args.workers, args.duration, args.write_ratio))
+        for kind in ("read", "write"):
+            latencies = results[kind]
+            print(f"{profile:<12}{kind:<7}{len(latencies) / args.duration:>10.1f}{percentile(latencies, 50):>10.1f}"
+                  f"{percentile(latencies, 95):>10.1f}{percentile(latencies, 99):>10.1f}"
+                  f"{results[f'{kind}_errors']:>8}")
+
+if __name__ == "__main__":
+    main()
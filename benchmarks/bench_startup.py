@@ -0,0 +1,132 @@
+"""
+Benchmark of the startup of the application servers.
+
+Measures the cold import of app.main in a fresh interpreter, then starts each server with a number of workers and
+reports the time until the first response (GET /metrics), the time until every worker completed its startup, and the
+memory of the processes once started: RSS, and PSS which splits the pages shared between processes (e.g. the modules
+a preloading master loaded before forking) among them. Linux only, memory is read from /proc.
+
+    python -m benchmarks.bench_startup --workers 4
+"""
+import argparse
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from typing import Dict, List, Tuple
+
+STARTUP_COMPLETE = "Application startup complete"
+
+def import_time() -> float:
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import app.main"], check=True)
+    return time.perf_counter() - started
+
+def child_pids(pid: int) -> List[int]:
+    pids = []
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as file:
+                    stat = file.read()
+                with open(f"/proc/{entry}/cmdline", "rb") as file:
+                    cmdline = file.read()
+            except OSError:
+                continue
+            # Skip the resource tracker process started by multiprocessing along with spawned workers
+            if int(stat.rsplit(")", 1)[1].split()[1]) == pid and b"resource_tracker" not in cmdline:
+                pids.append(int(entry))
+    return pids
+
+def memory(pid: int) -> Tuple[float, float]:
+    """
+    :return: RSS and PSS of a process in MiB.
+    """
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as file:
+        for line in file:
+            key, _, value = line.partition(":")
+            if key in ("Rss", "Pss"):
+                values[key] = int(value.split()[0]) / 1024
+    return values["Rss"], values["Pss"]
+
+def responds(port: int) -> bool:
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=0.5) as response:
+            return response.status == 200
+    except OSError:
+        return False
+
+def run_server(command: List[str], environment: Dict[str, str], workers: int, port: int) -> dict:
+    """
+    Start a server, wait until all its workers are ready, measure it and stop it.
+    :return: Dictionary with the startup times in seconds and the memory in MiB.
+    """
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, *command], env={**os.environ, **environment},
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    ready_workers, all_ready = 0, threading.Event()
+
+    def read_log() -> None:
+        nonlocal ready_workers
+        for line in process.stderr:
+            if STARTUP_COMPLETE in line:
+                ready_workers += 1
+                if ready_workers == workers:
+                    all_ready.set()
+
+    threading.Thread(target=read_log, daemon=True).start()
+    first_response = None
+    try:
+        while first_response is None or not all_ready.is_set():
+            if process.poll() is not None:
+                raise RuntimeError(f"{' '.join(command)} exited with code {process.returncode}")
+            if time.perf_counter() - started > 120:
+                raise RuntimeError(f"{' '.join(command)} did not start within 120s")
+            if first_response is None and responds(port):
+                first_response = time.perf_counter() - started
+            time.sleep(0.01)
+        ready = time.perf_counter() - started
+
+        time.sleep(1)
+        master = memory(process.pid)
+        workers_memory = [memory(pid) for pid in child_pids(process.pid)]
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait(30)
+
+    return {"first_response": first_response, "ready": ready, "master_rss": master[0],
+            "worker_rss": statistics.mean(rss for rss, _ in workers_memory),
+            "worker_pss": statistics.mean(pss for _, pss in workers_memory),
+            "total_pss": master[1] + sum(pss for _, pss in workers_memory)}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4, help="Workers of each server")
+    parser.add_argument("--port", type=int, default=8765, help="Port the servers listen on")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs of the import, the median is reported")
+    args = parser.parse_args()
+
+    print(f"Cold import of app.main: {statistics.median(import_time() for _ in range(args.repeat)) * 1000:.0f} ms")
+
+    gunicorn_environment = {"WEB_CONCURRENCY": str(args.workers), "PORT": str(args.port), "HOST": "127.0.0.1"}
+    servers = {
+        "gunicorn preload": (["-m", "gunicorn", "app.main:app"], {**gunicorn_environment, "PRELOAD_APP": "1"}),
+        "gunicorn": (["-m", "gunicorn", "app.main:app"], {**gunicorn_environment, "PRELOAD_APP": "0"}),
+        "uvicorn --workers": (["-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(args.port),
+                               "--workers", str(args.workers)], {}),
+    }
+    print(f"{'server':<19}{'workers':>8}{'first resp.':>13}{'all ready':>11}{'master RSS':>12}{'worker RSS':>12}"
+          f"{'worker PSS':>12}{'total PSS':>11}")
+    for name, (command, environment) in servers.items():
+        result = run_server(command, environment, args.workers, args.port)
+        print(f"{name:<19}{args.workers:>8}{result['first_response']:>12.2f}s{result['ready']:>10.2f}s"
+              f"{result['master_rss']:>8.1f} MiB{result['worker_rss']:>8.1f} MiB{result['worker_pss']:>8.1f} MiB"
+              f"{result['total_pss']:>7.1f} MiB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmark of the subjects endpoints.
+
+Seeds a file-backed SQLite database, then runs GET /api/subjects/{subject_id} and a page of GET /api/subjects with the
+single-column index on subject_id of revision 1e551782610d and with ix_samples_subject_summary, which covers the
+grouped columns. Prints the plan of the summary query and the median time of each request.
+
+    python -m benchmarks.bench_subjects --rows 1000000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+from uuid import uuid4
+
+from fastapi import Response
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.api.subjects import read_subject, read_subjects
+from app.db.base import Base
+from app.db.models import Sample, SampleType, StatusType
+from app.db.session import SQLITE_PROFILES, create_database_engine
+from app.schemas.sample import SampleFilter
+
+SEED_BATCH_SIZE = 10000
+
+# Index of each variant, the first one is the index on the subject only, as before revision c4d81f6e2a57
+INDEXES = {
+    "ix_samples_subject_id": "CREATE INDEX ix_samples_subject_id ON samples (subject_id)",
+    "ix_samples_subject_summary": "CREATE INDEX ix_samples_subject_summary "
+                                  "ON samples (subject_id, sample_type, status, collection_date)",
+}
+
+async def seed(engine, rows: int, subjects: int) -> None:
+    rng = random.Random(0)
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+        for start in range(0, rows, SEED_BATCH_SIZE):
+            await connection.execute(insert(Sample), [{
+                "sample_id": str(uuid4()),
+                "sample_type": rng.choice(list(SampleType)),
+                "subject_id": f"P{rng.randrange(subjects):07d}",
+                "collection_date": date(2024, 1, 1) + timedelta(days=rng.randrange(365)),
+                "status": rng.choice(list(StatusType)),
+                "storage_location": f"freezer-{rng.randrange(20)}-box-{rng.randrange(100)}",
+            } for _ in range(min(SEED_BATCH_SIZE, rows - start))])
+
+async def measure(sessionmaker, subjects: int, repeat: int, page_size: int) -> dict:
+    """
+    :return: Dictionary of request name to its median time in milliseconds.
+    """
+    rng = random.Random(1)
+    requests = {
+        "subject": lambda db: read_subject(subject_id=f"P{rng.randrange(subjects):07d}", db=db),
+        f"page of {page_size} subjects": lambda db: read_subjects(
+            response=Response(), filters=SampleFilter(), include_samples=False, limit=page_size,
+            after=f"P{rng.randrange(subjects):07d}", db=db),
+        f"page of {page_size} with samples": lambda db: read_subjects(
+            response=Response(), filters=SampleFilter(), include_samples=True, limit=page_size,
+            after=f"P{rng.randrange(subjects):07d}", db=db),
+    }
+    results = {}
+    async with sessionmaker() as db:
+        for name, request in requests.items():
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                await request(db)
+                timings.append((time.perf_counter() - started) * 1000)
+            results[name] = statistics.median(timings)
+    return results
+
+async def run(rows: int, subjects: int, repeat: int, page_size: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_database_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}",
+                                        SQLITE_PROFILES["production"])
+        started = time.perf_counter()
+        await seed(engine, rows, subjects)
+        print(f"Seeded {rows:,} samples of {subjects:,} subjects in {time.perf_counter() - started:.1f}s")
+        sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+
+        results = {}
+        for name, create in INDEXES.items():
+            async with engine.begin() as connection:
+                for index in INDEXES:
+                    await connection.execute(text(f"DROP INDEX IF EXISTS {index}"))
+                await connection.execute(text(create))
+                await connection.execute(text("ANALYZE"))
+                plan = await connection.execute(text(
+                    "EXPLAIN QUERY PLAN SELECT subject_id, sample_type, status, count(*), min(collection_date), "
+                    "max(collection_date) FROM samples WHERE subject_id IN ('P0000042') "
+                    "GROUP BY subject_id, sample_type, status"))
+                print(f"{name}: {' | '.join(row[-1] for row in plan)}")
+            results[name] = await measure(sessionmaker, subjects, repeat, page_size)
+        await engine.dispose()
+
+    before, after = results.values()
+    print(f"\n{'request':<30}" + "".join(f"{name:>30}" for name in INDEXES))
+    for request in before:
+        print(f"{request:<30}{before[request]:>27.2f} ms{after[request]:>27.2f} ms")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000, help="Samples to seed")
+    parser.add_argument("--subjects", type=int, default=100000, help="Distinct subjects of the samples")
+    parser.add_argument("--repeat", type=int, default=50, help="Runs of each request, the median is reported")
+    parser.add_argument("--page-size", type=int, default=100, help="Subjects per page of the listing")
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.subjects, args.repeat, args.page_size))
+
+if __name__ == "__main__":
+    main()
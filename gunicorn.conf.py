@@ -0,0 +1,31 @@
+"""
+Gunicorn configuration of the production entrypoint, loaded automatically from the working directory:
+
+    gunicorn app.main:app
+
+Runs WEB_CONCURRENCY Uvicorn workers (one per CPU by default) behind a master process restarting them if they die.
+"""
+import os
+
+bind = f"{os.environ.get('HOST', '0.0.0.0')}:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1))
+# Tell the application how many workers share the load, with several its response cache is off by default
+os.environ["WEB_CONCURRENCY"] = str(workers)
+worker_class = "uvicorn_worker.UvicornWorker"
+
+# Import the application once in the master and fork the workers from it: they start without importing anything and
+# share the memory of the loaded modules until they write to it. Each worker creates its own database engines at
+# startup (see Database in app/db/session.py). PRELOAD_APP=0 imports the application in each worker instead.
+preload_app = os.environ.get("PRELOAD_APP", "1") != "0"
+
+# A worker that stops answering the master for this long is restarted. Open long polls and SSE streams do not count,
+# they do not block the event loop.
+timeout = 60
+# Time given to the workers to finish their requests on restart or shutdown
+graceful_timeout = 30
+keepalive = 5
+# Restart a worker after this many requests, with jitter so that the workers do not restart together
+max_requests = int(os.environ.get("MAX_REQUESTS", 10000))
+max_requests_jitter = max_requests // 10
+
+accesslog = "-"
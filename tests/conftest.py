@@ -1,30 +1,45 @@
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.ext.asyncio import async_sessionmaker
 
 from app.main import app
 from app.db.base import Base
-from app.db.session import get_db
+from app.db.session import create_database_engine, get_db, get_read_db
 
-# In-memory SQLite
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+# In-memory SQLite, shared by all sessions through a StaticPool
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+engine = create_database_engine(SQLALCHEMY_DATABASE_URL)
+TestingSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False, bind=engine)
 
-def override_get_db():
-    db = TestingSessionLocal()
-    try:
+async def override_get_db():
+    async with TestingSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+async def create_tables():
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
 
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_read_db] = override_get_db
 
 @pytest.fixture(scope="module")
 def client():
-    Base.metadata.create_all(bind=engine)
     with TestClient(app) as c:
+        # Create the tables from the event loop of the client, the one that will run the requests
+        c.portal.call(create_tables)
         yield c
+
+@pytest.fixture
+def token(client):
+    response = client.post("/auth/token", data={
+        "username": "johndoe",
+        "password": "secret123"
+    })
+    assert response.status_code == 200
+    return response.json()["access_token"]
+
+@pytest.fixture
+def auth_client(client, token):
+    client.headers["Authorization"] = f"Bearer {token}"
+    return client
@@ -0,0 +1,172 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from app.api import statistics as statistics_module
+from app.db.archive import archive_samples
+from app.db.models import Sample, utcnow
+from tests.conftest import TestingSessionLocal
+from tests.test_changes import last_sequence, read_changes
+
+BASE_URL = "/api"
+
+def create(auth_client, subject_id, status, storage_location="freezer-archival") -> str:
+    response = auth_client.post(f"{BASE_URL}/samples", json={
+        "sample_type": "blood",
+        "subject_id": subject_id,
+        "collection_date": "2020-01-01",
+        "status": status,
+        "storage_location": storage_location
+    })
+    assert response.status_code == 200
+    return response.json()["sample_id"]
+
+async def backdate(sample_ids: list) -> None:
+    async with TestingSessionLocal() as db:
+        await db.execute(update(Sample).where(Sample.sample_id.in_(sample_ids))
+                         .values(updated_at=datetime(2020, 1, 1)).execution_options(synchronize_session=False))
+        await db.commit()
+
+async def archive(batch_size: int) -> list:
+    """
+    :return: Samples moved by each batch, until one moves fewer than batch_size.
+    """
+    counts = []
+    while not counts or counts[-1] == batch_size:
+        async with TestingSessionLocal() as db:
+            counts.append(await archive_samples(db, utcnow() - timedelta(days=365), batch_size))
+    return counts
+
+def test_archive_old_samples(auth_client):
+    old = [create(auth_client, "ARCH-1", "archived") for _ in range(3)]
+    recent = create(auth_client, "ARCH-1", "archived")
+    collected = create(auth_client, "ARCH-1", "collected")
+    auth_client.portal.call(backdate, [*old, collected])
+    since = last_sequence(auth_client)
+
+    assert auth_client.portal.call(archive, 2) == [2, 1]
+    # Moving samples is not logged as a deletion
+    assert read_changes(auth_client, since=since)["changes"] == []
+
+    hot = auth_client.get(f"{BASE_URL}/samples", params={"subject_id": "ARCH-1"}).json()
+    assert sorted(sample["sample_id"] for sample in hot) == sorted([recent, collected])
+    response = auth_client.get(f"{BASE_URL}/samples", params={"subject_id": "ARCH-1", "include_archived": True})
+    assert [sample["sample_id"] for sample in response.json()] == sorted([*old, recent, collected])
+    assert response.json()[0] == auth_client.get(f"{BASE_URL}/samples/{response.json()[0]['sample_id']}").json()
+
+    # Archived samples are still read by ID
+    response = auth_client.get(f"{BASE_URL}/samples/{old[0]}")
+    assert response.status_code == 200 and response.json()["status"] == "archived"
+    assert auth_client.get(f"{BASE_URL}/samples/{old[0]}",
+                           headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
+    lookup = auth_client.post(f"{BASE_URL}/samples/lookup", json={"sample_ids": [old[1], recent, "unknown"]}).json()
+    assert [sample["sample_id"] for sample in lookup["samples"]] == [old[1], recent]
+    assert lookup["missing"] == ["unknown"]
+
+def test_page_through_hot_and_archived_samples(auth_client):
+    sample_ids = [create(auth_client, "ARCH-2", "archived") for _ in range(5)]
+    auth_client.portal.call(backdate, sample_ids[:3])
+    auth_client.portal.call(archive, 100)
+
+    params = {"subject_id": "ARCH-2", "include_archived": True, "limit": 2}
+    pages, after = [], None
+    while True:
+        response = auth_client.get(f"{BASE_URL}/samples", params={**params, **({"after": after} if after else {})})
+        pages.append([sample["sample_id"] for sample in response.json()])
+        after = response.headers.get("X-Next-Cursor")
+        if after is None:
+            break
+    assert pages == [sorted(sample_ids)[:2], sorted(sample_ids)[2:4], sorted(sample_ids)[4:]]
+    etag = auth_client.get(f"{BASE_URL}/samples", params=params).headers["ETag"]
+    assert auth_client.get(f"{BASE_URL}/samples", params=params, headers={"If-None-Match": etag}).status_code == 304
+
+    response = auth_client.get(f"{BASE_URL}/samples", params={**params, "stream": True})
+    lines = response.text.splitlines()
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [line.split('"sample_id":"')[1][:36] for line in lines] == sorted(sample_ids)
+
+def test_write_archived_samples(auth_client):
+    sample_ids = [create(auth_client, "ARCH-3", "archived") for _ in range(5)]
+    auth_client.portal.call(backdate, sample_ids)
+    auth_client.portal.call(archive, 100)
+    since = last_sequence(auth_client)
+
+    # An update moves the sample back to the hot table
+    response = auth_client.put(f"{BASE_URL}/samples/{sample_ids[0]}", json={"status": "collected"})
+    assert response.status_code == 200 and response.json()["status"] == "collected"
+    hot = auth_client.get(f"{BASE_URL}/samples", params={"subject_id": "ARCH-3"}).json()
+    assert [sample["sample_id"] for sample in hot] == [sample_ids[0]]
+
+    assert auth_client.delete(f"{BASE_URL}/samples/{sample_ids[1]}").status_code == 204
+    assert auth_client.get(f"{BASE_URL}/samples/{sample_ids[1]}").status_code == 404
+    assert auth_client.delete(f"{BASE_URL}/samples/{sample_ids[1]}").status_code == 404
+    # Moving the sample back is not logged as a creation
+    changes = read_changes(auth_client, since=since)["changes"]
+    assert [(change["sample_id"], change["operation"]) for change in changes] == [
+        (sample_ids[0], "updated"), (sample_ids[1], "deleted")]
+
+    # Bulk updates move the selected samples back too, bulk deletes reach both tables
+    response = auth_client.patch(f"{BASE_URL}/samples/bulk", json={"sample_ids": sample_ids[2:4],
+                                                                    "changes": {"status": "collected"}})
+    assert response.json()["affected"] == 2
+    hot = auth_client.get(f"{BASE_URL}/samples", params={"subject_id": "ARCH-3"}).json()
+    assert sorted(sample["sample_id"] for sample in hot) == sorted([sample_ids[0], *sample_ids[2:4]])
+    response = auth_client.request("DELETE", f"{BASE_URL}/samples/bulk", json={
+        "sample_ids": [sample_ids[0], sample_ids[4]], "returning": True})
+    deleted = [sample["sample_id"] for sample in response.json()["samples"]]
+    assert sorted(deleted) == sorted([sample_ids[0], sample_ids[4]])
+    lookup = auth_client.post(f"{BASE_URL}/samples/lookup", json={"sample_ids": sample_ids}).json()
+    assert lookup["missing"] == [sample_ids[0], sample_ids[1], sample_ids[4]]
+
+def test_archived_samples_in_subjects_and_locations(auth_client, monkeypatch):
+    location = "site-ARCH/freezer-1/box-1"
+    hot = create(auth_client, "ARCH-4", "collected", f"{location}/A1")
+    old = [create(auth_client, subject_id, "archived", f"{location}/A{i + 2}")
+           for i, subject_id in enumerate(["ARCH-4", "ARCH-4", "ARCH-5"])]
+    auth_client.portal.call(backdate, old)
+    occupancy = auth_client.get(f"{BASE_URL}/locations/occupancy", params={"location": location}).json()
+    auth_client.portal.call(archive, 100)
+
+    # Archived samples stay in their box, and are listed with it
+    assert auth_client.get(f"{BASE_URL}/locations/occupancy", params={"location": location}).json() == occupancy
+    assert occupancy["samples"] == 4
+    listing = auth_client.get(f"{BASE_URL}/locations/samples", params={"location": location, "limit": 3})
+    assert [sample["sample_id"] for sample in listing.json()] == sorted([hot, *old])[:3]
+    listing = auth_client.get(f"{BASE_URL}/locations/samples", params={
+        "location": location, "after": listing.headers["X-Next-Cursor"]})
+    assert [sample["sample_id"] for sample in listing.json()] == sorted([hot, *old])[3:]
+    listing = auth_client.get(f"{BASE_URL}/locations/samples", params={"location": location,
+                                                                       "sample_status": "collected"})
+    assert [sample["sample_id"] for sample in listing.json()] == [hot]
+
+    subject = auth_client.get(f"{BASE_URL}/subjects/ARCH-4").json()
+    assert subject["sample_count"] == 3 and subject["by_status"] == {"collected": 1, "archived": 2}
+    assert [sample["sample_id"] for sample in subject["samples"]] == sorted([hot, *old[:2]])
+    response = auth_client.get(f"{BASE_URL}/subjects", params={"after": "ARCH-3", "limit": 2})
+    assert [(subject["subject_id"], subject["sample_count"]) for subject in response.json()] == [
+        ("ARCH-4", 3), ("ARCH-5", 1)]
+    response = auth_client.get(f"{BASE_URL}/subjects", params={"after": "ARCH-3", "sample_status": "collected",
+                                                               "include_samples": True})
+    assert [(subject["subject_id"], len(subject["samples"])) for subject in response.json()
+            if subject["subject_id"].startswith("ARCH-")] == [("ARCH-4", 1)]
+
+    # Statistics count archived samples, from the summary table or not, search and export include them on request
+    for summary_table in (True, False):
+        monkeypatch.setattr(statistics_module, "settings",
+                            statistics_module.settings.model_copy(update={"statistics_summary_table": summary_table}))
+        statistics = auth_client.get(f"{BASE_URL}/statistics/samples", params={"storage_location_prefix": location})
+        assert statistics.json()["total"] == 4
+    search = auth_client.get(f"{BASE_URL}/search/samples", params={"q": "ARCH-4"}).json()
+    assert [sample["sample_id"] for sample in search] == [hot]
+    search = auth_client.get(f"{BASE_URL}/search/samples", params={"q": "ARCH-4", "include_archived": True}).json()
+    # Exact matches of both tables, the hot ones first
+    assert search[0]["sample_id"] == hot and sorted(sample["sample_id"] for sample in search[1:]) == sorted(old[:2])
+    export = auth_client.get(f"{BASE_URL}/export/samples", params={"storage_location_prefix": location})
+    assert len(export.text.splitlines()) == 2
+    export = auth_client.get(f"{BASE_URL}/export/samples", params={"storage_location_prefix": location,
+                                                                   "include_archived": True})
+    assert [line.split(",")[-1] for line in export.text.splitlines()[1:]] == sorted([hot, *old])
+
+    # Deleting an archived sample frees its slot
+    auth_client.delete(f"{BASE_URL}/samples/{old[2]}")
+    assert auth_client.get(f"{BASE_URL}/locations/occupancy", params={"location": location}).json()["samples"] == 3
@@ -0,0 +1,37 @@
+import time
+
+from app.api.authentication import TokenCache, token_cache, fake_users_db
+
+def test_token_cache_hit_on_repeated_requests(auth_client, token):
+    token_cache.clear()
+    hits = token_cache.hits
+
+    assert auth_client.get("/users/me").status_code == 200
+    assert auth_client.get("/users/me").status_code == 200
+    assert token_cache.hits == hits + 1
+    assert token_cache.stats()["size"] == 1
+
+def test_token_cache_respects_token_expiry():
+    cache = TokenCache(max_size=10, ttl=300)
+    cache.set("expired", "johndoe", exp=time.time() - 1)
+    cache.set("valid", "johndoe", exp=time.time() + 60)
+    assert cache.get("expired") is None
+    assert cache.get("valid") == "johndoe"
+
+def test_token_cache_is_bounded():
+    cache = TokenCache(max_size=2, ttl=300)
+    for token in ("a", "b", "c"):
+        cache.set(token, "johndoe")
+    assert cache.get("a") is None
+    assert cache.get("c") == "johndoe"
+    assert cache.stats()["size"] == 2
+
+def test_cached_token_of_disabled_user_is_rejected(auth_client):
+    assert auth_client.get("/users/me").status_code == 200
+    fake_users_db["johndoe"]["disabled"] = True
+    try:
+        response = auth_client.get("/users/me")
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Inactive user"
+    finally:
+        fake_users_db["johndoe"]["disabled"] = False
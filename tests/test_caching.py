@@ -0,0 +1,124 @@
+from datetime import date
+
+from app.api.caching import ResponseCache, CachedResponse, response_cache, response_cache_size
+from app.api.configuration import settings
+from app.db.models import SampleType, StatusType
+from app.db.session import get_read_db
+from app.main import app
+from app.schemas.sample import SampleFilter
+from tests.conftest import TestingSessionLocal
+
+BASE_URL = "/api"
+
+def make_sample(auth_client, subject_id, sample_type="blood", sample_status="collected"):
+    response = auth_client.post(f"{BASE_URL}/samples", json={
+        "sample_type": sample_type,
+        "subject_id": subject_id,
+        "collection_date": str(date.today()),
+        "status": sample_status,
+        "storage_location": "freezer-cache"
+    })
+    return response.json()["sample_id"]
+
+def test_repeated_listing_is_served_from_cache(auth_client):
+    make_sample(auth_client, "PCA1")
+    url = f"{BASE_URL}/samples?subject_id=PCA1"
+
+    first = auth_client.get(url)
+    hits = response_cache.hits
+    second = auth_client.get(url)
+    assert response_cache.hits == hits + 1
+    assert second.json() == first.json()
+    assert second.headers["ETag"] == first.headers["ETag"]
+
+    assert auth_client.get(url, headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+
+def test_write_invalidates_only_matching_listings(auth_client):
+    make_sample(auth_client, "PCA2")
+    make_sample(auth_client, "PCA3")
+    auth_client.get(f"{BASE_URL}/samples?subject_id=PCA2")
+    auth_client.get(f"{BASE_URL}/samples?subject_id=PCA3")
+
+    sample_id = make_sample(auth_client, "PCA3")
+
+    hits = response_cache.hits
+    assert len(auth_client.get(f"{BASE_URL}/samples?subject_id=PCA2").json()) == 1
+    assert response_cache.hits == hits + 1
+    assert len(auth_client.get(f"{BASE_URL}/samples?subject_id=PCA3").json()) == 2
+    assert response_cache.hits == hits + 1
+
+    # An update moving the sample out of a filter invalidates the listing it leaves
+    auth_client.get(f"{BASE_URL}/samples?subject_id=PCA3")
+    auth_client.put(f"{BASE_URL}/samples/{sample_id}", json={"subject_id": "PCA4"})
+    assert len(auth_client.get(f"{BASE_URL}/samples?subject_id=PCA3").json()) == 1
+
+def test_bulk_write_clears_cache(auth_client):
+    sample_id = make_sample(auth_client, "PCA5")
+    auth_client.get(f"{BASE_URL}/samples?subject_id=PCA5")
+    auth_client.request("DELETE", f"{BASE_URL}/samples/bulk", json={"sample_ids": [sample_id]})
+    assert auth_client.get(f"{BASE_URL}/samples?subject_id=PCA5").json() == []
+
+def test_cache_stats_endpoint(auth_client):
+    response = auth_client.get("/cache/stats")
+    assert response.status_code == 200
+    assert {"hits", "misses", "hit_rate", "size"} <= response.json().keys()
+
+class DictBackend:
+    """Stand-in for a shared key-value store."""
+    def __init__(self):
+        self.store = {}
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def set(self, key, value):
+        self.store[key] = value
+
+    def delete(self, key):
+        self.store.pop(key, None)
+
+    def keys(self):
+        return list(self.store)
+
+    def clear(self):
+        self.store.clear()
+
+def test_cache_with_pluggable_backend():
+    cache = ResponseCache(backend=DictBackend(), ttl=60)
+    blood = ResponseCache.key(SampleFilter(sample_type="blood"), None, 100)
+    tissue = ResponseCache.key(SampleFilter(sample_type="tissue"), None, 100)
+    cache.set(blood, b"[]", {"ETag": '"a"'}, cache.generation)
+    cache.set(tissue, b"[]", {"ETag": '"b"'}, cache.generation)
+    assert isinstance(cache.get(blood), CachedResponse)
+
+    cache.invalidate([{"sample_id": "x", "sample_type": SampleType.tissue, "status": StatusType.collected,
+                       "subject_id": "P", "collection_date": date.today(), "storage_location": "f"}])
+    assert cache.get(blood) is not None
+    assert cache.get(tissue) is None
+
+def test_cache_ignores_results_read_before_an_invalidation():
+    cache = ResponseCache(backend=DictBackend(), ttl=60)
+    key = ResponseCache.key(SampleFilter(), None, 100)
+    generation = cache.generation
+    cache.clear()
+    cache.set(key, b"[]", {"ETag": '"a"'}, generation)
+    assert cache.get(key) is None
+
+def test_cache_is_disabled_by_default_with_several_workers():
+    assert response_cache_size(settings.model_copy(update={"response_cache_size": None, "web_concurrency": 1})) == 256
+    assert response_cache_size(settings.model_copy(update={"response_cache_size": None, "web_concurrency": 4})) == 0
+    assert response_cache_size(settings.model_copy(update={"response_cache_size": 64, "web_concurrency": 4})) == 64
+
+async def replica_db():
+    async with TestingSessionLocal() as db:
+        db.info["replica"] = True
+        yield db
+
+def test_pages_read_from_a_replica_are_not_cached(auth_client, monkeypatch):
+    make_sample(auth_client, "PCA5")
+    monkeypatch.setitem(app.dependency_overrides, get_read_db, replica_db)
+    url = f"{BASE_URL}/samples?subject_id=PCA5"
+    assert len(auth_client.get(url).json()) == 1
+    hits = response_cache.hits
+    assert len(auth_client.get(url).json()) == 1
+    assert response_cache.hits == hits
@@ -0,0 +1,86 @@
+import asyncio
+import json
+import time
+from datetime import date
+
+from app.api import changes
+from app.db.models import Sample, SampleType, StatusType
+from tests.conftest import TestingSessionLocal
+
+BASE_URL = "/api"
+
+def read_changes(auth_client, **params) -> dict:
+    response = auth_client.get(f"{BASE_URL}/changes/samples", params=params)
+    assert response.status_code == 200
+    return response.json()
+
+def last_sequence(auth_client) -> int:
+    feed = read_changes(auth_client)
+    while feed["changes"]:
+        feed = read_changes(auth_client, since=feed["last_sequence"])
+    return feed["last_sequence"]
+
+def test_change_feed_follows_writes(auth_client):
+    since = last_sequence(auth_client)
+    sample = auth_client.post(f"{BASE_URL}/samples", json={
+        "sample_type": "blood",
+        "subject_id": "FEED-1",
+        "collection_date": "2024-09-01",
+        "status": "collected",
+        "storage_location": "feed-freezer"
+    }).json()
+    auth_client.put(f"{BASE_URL}/samples/{sample['sample_id']}", json={"status": "processing"})
+    auth_client.patch(f"{BASE_URL}/samples/bulk", json={"subject_id": "FEED-1", "changes": {"status": "archived"}})
+    auth_client.delete(f"{BASE_URL}/samples/{sample['sample_id']}")
+
+    feed = read_changes(auth_client, since=since)
+    assert [(change["operation"], change["sample"] and change["sample"]["status"]) for change in feed["changes"]] == [
+        ("created", "collected"), ("updated", "processing"), ("updated", "archived"), ("deleted", None)]
+    assert {change["sample_id"] for change in feed["changes"]} == {sample["sample_id"]}
+    assert feed["changes"][0]["sample"] == sample
+    sequences = [change["sequence"] for change in feed["changes"]]
+    assert sequences == sorted(sequences) and sequences[0] > since and feed["last_sequence"] == sequences[-1]
+
+    page = read_changes(auth_client, since=since, limit=2)
+    assert [change["sequence"] for change in page["changes"]] == sequences[:2]
+    assert read_changes(auth_client, since=page["last_sequence"])["changes"] == feed["changes"][2:]
+
+def test_change_feed_long_poll_times_out(auth_client):
+    since = last_sequence(auth_client)
+    started = time.monotonic()
+    assert read_changes(auth_client, since=since, wait=0.2) == {"changes": [], "last_sequence": since}
+    assert time.monotonic() - started >= 0.2
+    assert auth_client.get(f"{BASE_URL}/changes/samples/stream",
+                           headers={"Last-Event-ID": "abc"}).status_code == 422
+
+async def follow_stream(since: int) -> list:
+    """
+    Read the SSE stream from a sequence number while a sample is created, with a poll interval much longer than the
+    wait so that the event can only arrive through the notification of the commit.
+    """
+    stream = changes._stream_changes(since, TestingSessionLocal())
+    next_event = asyncio.ensure_future(anext(stream))
+    await asyncio.sleep(0.05)
+    assert not next_event.done()
+    async with TestingSessionLocal() as db:
+        db.add(Sample(sample_type=SampleType.saliva, subject_id="FEED-SSE", collection_date=date(2024, 9, 2),
+                      status=StatusType.collected, storage_location="feed-freezer"))
+        await db.commit()
+    events = [await asyncio.wait_for(next_event, 1)]
+    await stream.aclose()
+    return events
+
+def test_change_stream_sends_new_changes(auth_client, monkeypatch):
+    monkeypatch.setattr(changes, "settings", changes.settings.model_copy(update={"change_feed_poll_seconds": 30}))
+    since = last_sequence(auth_client)
+    [event] = auth_client.portal.call(follow_stream, since)
+    lines = event.decode().splitlines()
+    assert lines[0] == f"id: {since + 1}" and lines[1] == "event: change"
+    change = json.loads(lines[2].removeprefix("data: "))
+    assert (change["operation"], change["sample"]["subject_id"]) == ("created", "FEED-SSE")
+
+def test_change_feed_requires_the_change_log(auth_client, monkeypatch):
+    # Only the SQLite triggers write sample_changes, other databases get an error instead of an empty feed
+    monkeypatch.setattr(changes, "CHANGE_LOG_DIALECTS", ("postgresql",))
+    assert auth_client.get(f"{BASE_URL}/changes/samples").status_code == 501
+    assert auth_client.get(f"{BASE_URL}/changes/samples/stream").status_code == 501
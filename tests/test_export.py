@@ -0,0 +1,73 @@
+import csv
+import gzip
+import io
+from datetime import date
+
+import pyarrow.ipc
+import pyarrow.parquet
+import pytest
+import zstandard
+
+from app.api import export
+
+BASE_URL = "/api"
+
+@pytest.fixture(autouse=True)
+def small_batches(monkeypatch):
+    # Several batches per export, so that the streaming across batches is exercised
+    monkeypatch.setattr(export, "EXPORT_BATCH_SIZE", 2)
+
+@pytest.fixture
+def exported(auth_client, request):
+    # Samples stored under a location of their own, so that each test exports only the samples it created
+    location = f"export/{request.node.name}/"
+    auth_client.post(f"{BASE_URL}/samples/bulk", json=[{
+        "sample_type": "saliva",
+        "subject_id": f"PX{i}",
+        "collection_date": "2024-05-0" + str(i + 1),
+        "status": "processing",
+        "storage_location": f"{location}box-1"
+    } for i in range(5)])
+    samples = auth_client.get(f"{BASE_URL}/samples", params={"storage_location_prefix": location}).json()
+    return f"{BASE_URL}/export/samples?storage_location_prefix={location}", [sample["sample_id"] for sample in samples]
+
+def test_export_samples_as_csv(auth_client, exported):
+    url, sample_ids = exported
+    response = auth_client.get(url)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.headers["content-disposition"] == 'attachment; filename="samples.csv"'
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["sample_id"] for row in rows] == sample_ids
+    assert rows[0]["sample_type"] == "saliva"
+    assert min(row["collection_date"] for row in rows) == "2024-05-01"
+
+def test_export_samples_as_gzipped_csv(auth_client, exported):
+    url, sample_ids = exported
+    response = auth_client.get(f"{url}&compression=gzip")
+    assert response.headers["content-type"] == "application/gzip"
+    assert response.headers["content-disposition"] == 'attachment; filename="samples.csv.gz"'
+    assert gzip.decompress(response.content) == auth_client.get(url).content
+
+def test_export_samples_as_arrow_with_zstd(auth_client, exported):
+    url, sample_ids = exported
+    response = auth_client.get(f"{url}&format=arrow&compression=zstd")
+    assert response.headers["content-disposition"] == 'attachment; filename="samples.arrow.zst"'
+    body = zstandard.ZstdDecompressor().stream_reader(io.BytesIO(response.content)).read()
+    table = pyarrow.ipc.open_stream(body).read_all()
+    assert table.column("sample_id").to_pylist() == sample_ids
+    assert set(table.column("status").to_pylist()) == {"processing"}
+
+def test_export_samples_as_parquet(auth_client, exported):
+    url, sample_ids = exported
+    response = auth_client.get(f"{url}&format=parquet&compression=zstd")
+    assert response.headers["content-type"] == "application/vnd.apache.parquet"
+    parquet_file = pyarrow.parquet.ParquetFile(io.BytesIO(response.content))
+    assert parquet_file.metadata.num_row_groups == 3
+    assert parquet_file.metadata.row_group(0).column(0).compression == "ZSTD"
+    table = parquet_file.read()
+    assert table.column("sample_id").to_pylist() == sample_ids
+    assert min(table.column("collection_date").to_pylist()) == date(2024, 5, 1)
+
+def test_export_samples_with_unknown_format(auth_client):
+    assert auth_client.get(f"{BASE_URL}/export/samples?format=xlsx").status_code == 422
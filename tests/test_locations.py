@@ -0,0 +1,72 @@
+from app.api import locations
+from app.db.locations import location_path, parse_location
+
+BASE_URL = "/api"
+
+def create(auth_client, *storage_locations) -> list:
+    response = auth_client.post(f"{BASE_URL}/samples/bulk", json=[{
+        "sample_type": "tissue",
+        "subject_id": "LOC-1",
+        "collection_date": "2024-08-01",
+        "status": "collected",
+        "storage_location": storage_location
+    } for storage_location in storage_locations])
+    assert response.status_code == 200
+    return response.json()["sample_ids"]
+
+def occupancy(auth_client, location=None) -> dict:
+    response = auth_client.get(f"{BASE_URL}/locations/occupancy", params={"location": location} if location else {})
+    assert response.status_code == 200
+    return response.json()
+
+def test_parse_location():
+    assert parse_location("freezer-1-shelfA") == {"freezer": "1", "shelf": "A"}
+    assert parse_location("site:BCN/freezer 2/rack-3/box-12/pos-a1") == {
+        "site": "BCN", "freezer": "2", "rack": "3", "box": "12", "position": "A1"}
+    assert parse_location("box-12-A1") == {"box": "12", "position": "A1"}
+    assert location_path(parse_location("Freezer1/Shelf-b")) == "freezer:1/shelf:B/"
+    # Unknown labels, levels out of order and missing values
+    assert parse_location("freezer-2-rowB") is None
+    assert parse_location("shelfA-freezer-1") is None
+    assert parse_location("freezer") is None
+
+def test_location_subtree_samples(auth_client):
+    in_shelf = create(auth_client, "site-LOCA/freezer-1/shelf-A/box-1/A1", "site-LOCA/freezer-1/shelf-A/box-2/A1",
+                      "site-LOCA/freezer-1/shelfA")
+    in_other_shelf = create(auth_client, "site-LOCA/freezer-1/shelf-B/box-1/A1")
+    create(auth_client, "site-LOCA/freezer-10/shelf-A/box-1/A1")
+
+    response = auth_client.get(f"{BASE_URL}/locations/samples", params={"location": "site-LOCA/freezer-1/shelfa"})
+    assert response.status_code == 200
+    assert {sample["sample_id"] for sample in response.json()} == set(in_shelf)
+
+    response = auth_client.get(f"{BASE_URL}/locations/samples", params={"location": "site-LOCA-freezer-1", "limit": 3})
+    first_page = [sample["sample_id"] for sample in response.json()]
+    response = auth_client.get(f"{BASE_URL}/locations/samples", params={
+        "location": "site-LOCA-freezer-1", "after": response.headers["X-Next-Cursor"]})
+    assert set(first_page + [sample["sample_id"] for sample in response.json()]) == set(in_shelf + in_other_shelf)
+
+    assert auth_client.get(f"{BASE_URL}/locations/samples", params={"location": "row-B"}).status_code == 422
+
+def test_location_occupancy(auth_client, monkeypatch):
+    monkeypatch.setattr(locations, "settings", locations.settings.model_copy(update={"box_capacity": 4}))
+    sample_ids = create(auth_client, "site-LOCB/freezer-1/box-1/A1", "site-LOCB/freezer-1/box-1/A2",
+                        "site-LOCB/freezer-1/box-2/A1", "site-LOCB/freezer-1")
+
+    freezer = occupancy(auth_client, "site-LOCB-freezer-1")
+    assert freezer["path"] == "site:LOCB/freezer:1/" and freezer["samples"] == 4 and freezer["capacity"] is None
+    assert [(child["level"], child["name"], child["samples"]) for child in freezer["children"]] == [
+        ("box", "1", 2), ("box", "2", 1)]
+    box = occupancy(auth_client, "site-LOCB-freezer-1-box-1")
+    assert (box["samples"], box["capacity"], box["free_slots"]) == (2, 4, 2)
+    assert {"level": "site", "name": "LOCB", "path": "site:LOCB/", "samples": 4} in occupancy(auth_client)["children"]
+
+    # Counts follow moves and deletes, emptied locations disappear
+    auth_client.put(f"{BASE_URL}/samples/{sample_ids[0]}", json={"storage_location": "site-LOCB/freezer-1/box-2/A2"})
+    auth_client.delete(f"{BASE_URL}/samples/{sample_ids[2]}")
+    assert [(child["name"], child["samples"]) for child in occupancy(auth_client, "site-LOCB-freezer-1")["children"]] \
+        == [("1", 1), ("2", 1)]
+    auth_client.patch(f"{BASE_URL}/samples/bulk", json={"sample_ids": sample_ids,
+                                                         "changes": {"storage_location": "site-LOCB/freezer-2"}})
+    assert occupancy(auth_client, "site-LOCB-freezer-1")["samples"] == 0
+    assert occupancy(auth_client, "site-LOCB-freezer-2")["samples"] == 3
@@ -0,0 +1,70 @@
+import re
+
+from app.api.metrics import Gauge, Histogram, MetricsRegistry
+
+BASE_URL = "/api"
+
+def metric_value(text: str, name: str, **labels) -> float:
+    """
+    Value of the sample of a metric whose labels include the given ones, 0 if there is none.
+    """
+    for line in text.splitlines():
+        match = re.fullmatch(rf"{name}(?:\{{(.*)\}})? (\S+)", line)
+        if match and all(f'{key}="{value}"' in (match.group(1) or "") for key, value in labels.items()):
+            return float(match.group(2))
+    return 0.0
+
+def test_histogram_rendering():
+    registry = MetricsRegistry()
+    histogram = registry.register(Histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0)))
+    gauge = registry.register(Gauge("in_flight", "In flight."))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, "/items")
+    gauge.inc()
+
+    assert registry.render().splitlines() == [
+        "# HELP latency_seconds Latency.",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{route="/items",le="0.1"} 2',
+        'latency_seconds_bucket{route="/items",le="1.0"} 3',
+        'latency_seconds_bucket{route="/items",le="+Inf"} 4',
+        'latency_seconds_sum{route="/items"} 3.65',
+        'latency_seconds_count{route="/items"} 4',
+        "# HELP in_flight In flight.",
+        "# TYPE in_flight gauge",
+        "in_flight 1",
+    ]
+
+def test_metrics_endpoint(auth_client):
+    sample_id = auth_client.post(f"{BASE_URL}/samples", json={
+        "sample_type": "blood",
+        "subject_id": "PM1",
+        "collection_date": "2024-06-01",
+        "status": "collected",
+        "storage_location": "metrics-freezer"
+    }).json()["sample_id"]
+    before = auth_client.get("/metrics").text
+    auth_client.get(f"{BASE_URL}/samples/{sample_id}")
+    auth_client.get(f"{BASE_URL}/samples/unknown-id")
+
+    response = auth_client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+
+    # Requests are labelled with their route template, not with the requested path
+    route = {"method": "GET", "route": "/api/samples/{sample_id}"}
+    for status_code in ("200", "404"):
+        count = metric_value(text, "http_request_duration_seconds_count", **route, status=status_code)
+        assert count == metric_value(before, "http_request_duration_seconds_count", **route, status=status_code) + 1
+    assert sample_id not in text
+
+    # The unknown sample is also looked up in archived_samples
+    queries = metric_value(text, "http_request_db_queries_sum", **route)
+    assert queries - metric_value(before, "http_request_db_queries_sum", **route) == 3
+    assert metric_value(text, "db_query_duration_seconds_count") > queries
+    assert metric_value(text, "auth_duration_seconds_count", token_cache="hit") >= 2
+    assert metric_value(text, "token_cache_hits_total") - metric_value(before, "token_cache_hits_total") == 2
+    assert metric_value(text, "token_cache_entries") >= 1 and 0 < metric_value(text, "token_cache_hit_ratio") <= 1
+    # The scrape itself is in flight while the metrics are rendered
+    assert metric_value(text, "http_requests_in_flight") == 1
@@ -0,0 +1,58 @@
+import logging
+
+from app.api import profiling
+from app.api.authentication import token_cache
+
+BASE_URL = "/api"
+
+def configure(monkeypatch, **settings):
+    monkeypatch.setattr(profiling, "settings", profiling.settings.model_copy(update=settings))
+
+def test_profile_every_request(auth_client, monkeypatch):
+    configure(monkeypatch, profile_requests=True)
+    response = auth_client.get(f"{BASE_URL}/samples", params={"subject_id": "PROF-1"})
+    assert response.status_code == 200
+    assert response.headers["Server-Timing"].startswith("db;dur=")
+    profile_id = response.headers["X-Profile-Id"]
+
+    # Reports are only shown to the users allowed to profile
+    assert auth_client.get(f"/debug/profiles/{profile_id}").status_code == 403
+
+    configure(monkeypatch, profiling_users=["johndoe"])
+    report = auth_client.get(f"/debug/profiles/{profile_id}").json()
+    assert report["method"] == "GET" and report["path"] == "/api/samples" and report["status_code"] == 200
+    query = next(query for query in report["queries"] if "FROM samples" in query["statement"])
+    assert any("ix_samples_subject_summary" in step for step in query["plan"])
+    assert report["db_queries"] >= 1 and report["calls"]
+    assert auth_client.get("/debug/profiles/unknown").status_code == 404
+
+def test_profile_requested_by_header(auth_client, monkeypatch):
+    configure(monkeypatch, profiling_users=["johndoe"])
+    assert "X-Profile-Id" not in auth_client.get(f"{BASE_URL}/samples/PROF-2").headers
+    response = auth_client.get(f"{BASE_URL}/samples/PROF-2", headers={"X-Profile": "1"})
+    assert response.status_code == 404
+    assert auth_client.get(f"/debug/profiles/{response.headers['X-Profile-Id']}").json()["status_code"] == 404
+
+    # Authenticating the profiled request counts as one token cache lookup, made by get_current_user
+    hits, misses = token_cache.hits, token_cache.misses
+    auth_client.get(f"{BASE_URL}/samples/PROF-2", headers={"X-Profile": "1"})
+    assert token_cache.hits + token_cache.misses == hits + misses + 1
+
+    # The header is ignored for other users
+    configure(monkeypatch, profiling_users=["janedoe"])
+    assert "X-Profile-Id" not in auth_client.get(f"{BASE_URL}/samples/PROF-2", headers={"X-Profile": "1"}).headers
+
+def test_slow_requests_are_logged(auth_client, monkeypatch, caplog):
+    configure(monkeypatch, slow_request_seconds=1e-9)
+    with caplog.at_level(logging.WARNING, logger=profiling.__name__):
+        auth_client.get(f"{BASE_URL}/samples", params={"subject_id": "PROF-3"})
+    assert any(record.getMessage().startswith("Slow request GET /api/samples: ") for record in caplog.records)
+
+def test_long_polls_are_not_logged_as_slow(auth_client, monkeypatch, caplog):
+    # The time spent waiting for a change is not processing time, profiled or not
+    for profile_requests in (False, True):
+        configure(monkeypatch, slow_request_seconds=0.5, profile_requests=profile_requests)
+        with caplog.at_level(logging.WARNING, logger=profiling.__name__):
+            response = auth_client.get(f"{BASE_URL}/changes/samples", params={"since": 10 ** 9, "wait": 0.6})
+        assert response.status_code == 200 and response.json()["changes"] == []
+        assert not any(record.getMessage().startswith("Slow request") for record in caplog.records)
@@ -0,0 +1,49 @@
+from app.api import ratelimit
+from app.api.ratelimit import ConcurrencyLimiter, MemoryStore, RateLimiter
+from tests.test_metrics import metric_value
+
+BASE_URL = "/api"
+
+def test_token_bucket_refills_over_time(monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr(ratelimit.time, "monotonic", lambda: now)
+    limiter = RateLimiter(MemoryStore(max_size=10), rate=2, burst=3)
+
+    assert [limiter.check("alice") for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert limiter.check("alice") == 0.5
+    assert limiter.check("bob") == 0.0
+
+    now += 0.5
+    assert limiter.check("alice") == 0.0
+    assert limiter.check("alice") == 0.5
+
+def test_rate_limited_requests_get_429(auth_client, monkeypatch):
+    monkeypatch.setattr(ratelimit, "rate_limiter", RateLimiter(MemoryStore(max_size=10), rate=0.1, burst=2))
+    rejected = metric_value(auth_client.get("/metrics").text, "http_requests_rejected_total", reason="rate_limit")
+
+    assert auth_client.get(f"{BASE_URL}/samples", params={"subject_id": "PRL"}).status_code == 200
+    assert auth_client.get(f"{BASE_URL}/samples", params={"subject_id": "PRL"}).status_code == 200
+    response = auth_client.get(f"{BASE_URL}/samples", params={"subject_id": "PRL"})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "10"
+
+    metrics = auth_client.get("/metrics").text
+    assert metric_value(metrics, "http_requests_rejected_total", reason="rate_limit") == rejected + 1
+
+def test_expensive_requests_are_capped(auth_client, monkeypatch):
+    limiter = ConcurrencyLimiter(limit=1)
+    monkeypatch.setattr(ratelimit, "expensive_request_limiter", limiter)
+
+    limiter.in_flight = 1
+    response = auth_client.get(f"{BASE_URL}/export/samples", params={"subject_id": "PCC"})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+    assert auth_client.get(f"{BASE_URL}/samples", params={"subject_id": "PCC"}).status_code == 429
+    # Cheap routes are not capped
+    assert auth_client.get(f"{BASE_URL}/samples/00000000-0000-0000-0000-000000000000").status_code == 404
+
+    limiter.in_flight = 0
+    assert auth_client.get(f"{BASE_URL}/export/samples", params={"subject_id": "PCC"}).status_code == 200
+    assert auth_client.get(f"{BASE_URL}/samples", params={"subject_id": "PCC"}).status_code == 200
+    # The slots are released once the responses are sent, streamed ones included
+    assert limiter.in_flight == 0
@@ -1,21 +1,9 @@
+import json
 from datetime import date
-import pytest
 
-BASE_URL = "/api"
-
-@pytest.fixture
-def token(client):
-    response = client.post("/auth/token", data={
-        "username": "johndoe",
-        "password": "secret123"
-    })
-    assert response.status_code == 200
-    return response.json()["access_token"]
+from app.api import endpoints
 
-@pytest.fixture
-def auth_client(client, token):
-    client.headers["Authorization"] = f"Bearer {token}"
-    return client
+BASE_URL = "/api"
 
 def test_create_sample(auth_client):
     response = auth_client.post(f"{BASE_URL}/samples", json={
@@ -206,3 +194,340 @@ def test_access_with_invalid_jwt(client):
     response = client.get("/api/samples", headers=headers)
     assert response.status_code == 401
     assert response.json()["detail"] == "Could not validate credentials"
+
+def test_get_samples_keyset_pagination(auth_client):
+    for i in range(5):
+        auth_client.post(f"{BASE_URL}/samples", json={
+            "sample_type": "blood",
+            "subject_id": f"PG{i}",
+            "collection_date": str(date.today()),
+            "status": "collected",
+            "storage_location": "freezer-pages"
+        })
+
+    seen = []
+    after = None
+    while True:
+        params = {"limit": 2}
+        if after:
+            params["after"] = after
+        response = auth_client.get(f"{BASE_URL}/samples", params=params)
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page) <= 2
+        seen.extend(sample["sample_id"] for sample in page)
+        after = response.headers.get("X-Next-Cursor")
+        if not after:
+            break
+
+    assert seen == sorted(seen)
+    assert len(seen) == len(set(seen))
+    all_ids = [sample["sample_id"] for sample in auth_client.get(f"{BASE_URL}/samples?limit=1000").json()]
+    assert seen == all_ids
+
+def test_get_samples_with_invalid_limit(auth_client):
+    response = auth_client.get(f"{BASE_URL}/samples?limit=0")
+    assert response.status_code == 422
+
+def test_stream_samples_as_ndjson(auth_client):
+    response = auth_client.get(f"{BASE_URL}/samples?stream=true&sample_status=collected")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines
+    assert all(sample["status"] == "collected" for sample in lines)
+    assert [sample["sample_id"] for sample in lines] == sorted(sample["sample_id"] for sample in lines)
+
+def test_bulk_create_samples_from_json(auth_client):
+    rows = [{
+        "sample_type": "saliva",
+        "subject_id": f"PB{i}",
+        "collection_date": str(date.today()),
+        "status": "collected",
+        "storage_location": "freezer-bulk"
+    } for i in range(3)]
+    rows.insert(1, {"sample_type": "INVALID", "subject_id": "PBX"})
+
+    response = auth_client.post(f"{BASE_URL}/samples/bulk", json=rows)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["created"] == 3
+    assert len(data["sample_ids"]) == 3
+    assert [error["index"] for error in data["errors"]] == [1]
+
+    response = auth_client.get(f"{BASE_URL}/samples/{data['sample_ids'][0]}")
+    assert response.status_code == 200
+    assert response.json()["subject_id"] == "PB0"
+
+def test_bulk_create_samples_from_ndjson(auth_client):
+    lines = [json.dumps({
+        "sample_type": "tissue",
+        "subject_id": "PN1",
+        "collection_date": str(date.today()),
+        "status": "processing",
+        "storage_location": "freezer-ndjson"
+    }), "not json"]
+    response = auth_client.post(f"{BASE_URL}/samples/bulk", content="\n".join(lines),
+                                headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200
+    assert response.json()["created"] == 1
+    assert response.json()["errors"][0]["index"] == 1
+
+def test_bulk_create_samples_from_csv(auth_client):
+    content = (
+        "sample_type,subject_id,collection_date,status,storage_location\n"
+        f"blood,PC1,{date.today()},collected,freezer-csv\n"
+        f"blood,PC2,not-a-date,collected,freezer-csv\n"
+    )
+    response = auth_client.post(f"{BASE_URL}/samples/bulk", content=content, headers={"Content-Type": "text/csv"})
+    assert response.status_code == 200
+    assert response.json()["created"] == 1
+    assert response.json()["errors"][0]["index"] == 1
+
+def test_bulk_create_samples_from_spreadsheet_csv(auth_client):
+    header = "sample_type,subject_id,collection_date,status,storage_location\n"
+    # Excel writes a byte order mark before the header
+    content = "\ufeff" + header + f"blood,PC3,{date.today()},collected,freezer-csv\n"
+    response = auth_client.post(f"{BASE_URL}/samples/bulk", content=content.encode("utf-8"),
+                                headers={"Content-Type": "text/csv"})
+    assert response.json()["created"] == 1 and response.json()["errors"] == []
+
+    content = header + f"blood,PÇ4,{date.today()},collected,freezer-csv\n"
+    response = auth_client.post(f"{BASE_URL}/samples/bulk", content=content.encode("cp1252"),
+                                headers={"Content-Type": "text/csv; charset=windows-1252"})
+    sample_id = response.json()["sample_ids"][0]
+    assert auth_client.get(f"{BASE_URL}/samples/{sample_id}").json()["subject_id"] == "PÇ4"
+
+    # Without a charset the body must be UTF-8
+    response = auth_client.post(f"{BASE_URL}/samples/bulk", content=b"\xff" + content.encode("cp1252"),
+                                headers={"Content-Type": "text/csv"})
+    assert response.status_code == 422
+    response = auth_client.post(f"{BASE_URL}/samples/bulk", content=header,
+                                headers={"Content-Type": "text/csv; charset=unknown"})
+    assert response.status_code == 415
+
+def test_bulk_create_samples_with_unsupported_content_type(auth_client):
+    response = auth_client.post(f"{BASE_URL}/samples/bulk", content="<samples/>",
+                                headers={"Content-Type": "application/xml"})
+    assert response.status_code == 415
+
+def test_bulk_update_samples_by_ids(auth_client):
+    rows = [{
+        "sample_type": "blood",
+        "subject_id": f"PU{i}",
+        "collection_date": str(date.today()),
+        "status": "collected",
+        "storage_location": "rack-update"
+    } for i in range(3)]
+    sample_ids = auth_client.post(f"{BASE_URL}/samples/bulk", json=rows).json()["sample_ids"]
+
+    response = auth_client.patch(f"{BASE_URL}/samples/bulk", json={
+        "sample_ids": sample_ids[:2],
+        "changes": {"status": "processing"},
+        "returning": True
+    })
+    assert response.status_code == 200
+    data = response.json()
+    assert data["affected"] == 2
+    assert sorted(sample["sample_id"] for sample in data["samples"]) == sorted(sample_ids[:2])
+    assert all(sample["status"] == "processing" for sample in data["samples"])
+
+    assert auth_client.get(f"{BASE_URL}/samples/{sample_ids[2]}").json()["status"] == "collected"
+
+def test_bulk_update_samples_by_filter(auth_client):
+    auth_client.post(f"{BASE_URL}/samples", json={
+        "sample_type": "tissue",
+        "subject_id": "PU9",
+        "collection_date": str(date.today()),
+        "status": "processing",
+        "storage_location": "rack-filter"
+    })
+    response = auth_client.patch(f"{BASE_URL}/samples/bulk", json={
+        "sample_status": "processing",
+        "sample_type": "tissue",
+        "changes": {"status": "archived"}
+    })
+    assert response.status_code == 200
+    assert response.json()["affected"] >= 1
+    assert response.json()["samples"] is None
+
+    response = auth_client.get(f"{BASE_URL}/samples?sample_status=processing&sample_type=tissue")
+    assert response.json() == []
+
+def test_bulk_update_samples_without_selection(auth_client):
+    response = auth_client.patch(f"{BASE_URL}/samples/bulk", json={"changes": {"status": "archived"}})
+    assert response.status_code == 422
+
+def test_bulk_update_samples_with_null_changes(auth_client):
+    for changes in ({"status": None}, {"storage_location": None}, {"subject_id": "PU10", "collection_date": None}):
+        response = auth_client.patch(f"{BASE_URL}/samples/bulk", json={"subject_id": "PU9", "changes": changes})
+        assert response.status_code == 422
+    response = auth_client.post(f"{BASE_URL}/samples", json={
+        "sample_type": "blood",
+        "subject_id": "PU11",
+        "collection_date": str(date.today()),
+        "status": "collected",
+        "storage_location": "rack-null"
+    })
+    assert auth_client.put(f"{BASE_URL}/samples/{response.json()['sample_id']}",
+                           json={"sample_type": None}).status_code == 422
+
+def test_bulk_delete_samples(auth_client):
+    rows = [{
+        "sample_type": "saliva",
+        "subject_id": f"PD{i}",
+        "collection_date": str(date.today()),
+        "status": "collected",
+        "storage_location": "rack-delete"
+    } for i in range(2)]
+    sample_ids = auth_client.post(f"{BASE_URL}/samples/bulk", json=rows).json()["sample_ids"]
+
+    response = auth_client.request("DELETE", f"{BASE_URL}/samples/bulk", json={
+        "sample_ids": sample_ids + ["00000000-0000-0000-0000-000000000000"],
+        "returning": True
+    })
+    assert response.status_code == 200
+    assert response.json()["affected"] == 2
+    assert sorted(sample["sample_id"] for sample in response.json()["samples"]) == sorted(sample_ids)
+
+    for sample_id in sample_ids:
+        assert auth_client.get(f"{BASE_URL}/samples/{sample_id}").status_code == 404
+
+def test_bulk_write_samples_in_chunks(auth_client, monkeypatch):
+    # Small chunks, so that the IDs are split over several statements
+    monkeypatch.setattr(endpoints, "BULK_CHUNK_SIZE", 2)
+    rows = [{
+        "sample_type": "blood",
+        "subject_id": f"PC{i}",
+        "collection_date": str(date.today()),
+        "status": "collected",
+        "storage_location": "rack-chunks"
+    } for i in range(5)]
+    sample_ids = auth_client.post(f"{BASE_URL}/samples/bulk", json=rows).json()["sample_ids"]
+
+    # Duplicated IDs are written once, whichever chunks they fall in
+    response = auth_client.patch(f"{BASE_URL}/samples/bulk", json={
+        "sample_ids": sample_ids + sample_ids[:2],
+        "changes": {"status": "processing"}
+    })
+    assert response.json()["affected"] == 5
+    response = auth_client.patch(f"{BASE_URL}/samples/bulk", json={
+        "sample_ids": sample_ids, "sample_status": "processing", "changes": {"status": "archived"}, "returning": True
+    })
+    assert sorted(sample["sample_id"] for sample in response.json()["samples"]) == sorted(sample_ids)
+
+    response = auth_client.request("DELETE", f"{BASE_URL}/samples/bulk", json={
+        "sample_ids": [*sample_ids[3:], *sample_ids], "returning": True
+    })
+    assert response.json()["affected"] == 5
+    assert sorted(sample["sample_id"] for sample in response.json()["samples"]) == sorted(sample_ids)
+    lookup = auth_client.post(f"{BASE_URL}/samples/lookup", json={"sample_ids": sample_ids}).json()
+    assert lookup["missing"] == sample_ids
+
+def test_filter_samples_by_subject_date_and_location(auth_client):
+    rows = [
+        {"sample_type": "blood", "subject_id": "PF1", "collection_date": "2024-01-10",
+         "status": "collected", "storage_location": "freezer-7-shelfA"},
+        {"sample_type": "blood", "subject_id": "PF1", "collection_date": "2024-03-10",
+         "status": "collected", "storage_location": "freezer-7-shelfB"},
+        {"sample_type": "blood", "subject_id": "PF2", "collection_date": "2024-02-10",
+         "status": "collected", "storage_location": "freezer-8-shelfA"},
+    ]
+    auth_client.post(f"{BASE_URL}/samples/bulk", json=rows)
+
+    response = auth_client.get(f"{BASE_URL}/samples?subject_id=PF1")
+    assert response.status_code == 200
+    assert sorted(sample["collection_date"] for sample in response.json()) == ["2024-01-10", "2024-03-10"]
+
+    response = auth_client.get(f"{BASE_URL}/samples?collected_from=2024-02-01&collected_to=2024-03-10&subject_id=PF1")
+    assert [sample["collection_date"] for sample in response.json()] == ["2024-03-10"]
+
+    response = auth_client.get(f"{BASE_URL}/samples?storage_location_prefix=freezer-7")
+    assert sorted(sample["storage_location"] for sample in response.json()) == ["freezer-7-shelfA", "freezer-7-shelfB"]
+
+def test_get_sample_with_etag(auth_client):
+    response = auth_client.post(f"{BASE_URL}/samples", json={
+        "sample_type": "blood",
+        "subject_id": "PE1",
+        "collection_date": str(date.today()),
+        "status": "collected",
+        "storage_location": "freezer-etag"
+    })
+    sample_id = response.json()["sample_id"]
+
+    response = auth_client.get(f"{BASE_URL}/samples/{sample_id}")
+    etag = response.headers["ETag"]
+
+    response = auth_client.get(f"{BASE_URL}/samples/{sample_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+
+    auth_client.put(f"{BASE_URL}/samples/{sample_id}", json={"status": "processing"})
+    response = auth_client.get(f"{BASE_URL}/samples/{sample_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+def test_get_samples_with_etag(auth_client):
+    url = f"{BASE_URL}/samples?subject_id=PE2"
+    auth_client.post(f"{BASE_URL}/samples/bulk", json=[{
+        "sample_type": "blood",
+        "subject_id": "PE2",
+        "collection_date": str(date.today()),
+        "status": "collected",
+        "storage_location": "freezer-etag"
+    }] * 2)
+
+    etag = auth_client.get(url).headers["ETag"]
+    assert auth_client.get(url, headers={"If-None-Match": f'W/{etag}, "other"'}).status_code == 304
+
+    # Bulk updates also bump the version of the rows
+    auth_client.patch(f"{BASE_URL}/samples/bulk", json={"subject_id": "PE2", "changes": {"status": "archived"}})
+    response = auth_client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert all(sample["status"] == "archived" for sample in response.json())
+    etag = response.headers["ETag"]
+
+    sample_id = response.json()[0]["sample_id"]
+    auth_client.delete(f"{BASE_URL}/samples/{sample_id}")
+    assert auth_client.get(url, headers={"If-None-Match": etag}).status_code == 200
+
+def test_fast_json_serialization_matches_pydantic(auth_client, monkeypatch):
+    monkeypatch.setattr(endpoints.response_cache, "enabled", False)
+    url = f"{BASE_URL}/samples?limit=3&storage_location_prefix=freezer"
+
+    responses = {}
+    for fast in (False, True):
+        monkeypatch.setattr(endpoints, "settings", endpoints.settings.model_copy(
+            update={"fast_json_serialization": fast}))
+        responses[fast] = (auth_client.get(url), auth_client.get(f"{url}&stream=true"))
+
+    (page, stream), (fast_page, fast_stream) = responses[False], responses[True]
+    assert len(page.json()) == 3
+    assert fast_page.content == page.content
+    assert fast_page.headers["ETag"] == page.headers["ETag"]
+    assert fast_page.headers["X-Next-Cursor"] == page.headers["X-Next-Cursor"]
+    assert fast_stream.content == stream.content
+
+def test_lookup_samples_by_ids(auth_client, monkeypatch):
+    # Small chunks, so that the IDs are split over several queries
+    monkeypatch.setattr(endpoints, "BULK_CHUNK_SIZE", 2)
+    rows = [{
+        "sample_type": "blood",
+        "subject_id": f"PL{i}",
+        "collection_date": str(date.today()),
+        "status": "collected",
+        "storage_location": "rack-lookup"
+    } for i in range(3)]
+    sample_ids = auth_client.post(f"{BASE_URL}/samples/bulk", json=rows).json()["sample_ids"]
+    missing_id = "00000000-0000-0000-0000-000000000000"
+
+    response = auth_client.post(f"{BASE_URL}/samples/lookup", json={
+        "sample_ids": [sample_ids[2], missing_id, sample_ids[0], sample_ids[1], sample_ids[0]]
+    })
+    assert response.status_code == 200
+    assert [sample["sample_id"] for sample in response.json()["samples"]] == [
+        sample_ids[2], sample_ids[0], sample_ids[1]]
+    assert response.json()["samples"][1]["subject_id"] == "PL0"
+    assert response.json()["missing"] == [missing_id]
+
+    assert auth_client.post(f"{BASE_URL}/samples/lookup", json={"sample_ids": []}).status_code == 422
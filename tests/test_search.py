@@ -0,0 +1,87 @@
+from app.api import search as search_module
+
+BASE_URL = "/api"
+
+def seed(auth_client):
+    auth_client.post(f"{BASE_URL}/samples/bulk", json=[{
+        "sample_type": "blood",
+        "subject_id": subject_id,
+        "collection_date": "2024-07-01",
+        "status": sample_status,
+        "storage_location": storage_location
+    } for subject_id, sample_status, storage_location in [
+        ("SRCH-0001", "collected", "srchfreezer-1-shelfA"),
+        ("SRCH-0002", "archived", "srchfreezer-1-shelfB"),
+        ("SRCH-0100", "collected", "srchfreezer-2-shelfA"),
+    ]])
+
+def search(auth_client, **params) -> list:
+    response = auth_client.get(f"{BASE_URL}/search/samples", params=params)
+    assert response.status_code == 200
+    return response.json()
+
+def test_search_by_prefix(auth_client):
+    seed(auth_client)
+    assert {sample["subject_id"] for sample in search(auth_client, q="srch-0")} == {"SRCH-0001", "SRCH-0002",
+                                                                                   "SRCH-0100"}
+    assert sorted(sample["subject_id"] for sample in search(auth_client, q="SRCH-000")) == ["SRCH-0001", "SRCH-0002"]
+    assert [sample["subject_id"] for sample in search(auth_client, q="srchfreezer-1-shelfa")] == ["SRCH-0001"]
+    assert {sample["subject_id"] for sample in search(auth_client, q="srchfreezer 1 shel")} == {"SRCH-0001",
+                                                                                             "SRCH-0002"}
+    # Tokens must be adjacent and in order
+    assert search(auth_client, q="shelfA srchfreezer") == []
+
+def test_search_ranks_exact_then_prefix_matches(auth_client):
+    auth_client.post(f"{BASE_URL}/samples/bulk", json=[{
+        "sample_type": "blood",
+        "subject_id": subject_id,
+        "collection_date": "2024-07-01",
+        "status": "collected",
+        "storage_location": storage_location
+    } for subject_id, storage_location in [("RANKED-10", "rankbox-1"), ("RANKED-1", "rankbox-2"),
+                                           ("PATIENT-7", "rack-ranked-1")]])
+    assert [sample["subject_id"] for sample in search(auth_client, q="ranked-1")] == ["RANKED-1", "RANKED-10",
+                                                                                      "PATIENT-7"]
+    assert [sample["subject_id"] for sample in search(auth_client, q="ranked-1", offset=1, limit=1)] == ["RANKED-10"]
+
+def test_search_with_field_filters_and_pagination(auth_client):
+    assert search(auth_client, q="srchfreezer", field="subject_id") == []
+    assert [sample["subject_id"] for sample in search(auth_client, q="srchfreezer", sample_status="archived")] == [
+        "SRCH-0002"]
+
+    first, second = search(auth_client, q="srch", limit=2), search(auth_client, q="srch", limit=2, offset=2)
+    assert len(first) == 2 and len(second) == 1
+    assert {sample["sample_id"] for sample in first + second} == {
+        sample["sample_id"] for sample in search(auth_client, q="srch")}
+
+def test_search_index_follows_updates_and_deletes(auth_client):
+    sample = search(auth_client, q="SRCH-0100")[0]
+    auth_client.put(f"{BASE_URL}/samples/{sample['sample_id']}", json={"storage_location": "srchmoved-9"})
+    assert [found["sample_id"] for found in search(auth_client, q="srchmoved")] == [sample["sample_id"]]
+    assert [found["subject_id"] for found in search(auth_client, q="srchfreezer-2")] == []
+
+    auth_client.delete(f"{BASE_URL}/samples/{sample['sample_id']}")
+    assert search(auth_client, q="srchmoved") == []
+
+def test_search_without_tokens(auth_client):
+    assert search(auth_client, q="--*") == []
+    assert auth_client.get(f"{BASE_URL}/search/samples?q=").status_code == 422
+
+def test_search_ranks_older_matches_beyond_the_window(auth_client, monkeypatch):
+    monkeypatch.setattr(search_module, "MAX_SEARCH_RESULTS", 3)
+    rows = [("WIN-1", "winbox-0")]
+    rows += [(f"WIN-1{i}", "winbox-1") for i in range(4)]
+    rows += [(f"OTHER-{i}", f"rack-win-1-{i}") for i in range(4)]
+    for subject_id, storage_location in rows:
+        auth_client.post(f"{BASE_URL}/samples", json={
+            "sample_type": "blood",
+            "subject_id": subject_id,
+            "collection_date": "2024-07-01",
+            "status": "collected",
+            "storage_location": storage_location
+        })
+    # The exact match is older than the windows of the other ranks, each rank keeps its newest 3
+    results = [sample["subject_id"] for sample in search(auth_client, q="win-1")]
+    assert results == ["WIN-1", "WIN-13", "WIN-12", "WIN-11", "OTHER-3", "OTHER-2", "OTHER-1"]
+    assert [sample["subject_id"] for sample in search(auth_client, q="win-1", offset=6)] == ["OTHER-1"]
+    assert search(auth_client, q="win-1", offset=1000) == []
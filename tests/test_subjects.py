@@ -0,0 +1,53 @@
+BASE_URL = "/api"
+
+def create(auth_client, subject_id, sample_type, status, collection_date) -> str:
+    response = auth_client.post(f"{BASE_URL}/samples", json={
+        "sample_type": sample_type,
+        "subject_id": subject_id,
+        "collection_date": collection_date,
+        "status": status,
+        "storage_location": "freezer-subjects"
+    })
+    assert response.status_code == 200
+    return response.json()["sample_id"]
+
+def test_read_subject(auth_client):
+    sample_ids = [create(auth_client, "SUBJ-1", "blood", "collected", "2024-03-01"),
+                  create(auth_client, "SUBJ-1", "blood", "archived", "2024-01-15"),
+                  create(auth_client, "SUBJ-1", "saliva", "collected", "2024-05-20")]
+    create(auth_client, "SUBJ-10", "tissue", "collected", "2024-02-01")
+
+    response = auth_client.get(f"{BASE_URL}/subjects/SUBJ-1")
+    assert response.status_code == 200
+    subject = response.json()
+    assert subject["subject_id"] == "SUBJ-1" and subject["sample_count"] == 3
+    assert subject["by_type"] == {"blood": 2, "saliva": 1}
+    assert subject["by_status"] == {"collected": 2, "archived": 1}
+    assert (subject["first_collection_date"], subject["last_collection_date"]) == ("2024-01-15", "2024-05-20")
+    assert [sample["sample_id"] for sample in subject["samples"]] == sorted(sample_ids)
+
+    assert auth_client.get(f"{BASE_URL}/subjects/SUBJ-unknown").status_code == 404
+
+def test_list_subjects(auth_client):
+    create(auth_client, "SUBL-A", "blood", "collected", "2024-03-01")
+    create(auth_client, "SUBL-A", "tissue", "processing", "2024-03-02")
+    create(auth_client, "SUBL-B", "blood", "archived", "2024-03-03")
+    create(auth_client, "SUBL-C", "saliva", "collected", "2024-03-04")
+
+    response = auth_client.get(f"{BASE_URL}/subjects", params={"after": "SUBL-", "limit": 2})
+    assert response.status_code == 200
+    assert [(subject["subject_id"], subject["sample_count"], subject["samples"]) for subject in response.json()] == [
+        ("SUBL-A", 2, None), ("SUBL-B", 1, None)]
+    assert response.headers["X-Next-Cursor"] == "SUBL-B"
+
+    response = auth_client.get(f"{BASE_URL}/subjects", params={"after": "SUBL-B", "limit": 1})
+    assert [subject["subject_id"] for subject in response.json()] == ["SUBL-C"]
+
+    # Subjects with a matching sample, counting only the matching samples
+    response = auth_client.get(f"{BASE_URL}/subjects", params={
+        "after": "SUBL-", "sample_type": "blood", "include_samples": True, "limit": 3})
+    subjects = [subject for subject in response.json() if subject["subject_id"].startswith("SUBL-")]
+    assert [(subject["subject_id"], subject["by_type"]) for subject in subjects] == [
+        ("SUBL-A", {"blood": 1}), ("SUBL-B", {"blood": 1})]
+    assert [len(subject["samples"]) for subject in subjects] == [1, 1]
+    assert subjects[0]["samples"][0]["sample_type"] == "blood"